@@ -1,16 +1,39 @@
-import json  # Para formatar o payload JSON ao enviar arquivos
+import argparse
 import os
+import signal
 import threading
 import time
-import tkinter as tk
-from tkinter import ttk
 
 import cv2
-import requests  # Para requisições HTTP
-import torch
+import numpy as np
 from dotenv import load_dotenv
-from PIL import Image, ImageTk
-from ultralytics import YOLO
+from PIL import Image
+
+try:
+    import tkinter as tk
+    from tkinter import ttk
+
+    from PIL import ImageTk
+except ImportError:  # servidor sem Tk: só o modo --headless
+    tk = ttk = ImageTk = None
+
+from utils.adaptive import AdaptiveController
+from utils.alert_rules import AlertRules
+from utils.alerts import AlertDispatcher
+from utils.backends import load_backend_model, model_spec
+from utils.capture import GrabberGroup, merge_batches
+from utils.config import apply_config, load_config
+from utils.detection_log import DetectionLog
+from utils.hard_negatives import HardNegativeMiner
+from utils.metrics import Metrics, serve_metrics
+from utils.model_registry import ModelRegistry
+from utils.motion import MOTION_METHODS, MotionGate, merge_region_detections, region_crop
+from utils.display import DisplayCanvas, display_layout
+from utils.pipeline import DROP_OLDEST, Pipeline
+from utils.postprocess import ClassFilter, Detections
+from utils.streaming import StreamServer
+from utils.tiling import TiledInference
+from utils.tracking import IouTracker
 
 load_dotenv()
 
@@ -24,9 +47,37 @@ AVAILABLE_MODELS = {
     "YOLOv11s - Knife - Scissors": "yolo11s_dataset_knife_scissors.pt",
     "YOLOv11s - All Knives": "yolo11s_dataset_knife.pt",
     "YOLOv11m - Sem finetuning": "yolo11m.pt",
+    # Backends de CPU: exportados no primeiro uso e guardados em models/cache
+    "YOLOv11n - Knife - Scissors (ONNX)": {
+        "path": "yolo11n_dataset_knife_scissors.pt",
+        "backend": "onnx",
+        "imgsz": 640,
+    },
+    "YOLOv11s - All Knives (OpenVINO)": {
+        "path": "yolo11s_dataset_knife.pt",
+        "backend": "openvino",
+        "imgsz": 640,
+    },
+    # Variantes INT8: geradas com python -m utils.model_quantizer (precisam de calibração)
+    "YOLOv11n - Knife - Scissors (ONNX INT8)": {
+        "path": "yolo11n_dataset_knife_scissors.pt",
+        "backend": "onnx",
+        "imgsz": 640,
+        "int8": True,
+    },
+    "YOLOv11s - All Knives (OpenVINO INT8)": {
+        "path": "yolo11s_dataset_knife.pt",
+        "backend": "openvino",
+        "imgsz": 640,
+        "int8": True,
+    },
     # Adicione mais modelos aqui se necessário
     # "Outro Modelo": "caminho/para/outro_modelo.pt"
+    # "Outro Modelo (ONNX)": {"path": "outro_modelo.pt", "backend": "onnx", "imgsz": 640}
 }
+MODELS_DIR = "models"  # pasta base dos caminhos de AVAILABLE_MODELS
+MODEL_CACHE_SIZE = 3  # modelos mantidos carregados e aquecidos (troca instantânea)
+MODEL_CACHE_BUDGET_MB = 1500  # orçamento de memória estimado para o cache
 
 # Dicionário de fontes de vídeo disponíveis (Nome Amigável: Valor para OpenCV)
 AVAILABLE_SOURCES = {
@@ -39,93 +90,193 @@ AVAILABLE_SOURCES = {
     # "Vídeo Arquivo": "caminho/para/video.mp4"
 }
 DEFAULT_SOURCE_NAME = "Webcam Externa (1)"
+DEFAULT_MODEL_NAME = None  # None = primeiro de AVAILABLE_MODELS
 CONFIDENCE_THRESHOLD = 0.40
 TARGET_CLASSES = ["knife", "scissors"]
 
 # --- Configurações de Alerta Discord ---
-DISCORD_WEBHOOK_URL = os.environ["DISCORD_WEBHOOK_URL"]
+DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")  # sem URL: alertas só no console
 ALERT_CLASSES = ["knife"]
 ALERT_THRESHOLD = 0.70
-ALERT_COOLDOWN_SECONDS = 60
+ALERT_COOLDOWN_SECONDS = 60  # por (fonte, classe): uma câmera não silencia as outras
+ALERT_CONFIRM_FRAMES = 3  # o alerta exige a classe em N ...
+ALERT_CONFIRM_WINDOW = 5  # ... dos últimos M frames da fonte (evita disparo por ruído)
+ALERT_RELEASE_THRESHOLD = 0.55  # histerese: confiança para continuar confirmado
+ALERT_IMAGE_FORMAT = "jpg"  # "jpg" (menor upload) ou "png"
+ALERT_IMAGE_MAX_WIDTH = 1280  # frames maiores são reduzidos antes do envio
+ALERT_SPOOL_DIR = "data/alerts_spool"  # alertas não entregues, reenviados depois
+
+
+# --- Configurações do Pipeline ---
+PIPELINE_QUEUE_SIZE = 2  # tamanho das filas entre os estágios
+PIPELINE_DROP_POLICY = DROP_OLDEST  # drop_oldest, drop_newest ou block
+
+# --- Configurações Multi-câmera (python main.py --multi) ---
+MULTI_CAMERA_MODE = False  # abre todas as AVAILABLE_SOURCES ao mesmo tempo
+MULTI_CAMERA_TILE_SIZE = (640, 360)  # proporção (e tamanho máximo) de cada feed na grade
+
+# --- Exibição (Tk) ---
+DISPLAY_SIZE = (1280, 720)  # área inicial do vídeo; acompanha o redimensionamento da janela
+DISPLAY_MAX_FPS = 60  # taxa de atualização do monitor: acima disso o frame não é desenhado
+
+# --- Filtro de Movimento (opcional, python main.py --motion-gate) ---
+MOTION_GATE_ENABLED = False  # pula o YOLO em frames sem mudança e reaproveita as detecções
+MOTION_METHOD = "diff"  # "diff" (diferença com fundo médio) ou "mog2"
+MOTION_MIN_AREA = 0.002  # fração mínima da imagem (reduzida) com mudança
+MOTION_REFRESH_SECONDS = 2.0  # inferência forçada mesmo sem movimento
+MOTION_REGIONS_ENABLED = False  # com movimento, infere só no recorte que contém as regiões que mudaram
+MOTION_REGION_MAX_AREA = 0.5  # recortes maiores que esta fração do frame usam o frame inteiro
+
+# --- Inferência em Blocos (opcional, python main.py --tiling) ---
+TILING_ENABLED = False  # recorta frames de alta resolução em blocos (objetos pequenos)
+# Fontes com inferência em blocos. rois: lista de (x1, y1, x2, y2) em pixels ou
+# frações do frame; None = frame inteiro. Escolha com: python -m utils.tiling
+TILED_SOURCES = {
+    "Câmera IP": {"tile_size": 640, "overlap": 0.2, "rois": None},
+}
+
+# --- Rastreamento (opcional, python main.py --track) ---
+TRACKING_ENABLED = False  # ids estáveis por objeto e caixas suavizadas
+TRACKING_DETECT_EVERY = 3  # roda o YOLO a cada K frames; o rastreador prevê os demais
+
+# --- Controle Adaptativo (opcional, python main.py --adaptive [FPS]) ---
+ADAPTIVE_ENABLED = False  # ajusta passo de inferência, imgsz e modelo pela latência medida
+ADAPTIVE_TARGET_FPS = 10.0  # FPS alvo por fonte
+ADAPTIVE_IMGSZ_LEVELS = (640, 512, 416, 320)
+ADAPTIVE_MAX_STRIDE = 4  # no máximo 1 inferência a cada N frames
+ADAPTIVE_MODELS = []  # nomes de AVAILABLE_MODELS do maior para o menor (vazio = só o modelo atual)
+
+# --- Métricas (opcional, python main.py --metrics-port 9100 --metrics-log 30) ---
+METRICS_PORT = None  # endpoint http://127.0.0.1:<porta>/metrics (formato Prometheus)
+METRICS_LOG_INTERVAL = None  # segundos entre linhas de resumo no console
+METRICS_INSTANCE = None  # nome da instância nas métricas (padrão: host-pid)
+
+# --- Stream MJPEG (opcional, python main.py --stream-port 8080) ---
+STREAM_PORT = None  # http://<host>:<porta>/ mostra o vídeo anotado no navegador
+STREAM_HOST = "127.0.0.1"  # "0.0.0.0" para aceitar conexões de outras máquinas
+STREAM_TOKEN = None  # se definido, exige ?token=<valor> na URL
+STREAM_MAX_FPS = 10  # frames codificados por segundo (um JPEG para todos os clientes)
+STREAM_JPEG_QUALITY = 70
+STREAM_SIZE = (1280, 720)  # tamanho máximo da imagem transmitida
+
+# --- Registro de Detecções (opcional) ---
+DETECTION_LOG_DIR = None  # ex.: "data/detections" (Parquet com pyarrow, senão .npz)
+
+# --- Mineração de Exemplos Difíceis (opcional, ver utils/hard_negatives.py) ---
+HARD_NEGATIVE_DIR = None  # ex.: "data/hard_negatives": frames alertados e incertos, sem duplicatas
+HARD_NEGATIVE_MIN_CONFIDENCE = 0.25  # incerto = classe-alvo entre este valor e ALERT_THRESHOLD
+HARD_NEGATIVE_INTERVAL = 10.0  # segundos entre frames incertos guardados da mesma fonte
+HARD_NEGATIVE_MAX_DISTANCE = 6  # bits de diferença do hash perceptual para contar como repetido
+
+# --- Modo Serviço (python main.py --headless --config servico.json) ---
+HEADLESS = False  # sem Tk: captura, detecção e alertas, sem desenhar nem converter frames
 # --- Fim das Configurações ---
+# Todas as constantes acima podem vir de um arquivo (--config), com os nomes em
+# minúsculas: {"available_sources": {...}, "alert_threshold": 0.75, ...}
 
 # (Variáveis Globais permanecem as mesmas)
-cap = None
+capture_group = None  # GrabberGroup com as fontes abertas (uma thread leitora por fonte)
+latest_packets = {}  # último pacote de cada fonte (para a grade)
+display_canvas = None  # DisplayCanvas: células e imagens exibidas reaproveitadas
+display_size = DISPLAY_SIZE  # área do vídeo na janela (atualizada pelo Tk)
+display_photo = None  # PhotoImage persistente, atualizado in-place
+last_display_time = 0.0
+stream_server = None  # StreamServer quando --stream-port está ativo
+stream_canvas = DisplayCanvas(slots=1)  # o StreamServer copia o frame ao publicar
+pipeline = None
+motion_gate = None  # MotionGate quando o filtro de movimento está ativo
+tilers = {}  # fonte -> TiledInference (vazio sem --tiling)
+tracking_enabled = TRACKING_ENABLED
+trackers = {}  # fonte -> IouTracker
+tracked_frames = {}  # fonte -> frames processados (decide quando rodar o YOLO)
+adaptive_controller = None  # AdaptiveController quando --adaptive está ativo
+metrics = Metrics(METRICS_INSTANCE)  # latências por etapa e contadores (lidos sob demanda)
+last_detections = {}  # fonte -> últimas detecções (reaproveitadas sem movimento)
+detection_log = None  # DetectionLog quando DETECTION_LOG_DIR/--detection-log está ativo
+hard_negative_miner = None  # HardNegativeMiner quando HARD_NEGATIVE_DIR/--mine-dir está ativo
+stats_label = None
+stats_last_update = 0
 current_model = None
+current_model_key = None
+class_filter = None  # ClassFilter (máscaras por id de classe) do pós-processamento
+alert_rules = None  # AlertRules: confirmação temporal, cooldown e histerese por (fonte, classe)
+model_registry = None  # ModelRegistry (modelos carregados e aquecidos)
 current_source_value = None
 model_lock = threading.Lock()
 capture_lock = threading.Lock()
-root = None
+root = None  # janela Tk (None no modo --headless)
 video_label = None
-fps_start_time = 0
-fps_frame_count = 0
-fps_display = 0.0
+model_combobox = None
+source_combobox = None
+fps_counters = {}  # fonte -> {"start", "count", "fps"}
 running = True
-last_alert_time = 0
+shutdown_event = threading.Event()  # sinalizado por SIGINT/SIGTERM no modo --headless
+alert_dispatcher = None  # AlertDispatcher (fila + thread de envio ao Discord)
 
 # --- Funções ---
 
 
-def send_discord_alert(detected_class, confidence_level, image_frame):
-    """Envia uma mensagem de alerta COM IMAGEM para o webhook do Discord."""
-    global DISCORD_WEBHOOK_URL
-    if not DISCORD_WEBHOOK_URL:
-        print("AVISO: URL do Webhook do Discord não configurada.")
-        return
-
-    message_content = f"🚨 ALERTA! Objeto detectado: **{detected_class.upper()}** com confiança **{confidence_level:.2f}**"
-    payload_json = {"content": message_content}
+def build_components():
+    """Cria filtro, regras de alerta e cache de modelos a partir das constantes (após --config)."""
+    global class_filter, alert_rules, model_registry, display_canvas, display_size
+    class_filter = ClassFilter(TARGET_CLASSES, ALERT_CLASSES, CONFIDENCE_THRESHOLD, ALERT_THRESHOLD)
+    alert_rules = AlertRules(
+        ALERT_CLASSES,
+        threshold=ALERT_THRESHOLD,
+        release_threshold=ALERT_RELEASE_THRESHOLD,
+        confirm_frames=ALERT_CONFIRM_FRAMES,
+        window_frames=ALERT_CONFIRM_WINDOW,
+        cooldown_seconds=ALERT_COOLDOWN_SECONDS,
+    )
+    model_registry = ModelRegistry(
+        # Com o controle adaptativo os grafos de todos os imgsz são exportados e carregados aqui
+        lambda spec: load_backend_model(
+            spec, models_dir=MODELS_DIR, sizes=ADAPTIVE_IMGSZ_LEVELS if adaptive_controller is not None else ()
+        ),
+        models_dir=MODELS_DIR,
+        memory_budget_mb=MODEL_CACHE_BUDGET_MB,
+        max_models=MODEL_CACHE_SIZE,
+    )
+    # Anel: itens na fila de saída + o exibido pelo Tk + o que está sendo escrito
+    display_canvas = DisplayCanvas(slots=PIPELINE_QUEUE_SIZE + 2)
+    display_size = DISPLAY_SIZE
 
-    # Codificar o frame (NumPy array) para PNG em memória
-    try:
-        ret, buffer = cv2.imencode(".png", image_frame)
-        if not ret:
-            print("Erro ao codificar a imagem para envio.")
-            # Tentar enviar apenas a mensagem de texto como fallback?
-            # requests.post(DISCORD_WEBHOOK_URL, json=payload_json, timeout=10)
-            return
-        image_bytes = buffer.tobytes()
-    except Exception as e:
-        print(f"Erro durante a codificação da imagem: {e}")
-        return
 
-    # Preparar os dados para multipart/form-data
-    files = {
-        # O payload JSON vai como um campo de formulário
-        "payload_json": (None, json.dumps(payload_json), "application/json"),
-        # O arquivo de imagem
-        # 'file' é um nome comum, mas Discord pode aceitar outros como 'files[0]'
-        "file": ("detection.png", image_bytes, "image/png"),
-    }
+# (load_model, change_video_source, on_model_select, on_source_select permanecem as mesmas)
+def source_frame_shape():
+    """Resolução (h, w, 3) da fonte aberta e número de fontes, para o aquecimento."""
+    with capture_lock:
+        grabbers = list(capture_group.grabbers.values()) if capture_group else []
+    for source_grabber in grabbers:
+        if source_grabber.width and source_grabber.height:
+            return (source_grabber.height, source_grabber.width, 3), len(grabbers)
+    return (480, 640, 3), max(1, len(grabbers))
 
-    try:
-        # Enviar a requisição POST com 'files' em vez de 'json'
-        response = requests.post(
-            DISCORD_WEBHOOK_URL, files=files, timeout=15
-        )  # Aumentar timeout para upload
-        response.raise_for_status()
-        print(
-            f"Mensagem de alerta e imagem '{detected_class}' enviadas com sucesso para o Discord!"
-        )
-    except requests.exceptions.RequestException as e:
-        print(f"Erro ao enviar mensagem/imagem para o Discord: {e}")
-        if response is not None:
-            print(
-                f"Resposta do servidor Discord: {response.text}"
-            )  # Logar resposta em caso de erro
-    except Exception as e:
-        print(f"Erro inesperado ao enviar para o Discord: {e}")
 
+def load_model(model_entry):
+    """Obtém o modelo do cache (ou carrega e aquece) e troca sob model_lock.
 
-# (load_model, change_video_source, on_model_select, on_source_select permanecem as mesmas)
-def load_model(model_path):
-    global current_model
+    O aquecimento roda com um frame na resolução real da fonte antes da troca,
+    então o primeiro frame com o novo modelo não sofre o atraso de inicialização.
+    """
+    global current_model, current_model_key
+    spec = model_spec(model_entry)
+    model_path = f"{spec['path']} [{spec['backend']}]"
+    key = model_registry.key(spec)
+    if key == current_model_key:
+        print(f"Modelo {model_path} já está em uso.")
+        return
     try:
         print(f"Carregando modelo: {model_path}...")
-        new_model = YOLO(model_path)
+        shape, batch = source_frame_shape()
+        new_model = model_registry.get(spec, warmup_shape=shape, warmup_batch=batch)
         if hasattr(new_model, "names"):
+            if adaptive_controller is not None:
+                restrict_adaptive_sizes(key, new_model)
             with model_lock:
                 current_model = new_model
+                current_model_key = key
+            metrics.inc("model_swaps")
             print(f"Modelo {model_path} carregado.")
         else:
             print(f"Erro: {model_path} não é um modelo YOLO válido.")
@@ -133,168 +284,353 @@ def load_model(model_path):
         print(f"Erro ao carregar modelo {model_path}: {e}")
 
 
-def change_video_source(source_value):
-    global cap, fps_start_time, fps_frame_count, current_source_value
-    print(f"Trocando para fonte: {source_value}")
+def restrict_adaptive_sizes(key, model):
+    """Informa ao controle adaptativo os imgsz que o modelo carregado aceita.
+
+    Modelos de runtime só aceitam os tamanhos com grafo carregado (`model.sizes`);
+    o PyTorch aceita qualquer um.
+    """
+    sizes = getattr(model, "sizes", None)
+    for index, name in enumerate(adaptive_controller.model_levels):
+        # Nível sem nome = o modelo escolhido na interface (o que acabou de ser carregado)
+        if name is None or model_registry.key(AVAILABLE_MODELS[name]) == key:
+            adaptive_controller.set_model_sizes(index, sizes)
+
+
+def open_sources(sources):
+    """Troca o grupo de captura atual por um novo com as fontes indicadas."""
+    global capture_group, current_source_value
     with capture_lock:
-        if cap is not None and cap.isOpened():
-            cap.release()
-            cap = None
-        print(f"Abrindo fonte: {source_value}")
-        new_cap = cv2.VideoCapture(source_value)
-        if new_cap.isOpened():
-            cap = new_cap
-            current_source_value = source_value
-            print("Fonte aberta.")
-            fps_start_time = time.time()
-            fps_frame_count = 0
+        if capture_group is not None:
+            capture_group.stop()
+            capture_group = None
+        new_group = GrabberGroup(sources)
+        opened = new_group.start()
+        if opened:
+            capture_group = new_group
+            current_source_value = list(sources.values())[0] if len(sources) == 1 else None
+            latest_packets.clear()
+            if display_canvas is not None:
+                display_canvas.reset()
+            stream_canvas.reset()
+            fps_counters.clear()
+            last_detections.clear()
+            if motion_gate is not None:
+                motion_gate.reset()
+            alert_rules.reset()
+            trackers.clear()
+            tracked_frames.clear()
+            if adaptive_controller is not None:
+                adaptive_controller.reset()
+            if pipeline is not None:
+                pipeline.flush()
         else:
-            print(f"Erro ao abrir fonte {source_value}")
-            cap = None
+            new_group.stop()
+    return opened
+
+
+def change_video_source(source_value, source_name=None):
+    print(f"Trocando para fonte: {source_value}")
+    name = source_name if source_name is not None else str(source_value)
+    if open_sources({name: source_value}):
+        print("Fonte aberta.")
+    else:
+        print(f"Erro ao abrir fonte {source_value}")
 
 
 def on_model_select(event=None):
-    selected_path = "models/" + AVAILABLE_MODELS.get(model_combobox.get())
-    if selected_path:
-        threading.Thread(target=load_model, args=(selected_path,), daemon=True).start()
+    selected_entry = AVAILABLE_MODELS.get(model_combobox.get())
+    if selected_entry:
+        threading.Thread(target=load_model, args=(selected_entry,), daemon=True).start()
     else:
         print("Erro: Modelo não encontrado.")
 
 
 def on_source_select(event=None):
-    selected_value = AVAILABLE_SOURCES.get(source_combobox.get())
+    selected_name = source_combobox.get()
+    selected_value = AVAILABLE_SOURCES.get(selected_name)
     if selected_value is not None:
-        change_video_source(selected_value)
+        change_video_source(selected_value, selected_name)
     else:
         print("Erro: Fonte não encontrada.")
 
 
-def update_frame():
-    """Captura um frame, processa, atualiza a interface e envia alertas."""
-    global fps_start_time, fps_frame_count, fps_display, running, current_model, cap, last_alert_time
-
-    if not running:
-        return
-
-    frame = None
-    processed_frame = None
-
+def capture_step():
+    """Estágio de captura: junta os frames novos de todas as fontes abertas."""
     with capture_lock:
-        if cap is not None and cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                frame = None
-
-    if frame is None:
-        if running:
-            root.after(30, update_frame)
-        return
+        group = capture_group
+    if group is None:
+        time.sleep(0.03)
+        return None
 
-    # --- Processamento ---
-    processed_frame = frame.copy()  # Importante trabalhar na cópia para desenhar
+    with metrics.timer("capture_wait"):
+        batch = group.read_batch(timeout=0.1)
+    return batch or None
 
-    # --- Cálculo FPS ---
-    fps_frame_count += 1
-    current_time_fps = time.time()
-    elapsed_time = current_time_fps - fps_start_time
-    if elapsed_time >= 1.0:
-        fps_display = fps_frame_count / elapsed_time
-        fps_start_time = current_time_fps
-        fps_frame_count = 0
 
-    # --- Detecção YOLO ---
+def inference_step(batch):
+    """Estágio de inferência: roda o modelo atual sobre o lote de frames.
+
+    Os frames de todas as câmeras prontas no mesmo instante passam pelo
+    modelo em uma única chamada (um modelo compartilhado por todas as fontes).
+    """
     model_to_use = None
     with model_lock:
         model_to_use = current_model
 
-    detection_occurred_in_frame = False
+    to_infer = []
+    for packet in batch:
+        packet["detections"] = Detections.empty()
+        packet["inference_skipped"] = False
+        if motion_gate is not None:
+            # Sem movimento: reaproveita as últimas detecções da fonte
+            run_inference, packet["motion_regions"] = motion_gate.check(
+                packet["source"], packet["frame"]
+            )
+            if not run_inference and packet["source"] in last_detections:
+                packet["detections"] = last_detections[packet["source"]]
+                packet["inference_skipped"] = True
+                continue
+        if should_skip_inference(packet["source"]):
+            if tracking_enabled:
+                # Frame sem inferência: o rastreador prevê as caixas
+                tracker = trackers.setdefault(packet["source"], IouTracker())
+                packet["detections"] = class_filter.apply(tracker.predict())
+            else:
+                packet["detections"] = last_detections.get(packet["source"], packet["detections"])
+            packet["inference_skipped"] = True
+            continue
+        to_infer.append(packet)
 
-    if model_to_use:
+    full_frame = [packet for packet in to_infer if packet["source"] not in tilers]
+    tiled = [packet for packet in to_infer if packet["source"] in tilers]
+    if model_to_use and to_infer:
         try:
-            results = model_to_use(frame, verbose=False)  # Detectar no frame original
-
-            for result in results:
-                boxes = result.boxes
-                if not hasattr(result, "names"):
-                    continue
-
-                for box in boxes:
-                    detection_occurred_in_frame = True
-                    x1, y1, x2, y2 = map(int, box.xyxy[0])
-                    confidence = box.conf[0].item()
-                    class_id = int(box.cls[0].item())
-
-                    if class_id < len(result.names):
-                        class_name = result.names[class_id]
-                        class_name_lower = class_name.lower()
-
-                        # Desenhar caixa
-                        if (
-                            class_name_lower in TARGET_CLASSES
-                            and confidence > CONFIDENCE_THRESHOLD
-                        ):
-                            colorAlarme = (0, 0, 255)
-                            if confidence > 0.5:
-                                colorAlarme = (0, 255, 0)
-                            # Desenhar no processed_frame
-                            cv2.rectangle(
-                                processed_frame, (x1, y1), (x2, y2), colorAlarme, 2
-                            )
-                            label_text = f"{class_name} {confidence:.2f}"
-                            cv2.putText(
-                                processed_frame,
-                                label_text,
-                                (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX,
-                                0.5,
-                                colorAlarme,
-                                2,
-                            )
-
-                        # --- Lógica de Alerta Discord com Imagem ---
-                        if (
-                            class_name_lower in ALERT_CLASSES
-                            and confidence > ALERT_THRESHOLD
-                        ):
-                            current_time_alert = time.time()
-                            if (
-                                current_time_alert - last_alert_time
-                                >= ALERT_COOLDOWN_SECONDS
-                            ):
-                                print(
-                                    f"--- ALERTA DETECTADO ({time.strftime('%H:%M:%S')}) ---"
-                                )
-                                print(
-                                    f"Objeto: {class_name}, Confiança: {confidence:.2f}, Enviando com imagem..."
-                                )
-
-                                # *** Passar uma CÓPIA do frame processado para a thread ***
-                                frame_copy_for_alert = processed_frame.copy()
-
-                                threading.Thread(
-                                    target=send_discord_alert,
-                                    args=(class_name, confidence, frame_copy_for_alert),
-                                    daemon=True,
-                                ).start()
-
-                                last_alert_time = current_time_alert
-                            # else: # Log de cooldown (opcional)
-                            # time_remaining = ALERT_COOLDOWN_SECONDS - (current_time_alert - last_alert_time)
-                            # print(f"Alerta ({class_name_lower}) suprimido. Cooldown: {time_remaining:.1f}s.")
-                    else:
-                        print(f"Aviso: ID de classe {class_id} inválido.")
-
+            raw = {}
+            kwargs = {"imgsz": adaptive_controller.imgsz} if adaptive_controller is not None else {}
+            start = time.perf_counter()
+            inputs, crops, tile_jobs = [], {}, []
+            for packet in full_frame:
+                # Filtro de movimento com regiões: só o recorte que mudou vai para o modelo
+                crop = None
+                if packet.get("motion_regions"):
+                    height, width = packet["frame"].shape[:2]
+                    crop = region_crop(
+                        packet["motion_regions"], width, height, max_area_ratio=MOTION_REGION_MAX_AREA
+                    )
+                if crop is None:
+                    inputs.append(packet["frame"])
+                else:
+                    x1, y1, x2, y2 = crop
+                    inputs.append(np.ascontiguousarray(packet["frame"][y1:y2, x1:x2]))
+                    crops[id(packet)] = crop
+            for packet in tiled:
+                # Blocos de todas as fontes com tiling entram no mesmo lote dos frames inteiros
+                tiler = tilers[packet["source"]]
+                tiles, owners = tiler.split([packet["frame"]])
+                tile_jobs.append((packet, tiler, len(inputs), owners))
+                inputs.extend(tiles)
+            results = model_to_use(inputs, verbose=False, **kwargs)
+            # Pós-processamento: uma cópia para o NumPy por frame + filtros vetorizados
+            for packet, result in zip(full_frame, results):
+                detections = Detections.from_result(result)
+                if id(packet) in crops:
+                    detections = merge_region_detections(
+                        detections, crops[id(packet)], last_detections.get(packet["source"])
+                    )
+                raw[id(packet)] = detections
+            for packet, tiler, offset, owners in tile_jobs:
+                # Caixas dos blocos de volta ao frame, juntadas nas emendas
+                raw[id(packet)] = tiler.merge(results[offset : offset + len(owners)], owners, 1)[0]
+            inference_ms = (time.perf_counter() - start) * 1000.0
+            metrics.observe("inference", inference_ms)
+            if adaptive_controller is not None:
+                observe_latency(inference_ms)
+            start = time.perf_counter()
+            for packet in to_infer:
+                detections = raw[id(packet)]
+                if tracking_enabled:
+                    detections = trackers.setdefault(packet["source"], IouTracker()).update(detections)
+                packet["detections"] = class_filter.apply(detections)
+                if adaptive_controller is not None and packet["detections"].draw.any():
+                    adaptive_controller.mark_detection(packet["source"])
+                last_detections[packet["source"]] = packet["detections"]
+            metrics.observe("postprocess", (time.perf_counter() - start) * 1000.0)
+            metrics.inc("frames_inferred", len(to_infer))
         except Exception as e:
+            metrics.inc("inference_errors")
             print(f"Erro durante a inferência YOLO: {e}")
+    metrics.inc("frames_skipped", len(batch) - len(to_infer))
+
+    if detection_log is not None:
+        for packet in to_infer:
+            log_detections(packet)
+    return batch
+
+
+def should_skip_inference(source):
+    """Decide se o frame da fonte pula o YOLO (controle adaptativo ou passo fixo do rastreamento)."""
+    if adaptive_controller is not None:
+        return not adaptive_controller.should_infer(source)
+    if tracking_enabled:
+        count = tracked_frames.get(source, 0)
+        tracked_frames[source] = count + 1
+        return count % TRACKING_DETECT_EVERY != 0
+    return False
+
+
+def observe_latency(latency_ms):
+    """Alimenta o controle adaptativo; troca o modelo quando o nível pede outro."""
+    if adaptive_controller.observe(latency_ms):
+        level = adaptive_controller.stats()
+        print(
+            f"Controle adaptativo: passo {level['stride']}, imgsz {level['imgsz']}, "
+            f"modelo nível {level['model']} ({level['latency_ms']} ms)"
+        )
+        model_name = adaptive_controller.model_entry
+        if model_name is not None:
+            threading.Thread(target=load_model, args=(AVAILABLE_MODELS[model_name],), daemon=True).start()
+
+
+def log_detections(packet):
+    """Envia as detecções do frame para o registro colunar (escrita em segundo plano)."""
+    detections = packet["detections"]
+    if len(detections):
+        detection_log.append(
+            packet["source"],
+            packet["frame_id"],
+            packet["timestamp"],
+            detections.class_names(),
+            detections.conf,
+            detections.xyxy,
+        )
+
+
+def update_fps(source):
+    """Atualiza e retorna o FPS exibido para uma fonte."""
+    counter = fps_counters.setdefault(source, {"start": time.time(), "count": 0, "fps": 0.0})
+    counter["count"] += 1
+    current_time_fps = time.time()
+    elapsed_time = current_time_fps - counter["start"]
+    if elapsed_time >= 1.0:
+        counter["fps"] = counter["count"] / elapsed_time
+        counter["start"] = current_time_fps
+        counter["count"] = 0
+    return counter["fps"]
+
+
+def draw_detections(frame, detections, scale=None):
+    """Desenha as caixas (somente classes-alvo acima do limiar) no frame.
+
+    `scale` (sx, sy) converte as caixas do frame original para um frame reduzido.
+    """
+    boxes = detections.xyxy
+    if scale is not None:
+        boxes = boxes * np.array([scale[0], scale[1], scale[0], scale[1]], dtype=np.float32)
+    for index in np.flatnonzero(detections.draw):
+        x1, y1, x2, y2 = boxes[index].astype(int)
+        confidence = float(detections.conf[index])
+        class_name = detections.names[int(detections.cls[index])]
+        if detections.track_id is not None:
+            class_name += f" #{int(detections.track_id[index])}"
+        colorAlarme = (0, 0, 255)
+        if confidence > 0.5:
+            colorAlarme = (0, 255, 0)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), colorAlarme, 2)
+        label_text = f"{class_name} {confidence:.2f}"
+        cv2.putText(
+            frame,
+            label_text,
+            (x1, y1 - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            colorAlarme,
+            2,
+        )
+
+
+def dispatch_alerts(packet):
+    """Avalia as regras de alerta da fonte e envia os confirmados com a imagem anotada.
+
+    A cópia anotada em resolução cheia só é feita quando um alerta realmente
+    dispara; a exibição trabalha em buffers reduzidos.
+    """
+    detections = packet["detections"]
+    processed_frame = None
+    alerted = False
+    # Frames sem inferência repetem as últimas detecções (ou a previsão do rastreador):
+    # contá-los faria uma única inferência ruidosa preencher sozinha os N de M frames
+    rules = [] if packet["inference_skipped"] else alert_rules.update(
+        packet["source"], detections, packet["timestamp"], track_ids=detections.track_id
+    )
+    # Só chaves (fonte, classe) confirmadas em N de M frames e fora do cooldown disparam
+    for rule in rules:
+        if rule["fire"]:
+            alerted = True
+            metrics.inc("alerts_fired", source=packet["source"])
+            print(f"--- ALERTA DETECTADO ({time.strftime('%H:%M:%S')}) ---")
+            print(
+                f"Objeto: {rule['class']}, Confiança: {rule['confidence']:.2f}, Fonte: {packet['source']}, Enviando com imagem..."
+            )
+            if alert_dispatcher is None:
+                continue
+            if processed_frame is None:
+                # *** CÓPIA do frame (o da captura não é alterado), desenhada uma vez por frame ***
+                processed_frame = packet["frame"].copy()
+                draw_detections(processed_frame, detections)
+
+            with metrics.timer("alert_enqueue"):
+                alert_dispatcher.submit(
+                    rule["class"], rule["confidence"], processed_frame, source=packet["source"]
+                )
+            metrics.inc("alerts_enqueued", source=packet["source"])
+        elif rule["suppressed"]:
+            # Confirmado, mas em cooldown: uma vez por chave e cooldown (não por frame)
+            metrics.inc("alerts_suppressed", source=packet["source"])
+    # Frame original (sem caixas) para revisão e treino; frames sem inferência repetem detecções
+    if hard_negative_miner is not None and (alerted or not packet["inference_skipped"]):
+        hard_negative_miner.observe(
+            packet["source"], packet["frame"], detections, packet["timestamp"], alerted=alerted
+        )
+
+
+def render_packet(packet, cell):
+    """Reduz o frame da fonte para a célula de exibição e desenha caixas e FPS nela.
+
+    Tudo acontece no buffer da célula (reaproveitado entre frames): nenhuma
+    cópia na resolução da câmera, e a conversão para RGB já é no tamanho da tela.
+    """
+    buffer = cell["buffer"]
+    frame = packet["frame"]
+    (h, w) = buffer.shape[:2]
+    (frame_h, frame_w) = frame.shape[:2]
+    # INTER_LINEAR: bem mais barato que INTER_AREA e suficiente para a tela
+    cv2.resize(frame, (w, h), dst=buffer, interpolation=cv2.INTER_LINEAR)
+
+    # Desenhar caixas (somente classes-alvo acima do limiar)
+    draw_start = time.perf_counter()
+    draw_detections(buffer, packet["detections"], scale=(w / frame_w, h / frame_h))
 
     # --- Exibir FPS ---
-    # Desenhar no processed_frame
+    fps_display = fps_counters.get(packet["source"], {}).get("fps", 0.0)
     fps_text = f"FPS: {fps_display:.2f}"
-    (h, w) = processed_frame.shape[:2]
-    text_x = w - 150
+    with capture_lock:
+        source_grabber = capture_group.grabber(packet["source"]) if capture_group else None
+    if source_grabber is not None:
+        fps_text += f" | Descartados: {source_grabber.frames_dropped}"
+    if motion_gate is not None:
+        fps_text += f" | Sem movimento: {motion_gate.stats(packet['source'])['skipped']}"
+    if adaptive_controller is not None:
+        # FPS exibido x FPS realmente inferido, com o nível escolhido pelo controle
+        adaptive = adaptive_controller.stats(packet["source"])
+        fps_text += (
+            f" | Inferência: {adaptive['inference_fps']:.1f} fps"
+            f" (passo {adaptive['stride']}, {adaptive['imgsz']}px)"
+        )
+    text_x = max(10, w - 20 - 11 * len(fps_text))
     text_y = h - 20
     cv2.putText(
-        processed_frame,
+        buffer,
         fps_text,
         (text_x, text_y),
         cv2.FONT_HERSHEY_SIMPLEX,
@@ -302,34 +638,230 @@ def update_frame():
         (0, 255, 0),
         2,
     )
+    if MULTI_CAMERA_MODE:
+        cv2.putText(
+            buffer,
+            str(packet["source"]),
+            (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.8,
+            (255, 255, 255),
+            2,
+        )
+    metrics.observe("draw", (time.perf_counter() - draw_start) * 1000.0)
+
+    cv2.cvtColor(buffer, cv2.COLOR_BGR2RGB, dst=buffer)
+    cell["frame_id"] = packet["frame_id"]
+
+
+def render_step(batch):
+    """Estágio de renderização: alertas de cada frame e, no ritmo da tela, a imagem exibida (RGB)."""
+    global last_display_time
+    for packet in batch:
+        update_fps(packet["source"])
+        # Alertas desenham a própria cópia em resolução cheia, só quando disparam
+        dispatch_alerts(packet)
+        latest_packets[packet["source"]] = packet
+        # Idade do frame (captura -> pronto para exibir): cresce quando a instância fica para trás
+        metrics.observe("frame_age", (time.time() - packet["timestamp"]) * 1000.0)
+
+    publish_stream()
+
+    # Acima da taxa de atualização do monitor o frame nem seria visto: não reduz nem desenha
+    now = time.perf_counter()
+    if now - last_display_time < 1.0 / DISPLAY_MAX_FPS:
+        return None
+    image = compose_view(display_canvas, display_size)
+    if image is None:
+        return None
+    last_display_time = now
+    return {"image": image, "batch": batch}
 
-    # --- Exibir na Interface Tkinter ---
-    try:
-        cv2image = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(cv2image)
-        imgtk = ImageTk.PhotoImage(image=img)
-        video_label.imgtk = imgtk
-        video_label.configure(image=imgtk)
-    except Exception as e:
-        print(f"Erro ao atualizar Tkinter: {e}")
 
-    # Agendar próxima atualização
+def compose_view(canvas, size):
+    """Imagem RGB com o último frame anotado de cada fonte ativa, reduzida para caber em `size`."""
+    # Fontes sem frame novo neste lote continuam com a última célula desenhada
+    with capture_lock:
+        active_sources = list(capture_group.grabbers) if capture_group else []
+    packets = [latest_packets[name] for name in active_sources if name in latest_packets]
+    if not packets:
+        return None
+    size, rects = display_layout(
+        [packet["frame"].shape for packet in packets], size, MULTI_CAMERA_TILE_SIZE
+    )
+    cells = []
+    for packet, (_, _, w, h) in zip(packets, rects):
+        cell = canvas.cell(packet["source"], (w, h))
+        if cell["frame_id"] != packet["frame_id"]:
+            render_packet(packet, cell)
+        cells.append(cell)
+    return canvas.compose(cells, rects, size)
+
+
+def publish_stream():
+    """Entrega a imagem anotada ao stream MJPEG (só com clientes ou snapshots pendentes e no FPS do stream)."""
+    if stream_server is None or not stream_server.wants_frame():
+        return
+    with metrics.timer("stream_compose"):
+        image = compose_view(stream_canvas, STREAM_SIZE)
+    if image is not None:
+        stream_server.publish(image, rgb=True)
+
+
+def headless_step(batch):
+    """Estágio final sem interface: FPS, alertas e métricas, sem desenhar nem converter frames.
+
+    Com o stream ativo e clientes conectados, as fontes são desenhadas só no FPS do stream.
+    """
+    for packet in batch:
+        update_fps(packet["source"])
+        dispatch_alerts(packet)
+        latest_packets[packet["source"]] = packet
+        metrics.observe("frame_age", (time.time() - packet["timestamp"]) * 1000.0)
+    publish_stream()
+    return batch
+
+
+def build_pipeline(headless=False):
+    """Monta o pipeline captura -> inferência -> renderização (ou alertas, sem interface)."""
+    new_pipeline = Pipeline(queue_size=PIPELINE_QUEUE_SIZE, drop_policy=PIPELINE_DROP_POLICY)
+    # Lotes de captura pendentes são combinados por fonte: toda câmera chega à inferência
+    new_pipeline.add_stage("captura", capture_step, merge=merge_batches)
+    new_pipeline.add_stage("inferencia", inference_step)
+    if headless:
+        new_pipeline.add_stage("alertas", headless_step, sink=True)
+    else:
+        new_pipeline.add_stage("render", render_step)
+    return new_pipeline
+
+
+def update_frame():
+    """Loop do Tk: exibe o último frame renderizado pelo pipeline."""
+    global stats_last_update
+
+    if not running:
+        return
+
+    packet = None
+    # Pega o item mais recente disponível, descartando os que ficaram para trás
+    while True:
+        item = pipeline.output_queue.get(timeout=0)
+        if item is None:
+            break
+        packet = item
+
+    if packet is not None:
+        try:
+            with metrics.timer("tk_convert"):
+                show_image(packet["image"])
+        except Exception as e:
+            print(f"Erro ao atualizar Tkinter: {e}")
+
+    # Estatísticas por estágio (vazão e profundidade de fila) para achar o gargalo
+    now = time.time()
+    if now - stats_last_update >= 1.0:
+        stats_last_update = now
+        stats_label.configure(
+            text=f"{pipeline.format_stats()} | gargalo: {pipeline.bottleneck()}"
+        )
+
     if running:
-        delay_ms = 15 if not detection_occurred_in_frame else 25
-        root.after(delay_ms, update_frame)
+        root.after(5, update_frame)
 
 
-def on_closing():
-    """Função chamada ao fechar a janela Tkinter."""
-    global running, cap
+def show_image(image):
+    """Copia a imagem RGB para o PhotoImage persistente (recriado só quando o tamanho muda)."""
+    global display_photo
+    (h, w) = image.shape[:2]
+    if display_photo is None or (display_photo.width(), display_photo.height()) != (w, h):
+        display_photo = ImageTk.PhotoImage("RGB", (w, h))
+        video_label.configure(image=display_photo)
+    display_photo.paste(Image.fromarray(image))
+
+
+def on_display_resize(event):
+    """Área do vídeo redimensionada: o render passa a reduzir os frames para o novo tamanho."""
+    global display_size
+    if event.width > 1 and event.height > 1:
+        display_size = (event.width, event.height)
+
+
+def collect_metrics(m):
+    """Copia para as métricas os contadores mantidos pelos outros componentes."""
+    with capture_lock:
+        grabber_stats = capture_group.stats() if capture_group else []
+    for stats in grabber_stats:
+        m.set_counter("frames_read", stats["frames_read"], source=stats["source"])
+        m.set_counter("frames_dropped", stats["frames_dropped"], source=stats["source"])
+    for source, counter in list(fps_counters.items()):
+        m.set("source_fps", round(counter["fps"], 2), source=source)
+    if pipeline is not None:
+        for stats in pipeline.stats():
+            m.set("queue_depth", stats["queue_depth"], stage=stats["name"])
+            m.set_counter("queue_dropped", stats["dropped"], stage=stats["name"])
+            m.set("stage_fps", round(stats["fps"], 2), stage=stats["name"])
+    if stream_server is not None:
+        stats = stream_server.stats()
+        m.set("stream_clients", stats["clients"])
+        m.set_counter("stream_frames", stats["encoded"])
+        m.set_counter("stream_frames_skipped", stats["skipped"])
+    if hard_negative_miner is not None:
+        stats = hard_negative_miner.stats()
+        m.set_counter("mined_frames", stats["saved"])
+        m.set_counter("mined_duplicates", stats["duplicates"])
+        m.set_counter("mined_dropped", stats["dropped"])
+    if alert_dispatcher is not None:
+        stats = alert_dispatcher.stats()
+        m.set_counter("alerts_sent", stats["sent"])
+        m.set_counter("alerts_failed", stats["failed"])
+        m.set("alerts_spooled", stats["spooled"])
+        m.set("alert_queue", stats["queued"])
+    registry = model_registry.stats()
+    m.set("models_cached", registry["models"])
+    m.set("models_memory_mb", registry["memory_mb"])
+    m.set_counter("model_cache_hits", registry["hits"])
+    m.set_counter("model_cache_misses", registry["misses"])
+    m.set_counter("model_cache_evictions", registry["evictions"])
+    if motion_gate is not None:
+        for source in list(fps_counters):
+            m.set_counter("motion_skipped", motion_gate.stats(source)["skipped"], source=source)
+
+
+def shutdown():
+    """Para o pipeline e libera fontes, registro e envio de alertas (GUI ou serviço)."""
+    global running, capture_group
     print("Fechando...")
     running = False
-    time.sleep(0.2)
+    if pipeline is not None:
+        pipeline.stop()
+    if detection_log is not None:
+        detection_log.close()
+    if hard_negative_miner is not None:
+        hard_negative_miner.close()
+    if alert_dispatcher is not None:
+        alert_dispatcher.close()  # alertas ainda na fila vão para o spool
+    if stream_server is not None:
+        stream_server.close()
     with capture_lock:
-        if cap is not None and cap.isOpened():
-            cap.release()
-            cap = None
+        if capture_group is not None:
+            capture_group.stop()
+            capture_group = None
             print("Webcam liberada.")
+
+
+def handle_signal(signum, frame):
+    """SIGINT/SIGTERM: encerra de forma limpa (no Tk, pela própria thread da janela)."""
+    print(f"Sinal {signal.Signals(signum).name} recebido.")
+    if root is not None:
+        root.after(0, on_closing)
+    shutdown_event.set()
+
+
+def on_closing():
+    """Função chamada ao fechar a janela Tkinter."""
+    if not running:
+        return
+    shutdown()
     if root is not None:
         try:
             root.destroy()
@@ -339,35 +871,9 @@ def on_closing():
     cv2.destroyAllWindows()
 
 
-# --- Inicialização ---
-if __name__ == "__main__":
-    # (Inicialização da fonte de vídeo)
-    initial_source_value = AVAILABLE_SOURCES.get(DEFAULT_SOURCE_NAME)
-    if initial_source_value is None:
-        print(f"Erro: Fonte padrão '{DEFAULT_SOURCE_NAME}' não encontrada.")
-        if AVAILABLE_SOURCES:
-            DEFAULT_SOURCE_NAME = list(AVAILABLE_SOURCES.keys())[0]
-            initial_source_value = AVAILABLE_SOURCES[DEFAULT_SOURCE_NAME]
-            print(f"Usando primeira fonte: '{DEFAULT_SOURCE_NAME}'")
-        else:
-            exit("Erro: Nenhuma fonte de vídeo definida.")
-    print(f"Abrindo fonte: {initial_source_value} ({DEFAULT_SOURCE_NAME})")
-    cap = cv2.VideoCapture(initial_source_value)
-    if not cap.isOpened():
-        exit(f"Erro Crítico: Não foi possível abrir {initial_source_value}")
-    print("Fonte inicial aberta.")
-    current_source_value = initial_source_value
-
-    # (Carregamento do Modelo Inicial)
-    if AVAILABLE_MODELS:
-        initial_model_name = list(AVAILABLE_MODELS.keys())[0]
-        initial_model_path = AVAILABLE_MODELS[initial_model_name]
-        load_model(initial_model_path)
-    else:
-        print("Aviso: Nenhum modelo definido.")
-        initial_model_name = "Nenhum Modelo"
-
-    # (Configuração da GUI Tkinter - igual à anterior)
+def run_gui(initial_model_name):
+    """Janela Tkinter: seletores de modelo/fonte e o vídeo renderizado pelo pipeline."""
+    global root, video_label, stats_label, model_combobox, source_combobox, pipeline
     root = tk.Tk()
     root.title("Detecção com Alerta Discord (Imagem)")
     root.protocol("WM_DELETE_WINDOW", on_closing)
@@ -385,16 +891,247 @@ if __name__ == "__main__":
     source_combobox = ttk.Combobox(
         top_frame, values=list(AVAILABLE_SOURCES.keys()), state="readonly", width=25
     )
-    source_combobox.set(DEFAULT_SOURCE_NAME)
+    source_combobox.set(DEFAULT_SOURCE_NAME if not MULTI_CAMERA_MODE else "Todas as fontes")
+    if MULTI_CAMERA_MODE:
+        source_combobox.configure(state="disabled")
     source_combobox.bind("<<ComboboxSelected>>", on_source_select)
     source_combobox.pack(side=tk.LEFT, padx=(0, 5))
-    video_label = tk.Label(root)
-    video_label.pack(padx=10, pady=(0, 10))
+    stats_label = tk.Label(root, anchor="w", font=("TkFixedFont", 8))
+    stats_label.pack(side=tk.BOTTOM, padx=10, pady=(0, 5), fill=tk.X)
+    # Área do vídeo com tamanho próprio: os frames são reduzidos para ela no render
+    video_frame = tk.Frame(root, width=DISPLAY_SIZE[0], height=DISPLAY_SIZE[1], bg="black")
+    video_frame.pack(padx=10, pady=(0, 10), fill=tk.BOTH, expand=True)
+    video_frame.pack_propagate(False)
+    video_frame.bind("<Configure>", on_display_resize)
+    video_label = tk.Label(video_frame, borderwidth=0, highlightthickness=0, bg="black")
+    video_label.pack(expand=True)
 
     # --- Iniciar ---
-    fps_start_time = time.time()
-    last_alert_time = 0
+    pipeline = build_pipeline()
+    pipeline.start()
     root.after(100, update_frame)
     root.mainloop()
 
+
+def run_headless():
+    """Modo serviço: pipeline sem Tk até SIGINT/SIGTERM."""
+    global pipeline
+    pipeline = build_pipeline(headless=True)
+    pipeline.start()
+    print("Modo serviço ativo (Ctrl+C ou SIGTERM para encerrar).")
+    # wait() com timeout: o handler do sinal roda entre as esperas
+    while not shutdown_event.wait(1.0):
+        pass
+    shutdown()
+
+
+# --- Inicialização ---
+if __name__ == "__main__":
+    # --config é lido antes dos demais argumentos para que ele defina os padrões deles
+    config_parser = argparse.ArgumentParser(add_help=False)
+    config_parser.add_argument(
+        "--config",
+        help="Arquivo JSON/YAML com as configurações (chaves = constantes do main.py em minúsculas)",
+    )
+    config_args, _ = config_parser.parse_known_args()
+    if config_args.config:
+        try:
+            changed = apply_config(load_config(config_args.config), globals())
+        except (OSError, ValueError, ImportError) as e:
+            exit(f"Erro na configuração {config_args.config}: {e}")
+        print(f"Configuração {config_args.config}: {', '.join(changed) or 'nenhuma alteração'}")
+
+    parser = argparse.ArgumentParser(
+        description="Detecção de objetos cortantes com alerta no Discord", parents=[config_parser]
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        default=HEADLESS,
+        help="Roda como serviço, sem janela (captura, detecção e alertas)",
+    )
+    parser.add_argument(
+        "--multi",
+        action="store_true",
+        help="Abre todas as fontes de AVAILABLE_SOURCES ao mesmo tempo (inferência em lote)",
+    )
+    parser.add_argument(
+        "--detection-log",
+        default=DETECTION_LOG_DIR,
+        help="Pasta para o registro colunar de detecções (fonte, frame, classe, confiança, caixa)",
+    )
+    parser.add_argument(
+        "--mine-dir",
+        default=HARD_NEGATIVE_DIR,
+        help="Pasta onde guardar frames alertados e incertos (sem duplicatas) para revisão e re-treino",
+    )
+    parser.add_argument(
+        "--motion-gate",
+        nargs="?",
+        const=MOTION_METHOD,
+        default=MOTION_METHOD if MOTION_GATE_ENABLED else None,
+        choices=MOTION_METHODS,
+        help="Pula a inferência em frames sem movimento (diff ou mog2)",
+    )
+    parser.add_argument(
+        "--motion-regions",
+        action="store_true",
+        default=MOTION_REGIONS_ENABLED,
+        help="Com --motion-gate, roda o modelo só no recorte das regiões com movimento",
+    )
+    parser.add_argument(
+        "--tiling",
+        action="store_true",
+        default=TILING_ENABLED,
+        help="Inferência em blocos nas fontes de TILED_SOURCES (objetos pequenos em alta resolução)",
+    )
+    parser.add_argument(
+        "--track",
+        nargs="?",
+        type=int,
+        const=TRACKING_DETECT_EVERY,
+        default=TRACKING_DETECT_EVERY if TRACKING_ENABLED else None,
+        metavar="K",
+        help="Rastreia objetos (ids estáveis) e roda o YOLO só a cada K frames",
+    )
+    parser.add_argument(
+        "--adaptive",
+        nargs="?",
+        type=float,
+        const=ADAPTIVE_TARGET_FPS,
+        default=ADAPTIVE_TARGET_FPS if ADAPTIVE_ENABLED else None,
+        metavar="FPS",
+        help="Ajusta passo de inferência, imgsz e modelo para manter o FPS alvo por fonte",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="Porta do endpoint de métricas (formato Prometheus) em 127.0.0.1",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        type=float,
+        default=METRICS_LOG_INTERVAL,
+        metavar="SEGUNDOS",
+        help="Imprime um resumo das métricas no console a cada N segundos",
+    )
+    parser.add_argument("--instance", default=METRICS_INSTANCE, help="Nome da instância nas métricas")
+    parser.add_argument(
+        "--stream-port",
+        type=int,
+        default=STREAM_PORT,
+        help="Porta do stream MJPEG dos frames anotados (visualização pelo navegador)",
+    )
+    args = parser.parse_args()
+    MULTI_CAMERA_MODE = MULTI_CAMERA_MODE or args.multi
+    if not args.headless and tk is None:
+        exit("Erro: Tkinter não está disponível. Use --headless para rodar sem janela.")
+    build_components()
+    if args.instance:
+        metrics.instance = args.instance
+    metrics.add_collector(collect_metrics)
+    if args.metrics_port:
+        serve_metrics(metrics, args.metrics_port)
+        print(f"Métricas em http://127.0.0.1:{args.metrics_port}/metrics")
+    if args.metrics_log:
+        metrics.start_log(args.metrics_log)
+    if args.stream_port:
+        stream_server = StreamServer(
+            args.stream_port,
+            host=STREAM_HOST,
+            max_fps=STREAM_MAX_FPS,
+            jpeg_quality=STREAM_JPEG_QUALITY,
+            token=STREAM_TOKEN,
+            title=metrics.instance,
+        )
+        print(f"Stream MJPEG em http://{STREAM_HOST}:{stream_server.port}/")
+    if args.adaptive:
+        adaptive_controller = AdaptiveController(
+            target_fps=args.adaptive,
+            imgsz_levels=ADAPTIVE_IMGSZ_LEVELS,
+            max_stride=ADAPTIVE_MAX_STRIDE,
+            model_levels=ADAPTIVE_MODELS,
+        )
+        print(f"Controle adaptativo ativo (alvo de {args.adaptive:.0f} FPS por fonte).")
+    if args.track:
+        tracking_enabled = True
+        TRACKING_DETECT_EVERY = max(1, args.track)
+        print(f"Rastreamento ativo (YOLO a cada {TRACKING_DETECT_EVERY} frames).")
+    if DISCORD_WEBHOOK_URL:
+        alert_dispatcher = AlertDispatcher(
+            DISCORD_WEBHOOK_URL,
+            spool_dir=ALERT_SPOOL_DIR,
+            image_format=ALERT_IMAGE_FORMAT,
+            max_width=ALERT_IMAGE_MAX_WIDTH,
+        )
+    else:
+        print("Aviso: DISCORD_WEBHOOK_URL não definida; alertas serão apenas exibidos no console.")
+    if args.tiling:
+        tilers = {name: TiledInference(**config) for name, config in TILED_SOURCES.items()}
+        print(f"Inferência em blocos ativa para: {', '.join(tilers) or 'nenhuma fonte'}.")
+    if args.motion_gate:
+        motion_gate = MotionGate(
+            method=args.motion_gate,
+            min_area_ratio=MOTION_MIN_AREA,
+            refresh_interval=MOTION_REFRESH_SECONDS,
+            return_regions=args.motion_regions,
+        )
+        regions_note = ", inferência só nas regiões com movimento" if args.motion_regions else ""
+        print(f"Filtro de movimento ativo ({args.motion_gate}{regions_note}).")
+    if args.detection_log:
+        detection_log = DetectionLog(args.detection_log)
+        print(f"Registro de detecções em: {args.detection_log} ({detection_log.format})")
+    if args.mine_dir:
+        hard_negative_miner = HardNegativeMiner(
+            args.mine_dir,
+            TARGET_CLASSES,
+            min_confidence=HARD_NEGATIVE_MIN_CONFIDENCE,
+            max_confidence=ALERT_THRESHOLD,
+            interval=HARD_NEGATIVE_INTERVAL,
+            max_distance=HARD_NEGATIVE_MAX_DISTANCE,
+        )
+        stored = hard_negative_miner.stats()["stored"]
+        print(f"Mineração de exemplos difíceis em: {args.mine_dir} ({stored} frames já guardados)")
+
+    if MULTI_CAMERA_MODE:
+        # (Modo multi-câmera: todas as fontes, um único modelo compartilhado)
+        print(f"Modo multi-câmera: abrindo {len(AVAILABLE_SOURCES)} fontes...")
+        if not open_sources(AVAILABLE_SOURCES):
+            exit("Erro Crítico: Nenhuma fonte de vídeo pôde ser aberta.")
+    else:
+        # (Inicialização da fonte de vídeo)
+        initial_source_value = AVAILABLE_SOURCES.get(DEFAULT_SOURCE_NAME)
+        if initial_source_value is None:
+            print(f"Erro: Fonte padrão '{DEFAULT_SOURCE_NAME}' não encontrada.")
+            if AVAILABLE_SOURCES:
+                DEFAULT_SOURCE_NAME = list(AVAILABLE_SOURCES.keys())[0]
+                initial_source_value = AVAILABLE_SOURCES[DEFAULT_SOURCE_NAME]
+                print(f"Usando primeira fonte: '{DEFAULT_SOURCE_NAME}'")
+            else:
+                exit("Erro: Nenhuma fonte de vídeo definida.")
+        print(f"Abrindo fonte: {initial_source_value} ({DEFAULT_SOURCE_NAME})")
+        if not open_sources({DEFAULT_SOURCE_NAME: initial_source_value}):
+            exit(f"Erro Crítico: Não foi possível abrir {initial_source_value}")
+        print("Fonte inicial aberta.")
+
+    # (Carregamento do Modelo Inicial)
+    if AVAILABLE_MODELS:
+        initial_model_name = list(AVAILABLE_MODELS.keys())[0]
+        if DEFAULT_MODEL_NAME in AVAILABLE_MODELS:
+            initial_model_name = DEFAULT_MODEL_NAME
+        if adaptive_controller is not None and adaptive_controller.model_entry is not None:
+            initial_model_name = adaptive_controller.model_entry  # nível inicial do controle
+        load_model(AVAILABLE_MODELS[initial_model_name])
+    else:
+        print("Aviso: Nenhum modelo definido.")
+        initial_model_name = "Nenhum Modelo"
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+    if args.headless:
+        run_headless()
+    else:
+        run_gui(initial_model_name)
+
     print("Programa encerrado.")
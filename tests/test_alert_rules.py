@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from utils.alert_rules import AlertRules
+from utils.postprocess import Detections
+
+NAMES = {0: "knife", 1: "person"}
+
+
+def frame(*detections):
+    """Detections de um frame a partir de pares (classe, confiança)."""
+    if not detections:
+        return Detections.empty(NAMES)
+    ids = {name: class_id for class_id, name in NAMES.items()}
+    return Detections(
+        np.tile(np.array([[10, 10, 50, 50]], dtype=np.float32), (len(detections), 1)),
+        np.array([conf for _, conf in detections], dtype=np.float32),
+        np.array([ids[name] for name, _ in detections], dtype=np.int64),
+        NAMES,
+    )
+
+
+def test_confirms_on_n_of_m_frames():
+    rules = AlertRules(["knife"], threshold=0.7, confirm_frames=3, window_frames=5)
+    sequence = [("knife", 0.9)], [], [("knife", 0.8)], [], [("knife", 0.75)]
+    results = [rules.update("cam", frame(*detections), now=index) for index, detections in enumerate(sequence)]
+    assert results[:4] == [[], [], [], []]
+    assert len(results[4]) == 1
+    assert results[4][0]["class"] == "knife" and results[4][0]["fire"]
+
+
+def test_hits_leave_the_window():
+    rules = AlertRules(["knife"], confirm_frames=3, window_frames=3)
+    sequence = [("knife", 0.9)], [("knife", 0.9)], [], [("knife", 0.9)]
+    assert all(not rules.update("cam", frame(*detections), now=index) for index, detections in enumerate(sequence))
+
+
+def test_ignores_low_confidence_and_other_classes():
+    rules = AlertRules(["knife"], threshold=0.7, confirm_frames=1, window_frames=1)
+    assert rules.update("cam", frame(("knife", 0.5)), now=0) == []
+    assert rules.update("cam", frame(("person", 0.99)), now=1) == []
+
+
+def test_cooldown_suppresses_once_per_key():
+    rules = AlertRules(["knife"], confirm_frames=1, window_frames=1, cooldown_seconds=10)
+    first = rules.update("cam", frame(("knife", 0.9)), now=0)
+    assert first[0]["fire"] and not first[0]["suppressed"]
+    held = [rules.update("cam", frame(("knife", 0.9)), now=now)[0] for now in (1, 2, 3)]
+    assert [rule["fire"] for rule in held] == [False, False, False]
+    assert [rule["suppressed"] for rule in held] == [True, False, False]
+    assert rules.update("cam", frame(("knife", 0.9)), now=10)[0]["fire"]
+    assert rules.stats()["fired"] == 2 and rules.stats()["suppressed"] == 1
+
+
+def test_sources_have_independent_cooldowns():
+    rules = AlertRules(["knife"], confirm_frames=1, window_frames=1, cooldown_seconds=60)
+    assert rules.update("cam1", frame(("knife", 0.9)), now=0)[0]["fire"]
+    assert rules.update("cam2", frame(("knife", 0.9)), now=1)[0]["fire"]
+
+
+def test_release_threshold_keeps_alert_confirmed():
+    rules = AlertRules(["knife"], threshold=0.8, release_threshold=0.4, confirm_frames=2, window_frames=3,
+                       cooldown_seconds=0)
+    rules.update("cam", frame(("knife", 0.9)), now=0)
+    assert rules.update("cam", frame(("knife", 0.9)), now=1)
+    # Abaixo do limiar de confirmação, mas acima do de liberação: continua confirmado
+    assert rules.update("cam", frame(("knife", 0.5)), now=2)
+    for now in (3, 4, 5):
+        rules.update("cam", frame(), now=now)
+    assert rules.update("cam", frame(("knife", 0.5)), now=6) == []
+
+
+def test_reset_forgets_source_state():
+    rules = AlertRules(["knife"], confirm_frames=2, window_frames=2)
+    rules.update("cam", frame(("knife", 0.9)), now=0)
+    rules.reset("cam")
+    assert rules.update("cam", frame(("knife", 0.9)), now=1) == []
+
+
+def test_confirm_frames_must_fit_window():
+    with pytest.raises(ValueError):
+        AlertRules(["knife"], confirm_frames=4, window_frames=3)
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from utils.config import apply_config, load_config
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_apply_config_overrides_only_present_keys():
+    namespace = {"ALERT_THRESHOLD": 0.7, "ALERT_CLASSES": ["knife"], "HEADLESS": False}
+    changed = apply_config({"alert_threshold": 0.8, "headless": True}, namespace)
+    assert sorted(changed) == ["ALERT_THRESHOLD", "HEADLESS"]
+    assert namespace == {"ALERT_THRESHOLD": 0.8, "ALERT_CLASSES": ["knife"], "HEADLESS": True}
+
+
+def test_apply_config_turns_lists_into_tuples_for_tuple_defaults():
+    namespace = {"DISPLAY_SIZE": (960, 540), "ALERT_CLASSES": ["knife"]}
+    apply_config({"display_size": [1280, 720], "alert_classes": ["knife", "scissors"]}, namespace)
+    assert namespace["DISPLAY_SIZE"] == (1280, 720)
+    assert namespace["ALERT_CLASSES"] == ["knife", "scissors"]
+
+
+def test_apply_config_rejects_unknown_keys():
+    namespace = {"ALERT_THRESHOLD": 0.7}
+    with pytest.raises(ValueError, match="alert_treshold"):
+        apply_config({"alert_treshold": 0.8}, namespace)
+    assert namespace == {"ALERT_THRESHOLD": 0.7}
+
+
+def test_load_config_json(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"headless": True}), encoding="utf-8")
+    assert load_config(str(path)) == {"headless": True}
+
+
+def test_load_config_requires_object(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("[1, 2]", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_config(str(path))
+
+
+def test_example_config_matches_main_constants():
+    # Todas as chaves do exemplo precisam existir no main.py (sem importá-lo: Tkinter/YOLO)
+    with open(os.path.join(ROOT, "config.example.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    with open(os.path.join(ROOT, "main.py"), "r", encoding="utf-8") as f:
+        source = f.read()
+    missing = [key for key in config if f"\n{key.upper()} = " not in source]
+    assert missing == []
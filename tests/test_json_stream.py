@@ -0,0 +1,40 @@
+import io
+import json
+
+import pytest
+
+from utils.model_coach import _JsonStream, iter_json_arrays
+
+DOCUMENT = {
+    "info": {"version": 1.25, "description": "teste"},
+    "images": [{"id": 12345, "width": 640.5, "file_name": "a b.jpg"}, {"id": 7, "width": 1e-3}],
+    "ids": [12345, 12.5, -0.75, 3e5, 1e-3, 7, True, None, "texto"],
+    "empty": [],
+    "count": 1234567,
+    "ratio": 98.25,
+}
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 24))
+def test_iter_json_arrays_matches_json_load(tmp_path, monkeypatch, chunk_size):
+    path = tmp_path / "document.json"
+    path.write_text(json.dumps(DOCUMENT), encoding="utf-8")
+    # Blocos minúsculos: números como 12345 e 12.5 são cortados no meio
+    monkeypatch.setattr(_JsonStream.__init__, "__defaults__", (chunk_size,))
+
+    items = {}
+    for key, item in iter_json_arrays(str(path), ("images", "ids", "empty")):
+        items.setdefault(key, []).append(item)
+
+    with open(path, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    assert items == {"images": expected["images"], "ids": expected["ids"]}
+
+
+@pytest.mark.parametrize("text", ["12345", "12.5", "-0.75", "3e5", "1E-3"])
+def test_scalar_split_at_chunk_boundary(text):
+    for chunk_size in range(1, len(text) + 1):
+        stream = _JsonStream(io.StringIO(f"[{text}, 1]"), chunk_size=chunk_size)
+        stream.take("[")
+        assert stream.value() == json.loads(text)
+        assert stream.take(",]") == ","
@@ -0,0 +1,48 @@
+import numpy as np
+
+from utils.motion import merge_region_detections, region_crop
+from utils.postprocess import Detections
+
+NAMES = {0: "knife", 1: "scissors"}
+
+
+def detections(boxes, conf, cls, track_id=None):
+    return Detections(np.array(boxes, dtype=np.float32).reshape(-1, 4), np.array(conf, dtype=np.float32),
+                      np.array(cls, dtype=np.int64), NAMES, track_id=track_id)
+
+
+def test_region_crop_without_regions_uses_full_frame():
+    assert region_crop([], 640, 480) is None
+
+
+def test_region_crop_pads_small_regions_to_min_size():
+    assert region_crop([(100, 100, 120, 120)], 640, 480, min_size=160) == (30, 30, 190, 190)
+
+
+def test_region_crop_clips_to_frame():
+    x1, y1, x2, y2 = region_crop([(0, 0, 30, 30)], 640, 480, min_size=160)
+    assert (x1, y1) == (0, 0) and x2 <= 640 and y2 <= 480
+
+
+def test_region_crop_covers_union_of_regions():
+    crop = region_crop([(100, 100, 150, 150), (300, 200, 350, 260)], 1920, 1080, padding=0.0, min_size=0)
+    assert crop == (100, 100, 350, 260)
+
+
+def test_region_crop_too_large_falls_back_to_full_frame():
+    assert region_crop([(0, 0, 600, 400)], 640, 480, max_area_ratio=0.5) is None
+
+
+def test_merge_region_detections_offsets_and_keeps_outside_boxes():
+    previous = detections([[0, 0, 50, 50], [110, 110, 130, 130]], [0.9, 0.8], [1, 0], track_id=np.array([3, 4]))
+    new = detections([[5, 5, 20, 20]], [0.7], [0])
+    merged = merge_region_detections(new, (100, 100, 200, 200), previous)
+    # Caixa nova levada para o frame; a anterior dentro do recorte foi substituída
+    np.testing.assert_allclose(merged.xyxy, [[105, 105, 120, 120], [0, 0, 50, 50]])
+    assert merged.class_names() == ["knife", "scissors"]
+    assert merged.track_id is None
+
+
+def test_merge_region_detections_without_previous():
+    merged = merge_region_detections(Detections.empty(NAMES), (10, 10, 50, 50), None)
+    assert len(merged) == 0
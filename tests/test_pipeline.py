@@ -0,0 +1,50 @@
+import pytest
+
+from utils.capture import merge_batches
+from utils.pipeline import BLOCK, DROP_NEWEST, DROP_OLDEST, StageQueue
+
+
+def drain(stage_queue):
+    items = []
+    while (item := stage_queue.get(timeout=0)) is not None:
+        items.append(item)
+    return items
+
+
+def test_drop_oldest_keeps_newest_items():
+    stage_queue = StageQueue(maxsize=2, drop_policy=DROP_OLDEST)
+    assert all(stage_queue.put(item) for item in range(5))
+    assert drain(stage_queue) == [3, 4]
+    assert stage_queue.dropped == 3
+
+
+def test_drop_newest_rejects_incoming_items():
+    stage_queue = StageQueue(maxsize=2, drop_policy=DROP_NEWEST)
+    assert [stage_queue.put(item) for item in range(4)] == [True, True, False, False]
+    assert drain(stage_queue) == [0, 1]
+    assert stage_queue.dropped == 2
+
+
+def test_block_times_out_without_dropping():
+    stage_queue = StageQueue(maxsize=1, drop_policy=BLOCK)
+    assert stage_queue.put("a")
+    assert not stage_queue.put("b", timeout=0.01)
+    assert drain(stage_queue) == ["a"]
+    assert stage_queue.dropped == 0
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        StageQueue(drop_policy="fifo")
+
+
+def test_merge_keeps_newest_packet_per_source():
+    stage_queue = StageQueue(maxsize=1, merge=merge_batches)
+    stage_queue.put([{"source": "cam1", "frame_id": 1}])
+    stage_queue.put([{"source": "cam2", "frame_id": 1}])
+    stage_queue.put([{"source": "cam1", "frame_id": 2}, {"source": "cam3", "frame_id": 1}])
+    batches = drain(stage_queue)
+    assert len(batches) == 1
+    assert {packet["source"]: packet["frame_id"] for packet in batches[0]} == {"cam1": 2, "cam2": 1, "cam3": 1}
+    # Só o frame substituído da cam1 conta como descartado
+    assert stage_queue.dropped == 1
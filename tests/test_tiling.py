@@ -0,0 +1,59 @@
+import types
+
+import numpy as np
+
+from utils.tiling import TiledInference, merge_detections, roi_to_pixels, tile_windows
+
+
+def test_merge_detections_suppresses_contained_box_by_ios():
+    # Caixa parcial (emenda de blocos) dentro da caixa completa: IoU baixo, IoS = 1
+    xyxy = np.array([[0, 0, 100, 40], [60, 0, 100, 40], [200, 200, 220, 220]], dtype=np.float32)
+    conf = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    cls = np.array([0, 0, 0])
+    assert merge_detections(xyxy, conf, cls, threshold=0.5).tolist() == [0, 2]
+
+
+def test_merge_detections_keeps_other_classes_and_orders_by_confidence():
+    xyxy = np.array([[0, 0, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    conf = np.array([0.6, 0.9], dtype=np.float32)
+    assert merge_detections(xyxy, conf, np.array([0, 1]), threshold=0.5).tolist() == [1, 0]
+    assert merge_detections(xyxy, conf, np.array([1, 1]), threshold=0.5).tolist() == [1]
+
+
+def test_tile_windows_cover_frame_with_overlap():
+    windows = tile_windows(1000, 500, tile_size=400, overlap=0.25)
+    assert windows[0] == (0, 0, 400, 400)
+    assert max(x2 for _, _, x2, _ in windows) == 1000
+    assert max(y2 for _, _, _, y2 in windows) == 500
+    assert all(x2 - x1 == 400 and y2 - y1 == 400 for x1, y1, x2, y2 in windows)
+    assert tile_windows(300, 200, tile_size=640) == [(0, 0, 300, 200)]
+
+
+def test_roi_to_pixels_accepts_fractions():
+    assert roi_to_pixels((0.5, 0.0, 1.0, 0.5), 1920, 1080) == (960, 0, 1920, 540)
+    assert roi_to_pixels((-5, 10, 5000, 500), 1920, 1080) == (0, 10, 1920, 500)
+
+
+def test_tiled_inference_offsets_and_merges_boxes():
+    class Boxes:
+        def __init__(self, data):
+            self.data = data
+
+        def __len__(self):
+            return len(self.data)
+
+    calls = []
+
+    def model(crops, verbose=False, **kwargs):
+        calls.append((len(crops), kwargs))
+        # Cada bloco vê a mesma caixa no seu canto superior esquerdo
+        return [
+            types.SimpleNamespace(names={0: "knife"}, boxes=Boxes(np.array([[0, 0, 10, 10, 0.9, 0]], np.float32)))
+            for _ in crops
+        ]
+
+    tiler = TiledInference(tile_size=100, overlap=0.0, include_full_frame=False)
+    detections = tiler(model, [np.zeros((100, 200, 3), np.uint8)], imgsz=320)[0]
+    assert calls == [(2, {"imgsz": 320})]
+    assert sorted(detections.xyxy[:, 0].tolist()) == [0.0, 100.0]
+    assert detections.class_names() == ["knife", "knife"]
@@ -0,0 +1,71 @@
+import numpy as np
+
+from utils.postprocess import Detections
+from utils.tracking import IouTracker, box_iou, greedy_match
+
+NAMES = {0: "knife", 1: "scissors"}
+
+
+def frame(*boxes):
+    """Detections a partir de tuplas (x1, y1, x2, y2, confiança, classe)."""
+    data = np.array(boxes, dtype=np.float32).reshape(-1, 6)
+    return Detections(data[:, :4].copy(), data[:, 4].copy(), data[:, 5].astype(np.int64), NAMES)
+
+
+def test_box_iou():
+    a = np.array([[0, 0, 10, 10]], dtype=np.float32)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+    np.testing.assert_allclose(box_iou(a, b), [[1.0, 50 / 150, 0.0]], rtol=1e-6)
+    assert box_iou(a, np.zeros((0, 4), dtype=np.float32)).shape == (1, 0)
+
+
+def test_greedy_match_uses_each_row_and_column_once():
+    iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+    assert greedy_match(iou, 0.3) == [(0, 0)]
+    assert greedy_match(np.array([[0.9, 0.0], [0.0, 0.4]]), 0.3) == [(0, 0), (1, 1)]
+
+
+def test_track_needs_min_hits_and_keeps_id():
+    tracker = IouTracker(min_hits=2)
+    assert len(tracker.update(frame((0, 0, 20, 20, 0.9, 0)))) == 0
+    ids = []
+    for step in range(1, 5):
+        out = tracker.update(frame((step * 2, 0, step * 2 + 20, 20, 0.9, 0)))
+        ids.extend(out.track_id.tolist())
+    assert ids == [1, 1, 1, 1]
+
+
+def test_objects_of_different_classes_get_distinct_ids():
+    tracker = IouTracker(min_hits=1)
+    out = tracker.update(frame((0, 0, 20, 20, 0.9, 0), (0, 0, 20, 20, 0.9, 1)))
+    assert sorted(out.track_id.tolist()) == [1, 2]
+    out = tracker.update(frame((1, 0, 21, 20, 0.9, 1), (1, 0, 21, 20, 0.9, 0)))
+    assert dict(zip(out.cls.tolist(), out.track_id.tolist())) == {0: 1, 1: 2}
+
+
+def test_predict_moves_boxes_by_velocity():
+    tracker = IouTracker(min_hits=1, smoothing=1.0, velocity_smoothing=1.0)
+    for step in range(3):
+        tracker.update(frame((step * 10, 0, step * 10 + 40, 40, 0.9, 0)))
+    predicted = tracker.predict()
+    np.testing.assert_allclose(predicted.xyxy, [[30, 0, 70, 40]], atol=1e-4)
+    assert predicted.track_id.tolist() == [1]
+
+
+def test_low_confidence_only_extends_existing_tracks():
+    tracker = IouTracker(min_hits=1, high_threshold=0.5, low_threshold=0.1)
+    assert len(tracker.update(frame((0, 0, 20, 20, 0.3, 0)))) == 0
+    tracker.update(frame((0, 0, 20, 20, 0.9, 0)))
+    out = tracker.update(frame((1, 0, 21, 20, 0.3, 0)))
+    assert out.track_id.tolist() == [1]
+    assert len(tracker) == 1
+
+
+def test_tracks_are_dropped_after_max_misses():
+    tracker = IouTracker(min_hits=1, max_misses=2, coast_misses=1)
+    tracker.update(frame((0, 0, 20, 20, 0.9, 0)))
+    assert len(tracker.update(frame())) == 1  # ainda exibido (coast_misses)
+    assert len(tracker.update(frame())) == 0
+    assert len(tracker) == 1
+    tracker.update(frame())
+    assert len(tracker) == 0
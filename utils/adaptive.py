@@ -0,0 +1,177 @@
+# -----------------------------------------------------------------------------
+# Controle adaptativo da taxa de inferência pela latência medida
+# -----------------------------------------------------------------------------
+# Em vez de atrasos fixos, o controlador mede quanto a inferência realmente
+# custa e escolhe um "nível" de qualidade para segurar o FPS alvo: a cada
+# nível o custo estimado cai (mais frames pulados entre inferências, imgsz
+# menor ou um modelo menor). Os níveis são ordenados pelo custo estimado
+# (modelo x (imgsz/640)^2 / passo) e o controlador anda um nível por vez:
+#   - desce quando a latência média passa do orçamento do frame;
+#   - sobe quando a latência prevista no nível melhor cabe com folga.
+# Enquanto há detecção ativa em uma fonte, ela volta a inferir todo frame.
+# Modelos que só aceitam alguns imgsz (grafos exportados, INT8 calibrado em um
+# tamanho) informam os seus via set_model_sizes; os outros níveis são removidos.
+import time
+
+
+class AdaptiveController:
+    """Escolhe passo de inferência, imgsz e modelo para manter `target_fps` por fonte."""
+
+    def __init__(self, target_fps=10.0, imgsz_levels=(640, 512, 416, 320), max_stride=4,
+                 model_levels=None, model_cost_ratio=0.5, headroom=0.8, adjust_interval=1.0,
+                 boost_seconds=3.0, smoothing=0.2, settle_seconds=5.0):
+        self.target_fps = target_fps
+        self.model_levels = list(model_levels) if model_levels else [None]
+        self.headroom = headroom
+        self.adjust_interval = adjust_interval
+        self.boost_seconds = boost_seconds
+        self.smoothing = smoothing
+        self.settle_seconds = settle_seconds
+
+        # Custo relativo: cada modelo seguinte custa ~model_cost_ratio do anterior
+        levels = []
+        for model_index in range(len(self.model_levels)):
+            for imgsz in imgsz_levels:
+                for stride in range(1, max_stride + 1):
+                    cost = (model_cost_ratio ** model_index) * (imgsz / imgsz_levels[0]) ** 2 / stride
+                    levels.append({"model": model_index, "imgsz": imgsz, "stride": stride, "cost": cost})
+        # Do mais caro (melhor qualidade) para o mais barato; no empate, menor passo
+        self._all_levels = sorted(levels, key=lambda level: (-level["cost"], level["stride"]))
+        self._model_sizes = {}  # índice do modelo -> imgsz aceitos (ausente = todos)
+        self.levels = list(self._all_levels)
+        self.level = 0
+        self.latency_ms = None  # média móvel da latência de uma chamada do modelo
+        self._last_adjust = time.monotonic()
+        self._sources = {}  # fonte -> {"count", "boost_until", "inferred", "window_start", "fps"}
+        self.changes = 0
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    @property
+    def imgsz(self):
+        return self.current["imgsz"]
+
+    @property
+    def model_index(self):
+        return self.current["model"]
+
+    @property
+    def model_entry(self):
+        return self.model_levels[self.model_index]
+
+    def set_model_sizes(self, model_index, sizes):
+        """Restringe os níveis do modelo `model_index` aos imgsz que ele aceita.
+
+        `sizes=None` libera todos. O nível atual é mantido se continuar válido;
+        senão passa para o primeiro nível restante de custo igual ou menor.
+        """
+        if sizes is None:
+            self._model_sizes.pop(model_index, None)
+        else:
+            self._model_sizes[model_index] = set(sizes)
+        current = self.current
+        levels = [
+            level for level in self._all_levels
+            if level["imgsz"] in self._model_sizes.get(level["model"], (level["imgsz"],))
+        ]
+        if not levels:
+            return
+        self.levels = levels
+        if current in levels:
+            self.level = levels.index(current)
+        else:
+            cheaper = [index for index, level in enumerate(levels) if level["cost"] <= current["cost"]]
+            self.level = cheaper[0] if cheaper else len(levels) - 1
+
+    def _source(self, source):
+        state = self._sources.get(source)
+        if state is None:
+            state = {"count": 0, "boost_until": 0.0, "inferred": 0, "window_start": time.monotonic(), "fps": 0.0}
+            self._sources[source] = state
+        return state
+
+    def stride(self, source, now=None):
+        now = time.monotonic() if now is None else now
+        state = self._source(source)
+        return 1 if now < state["boost_until"] else self.current["stride"]
+
+    def should_infer(self, source, now=None):
+        """True se este frame da fonte deve passar pelo modelo."""
+        now = time.monotonic() if now is None else now
+        state = self._source(source)
+        stride = self.stride(source, now)
+        infer = state["count"] % stride == 0
+        state["count"] += 1
+        if infer:
+            state["inferred"] += 1
+        elapsed = now - state["window_start"]
+        if elapsed >= 1.0:
+            state["fps"] = state["inferred"] / elapsed
+            state["inferred"] = 0
+            state["window_start"] = now
+        return infer
+
+    def mark_detection(self, source, now=None):
+        """Detecção ativa: a fonte volta a inferir todo frame por `boost_seconds`."""
+        now = time.monotonic() if now is None else now
+        self._source(source)["boost_until"] = now + self.boost_seconds
+
+    def observe(self, latency_ms, now=None):
+        """Registra a duração de uma chamada do modelo e ajusta o nível se preciso.
+
+        Retorna True quando o nível mudou (o chamador pode trocar o modelo).
+        """
+        now = time.monotonic() if now is None else now
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        if now - self._last_adjust < self.adjust_interval:
+            return False
+        self._last_adjust = now
+
+        budget_ms = 1000.0 / self.target_fps
+        # Custo médio por frame exibido: a inferência é dividida pelo passo
+        per_frame_ms = self.latency_ms / self.current["stride"]
+        previous = self.level
+        if per_frame_ms > budget_ms and self.level < len(self.levels) - 1:
+            self.level += 1
+        elif self.level > 0:
+            better = self.levels[self.level - 1]
+            # Latência prevista no nível melhor, escalada pelo custo relativo
+            predicted = per_frame_ms * better["cost"] / self.current["cost"]
+            if predicted < budget_ms * self.headroom:
+                self.level -= 1
+        if self.level == previous:
+            return False
+        if self.levels[previous]["model"] == self.current["model"]:
+            # Mesma rede: a latência escala com (imgsz)^2; o passo não muda a latência da chamada
+            self.latency_ms *= (self.current["imgsz"] / self.levels[previous]["imgsz"]) ** 2
+        else:
+            # Modelo novo: mede de novo depois da troca (carga + aquecimento)
+            self.latency_ms = None
+            self._last_adjust = now + self.settle_seconds
+        self.changes += 1
+        return True
+
+    def reset(self, source=None):
+        if source is None:
+            self._sources.clear()
+        else:
+            self._sources.pop(source, None)
+
+    def stats(self, source=None):
+        stats = {
+            "level": self.level,
+            "stride": self.current["stride"],
+            "imgsz": self.current["imgsz"],
+            "model": self.current["model"],
+            "latency_ms": round(self.latency_ms or 0.0, 1),
+            "changes": self.changes,
+        }
+        if source is not None:
+            stats["stride"] = self.stride(source)
+            stats["inference_fps"] = round(self._source(source)["fps"], 1)
+        return stats
@@ -0,0 +1,143 @@
+# -----------------------------------------------------------------------------
+# Regras de alerta: confirmação temporal, cooldown e histerese por chave
+# -----------------------------------------------------------------------------
+# Cada chave (fonte, classe, id de rastreamento opcional) tem o próprio estado:
+# um alerta só é confirmado quando a classe aparece em N dos últimos M frames
+# daquela fonte, e cada chave tem seu próprio cooldown, então uma faca em uma
+# câmera não silencia as outras. A histerese evita que o alerta "pisque":
+# para confirmar é preciso `threshold`, para continuar confirmado basta
+# `release_threshold` (menor) em pelo menos `release_hits` dos M frames.
+#
+# Só as chaves vistas no frame ou ainda ativas na fonte são avaliadas; chaves
+# sem nenhuma ocorrência na janela são descartadas.
+import threading
+import time
+from collections import deque
+
+
+class AlertRules:
+    """Motor de regras de alerta compartilhado pelo app ao vivo e pelo processamento em lote."""
+
+    def __init__(self, classes, threshold=0.7, release_threshold=None, confirm_frames=3,
+                 window_frames=5, release_hits=1, cooldown_seconds=60.0):
+        if not 1 <= confirm_frames <= window_frames:
+            raise ValueError("confirm_frames deve estar entre 1 e window_frames")
+        self.classes = {name.lower() for name in classes}
+        self.threshold = threshold
+        self.release_threshold = threshold if release_threshold is None else release_threshold
+        self.confirm_frames = confirm_frames
+        self.window_frames = window_frames
+        self.release_hits = release_hits
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._states = {}  # chave -> {"hits": deque, "count", "confirmed"}
+        self._keys_by_source = {}  # fonte -> chaves com estado
+        self._last_fired = {}  # chave -> instante do último alerta (sobrevive ao estado)
+        self._suppressed = set()  # chaves já contadas como suprimidas no cooldown atual
+        self.fired = 0
+        self.suppressed = 0
+
+    def _observations(self, source, detections, track_ids):
+        """Melhor detecção (confiança, índice) por chave no frame, acima do limiar menor."""
+        best = {}
+        names = detections.class_names()
+        for index, (name, confidence) in enumerate(zip(names, detections.conf)):
+            confidence = float(confidence)
+            if name.lower() not in self.classes or confidence < self.release_threshold:
+                continue
+            track_id = None if track_ids is None else int(track_ids[index])
+            key = (source, name, track_id)
+            if key not in best or confidence > best[key][0]:
+                best[key] = (confidence, index)
+        return best
+
+    def update(self, source, detections, now=None, track_ids=None):
+        """Avalia um frame da fonte e devolve as chaves confirmadas.
+
+        Cada item é um dicionário {"source", "class", "track_id", "confidence",
+        "index", "fire", "suppressed"}; "fire" indica que o alerta deve ser
+        enviado agora (o cooldown da chave já passou). "suppressed" é True uma
+        única vez por chave e cooldown: no primeiro frame em que um alerta
+        confirmado foi segurado pelo cooldown. `index` aponta para a detecção no
+        frame, ou None quando a chave segue confirmada pela histerese sem detecção.
+        """
+        now = time.time() if now is None else now
+        observations = self._observations(source, detections, track_ids)
+        confirmed = []
+        with self._lock:
+            keys = self._keys_by_source.setdefault(source, set())
+            keys.update(observations)
+            for key in list(keys):
+                state = self._states.get(key)
+                if state is None:
+                    state = {"hits": deque(maxlen=self.window_frames), "count": 0, "confirmed": False}
+                    self._states[key] = state
+                confidence, index = observations.get(key, (0.0, None))
+                needed = self.release_threshold if state["confirmed"] else self.threshold
+                hit = index is not None and confidence >= needed
+                if len(state["hits"]) == self.window_frames:
+                    state["count"] -= state["hits"][0]
+                state["hits"].append(hit)
+                state["count"] += hit
+
+                if state["confirmed"]:
+                    state["confirmed"] = state["count"] >= self.release_hits
+                else:
+                    state["confirmed"] = state["count"] >= self.confirm_frames
+                if not state["confirmed"] and state["count"] == 0:
+                    del self._states[key]
+                    keys.discard(key)
+                    self._suppressed.discard(key)
+                    continue
+                if not state["confirmed"]:
+                    continue
+
+                fire = now - self._last_fired.get(key, float("-inf")) >= self.cooldown_seconds
+                suppressed = False
+                if fire:
+                    self._last_fired[key] = now
+                    self._suppressed.discard(key)
+                    self.fired += 1
+                elif index is not None and key not in self._suppressed:
+                    suppressed = True
+                    self._suppressed.add(key)
+                    self.suppressed += 1
+                confirmed.append(
+                    {
+                        "source": key[0],
+                        "class": key[1],
+                        "track_id": key[2],
+                        "confidence": confidence,
+                        "index": index,
+                        "fire": fire,
+                        "suppressed": suppressed,
+                    }
+                )
+            self._prune(now)
+        return confirmed
+
+    def _prune(self, now):
+        """Esquece cooldowns já vencidos de chaves sem estado (ids de rastreamento antigos)."""
+        if len(self._last_fired) <= len(self._states) + 64:
+            return
+        for key, fired_at in list(self._last_fired.items()):
+            if key not in self._states and now - fired_at >= self.cooldown_seconds:
+                del self._last_fired[key]
+
+    def reset(self, source=None):
+        """Descarta o estado de uma fonte (ou de todas), ex.: ao trocar de câmera."""
+        with self._lock:
+            sources = list(self._keys_by_source) if source is None else [source]
+            for name in sources:
+                for key in self._keys_by_source.pop(name, set()):
+                    self._states.pop(key, None)
+                    self._suppressed.discard(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "active_keys": len(self._states),
+                "confirmed": sum(state["confirmed"] for state in self._states.values()),
+                "fired": self.fired,
+                "suppressed": self.suppressed,
+            }
@@ -0,0 +1,389 @@
+# -----------------------------------------------------------------------------
+# Envio de alertas para o webhook do Discord em segundo plano
+# -----------------------------------------------------------------------------
+# O loop de vídeo só enfileira o alerta (fila limitada; com a fila cheia o
+# alerta vai para uma fila de transbordo que a thread grava no spool, sem
+# custo para quem chamou); uma thread própria codifica a imagem (JPEG reduzido por padrão), envia com uma sessão HTTP
+# persistente, repete com espera exponencial em falhas de rede/5xx e respeita
+# os cabeçalhos de limite de taxa do Discord (429, X-RateLimit-*). Alertas que
+# não puderam ser entregues vão para uma pasta de spool e são reenviados depois.
+#
+# Teste com um webhook local (simula 429 e 500 antes de aceitar):
+#   python -m utils.alerts --test-server
+import argparse
+import collections
+import glob
+import json
+import os
+import queue
+import threading
+import time
+
+import cv2
+import requests
+from requests.adapters import HTTPAdapter
+
+IMAGE_FORMATS = ("jpg", "png")
+QUARANTINE_DIR = "quarantine"  # dentro do spool: alertas recusados ou ilegíveis (não reenviados)
+
+# Resultado de um envio
+SENT = "sent"
+FAILED = "failed"  # falha temporária (rede, 429/5xx esgotados, encerramento): vai para o spool
+REJECTED = "rejected"  # 4xx: o Discord nunca vai aceitar este alerta, vai para a quarentena
+
+
+def encode_alert_image(frame, image_format="jpg", jpeg_quality=80, max_width=1280):
+    """Reduz o frame para no máximo `max_width` px de largura e codifica (bytes, mime)."""
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"Formato de imagem inválido: {image_format}")
+    height, width = frame.shape[:2]
+    if max_width and width > max_width:
+        scale = max_width / width
+        frame = cv2.resize(frame, (max_width, int(height * scale)), interpolation=cv2.INTER_AREA)
+    if image_format == "jpg":
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+        mime = "image/jpeg"
+    else:
+        ok, buffer = cv2.imencode(".png", frame)
+        mime = "image/png"
+    if not ok:
+        raise ValueError("Falha ao codificar a imagem do alerta")
+    return buffer.tobytes(), mime
+
+
+class AlertDispatcher:
+    """Fila de alertas com envio, novas tentativas e spool em disco."""
+
+    def __init__(self, webhook_url, queue_size=32, max_retries=4, backoff=1.0, timeout=15,
+                 spool_dir="data/alerts_spool", spool_retry_interval=60.0, image_format="jpg",
+                 jpeg_quality=80, max_width=1280):
+        self.webhook_url = webhook_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.spool_dir = spool_dir
+        self.spool_retry_interval = spool_retry_interval
+        self.image_format = image_format
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+
+        self.session = requests.Session()
+        # Um único host (discord.com): poucas conexões reaproveitadas via keep-alive
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._rate_limited_until = 0.0
+        self._last_spool_retry = 0.0
+        self._spool_index = 0
+        self._overflow = collections.deque()  # alertas que não couberam na fila: o worker grava no spool
+        self._stop = threading.Event()
+        self._lock = threading.Lock()  # contadores, nome dos arquivos do spool e alerta em andamento
+        self._in_flight = None  # alerta sendo enviado (guardado por close() se o envio não terminar)
+        self.sent = 0
+        self.failed = 0
+        self.rejected = 0
+        self.spooled = len(glob.glob(os.path.join(spool_dir, "alert-*.json")))  # pendentes de execuções anteriores
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._worker, name="alert-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, class_name, confidence, frame, source=None):
+        """Enfileira um alerta sem bloquear; o frame deve ser uma cópia do chamador."""
+        message = f"🚨 ALERTA! Objeto detectado: **{class_name.upper()}** com confiança **{confidence:.2f}**"
+        if source is not None:
+            message += f" (fonte: {source})"
+        item = {"content": message, "frame": frame, "created_at": time.time()}
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            # Fila cheia (webhook fora do ar por muito tempo): o worker grava no spool
+            self._overflow.append(item)
+            self._count("dropped")
+            return False
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    def _encode(self, item):
+        if "image" in item:
+            return item
+        image, mime = encode_alert_image(
+            item.pop("frame"), self.image_format, self.jpeg_quality, self.max_width
+        )
+        item["image"] = image
+        item["mime"] = mime
+        return item
+
+    def _update_rate_limit(self, response):
+        """Lê os cabeçalhos do Discord para não estourar o limite na próxima chamada."""
+        headers = response.headers
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.json().get("retry_after", 0))
+            except ValueError:
+                retry_after = float(headers.get("Retry-After", 1))
+            self._rate_limited_until = time.monotonic() + max(retry_after, 0.1)
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(headers.get("X-RateLimit-Reset-After", 0))
+            self._rate_limited_until = time.monotonic() + reset_after
+
+    def _post(self, item):
+        """Envia um alerta: SENT, FAILED (repetir depois) ou REJECTED (4xx, não repetir).
+
+        Repete em 429, 5xx e erros de rede; as esperas são interrompidas por close().
+        """
+        extension = "jpg" if item["mime"] == "image/jpeg" else "png"
+        response = None
+        for attempt in range(self.max_retries + 1):
+            delay = self._rate_limited_until - time.monotonic()
+            if (delay > 0 and self._stop.wait(delay)) or self._stop.is_set():
+                return FAILED
+            files = {
+                "payload_json": (None, json.dumps({"content": item["content"]}), "application/json"),
+                "file": (f"detection.{extension}", item["image"], item["mime"]),
+            }
+            try:
+                response = self.session.post(self.webhook_url, files=files, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                print(f"Erro ao enviar alerta para o Discord (tentativa {attempt + 1}): {e}")
+                response = None
+            if response is not None:
+                self._update_rate_limit(response)
+                if response.ok:
+                    return SENT
+                if response.status_code != 429 and response.status_code < 500:
+                    # Erro do cliente (webhook inválido, payload grande demais): não adianta repetir
+                    print(f"Discord recusou o alerta ({response.status_code}): {response.text[:200]}")
+                    return REJECTED
+                if response.status_code == 429:
+                    continue  # espera o retry_after no início da próxima tentativa
+            if attempt < self.max_retries and self._stop.wait(self.backoff * 2**attempt):
+                return FAILED
+        if response is not None:
+            print(f"Resposta do servidor Discord: {response.status_code} {response.text[:200]}")
+        return FAILED
+
+    def _spool(self, item, quarantine=False):
+        """Grava o alerta não entregue (JSON + imagem) para reenvio posterior (ou na quarentena)."""
+        directory = os.path.join(self.spool_dir, QUARANTINE_DIR) if quarantine else self.spool_dir
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._spool_index += 1
+            index = self._spool_index
+        stem = os.path.join(directory, f"alert-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{index}")
+        extension = "jpg" if item["mime"] == "image/jpeg" else "png"
+        with open(f"{stem}.{extension}", "wb") as f:
+            f.write(item["image"])
+        with open(f"{stem}.json.tmp", "w") as f:
+            json.dump({"content": item["content"], "mime": item["mime"], "image": f"{stem}.{extension}",
+                       "created_at": item["created_at"]}, f)
+        os.replace(f"{stem}.json.tmp", f"{stem}.json")
+        if quarantine:
+            print(f"Alerta recusado movido para a quarentena: {stem}.json")
+        else:
+            self._count("spooled")
+            print(f"Alerta guardado no spool: {stem}.json")
+
+    def _quarantine_entry(self, meta_path, image_path=None):
+        """Move uma entrada do spool (JSON e imagem, se existirem) para a quarentena."""
+        directory = os.path.join(self.spool_dir, QUARANTINE_DIR)
+        os.makedirs(directory, exist_ok=True)
+        for path in (meta_path, image_path):
+            if path and os.path.exists(path):
+                os.replace(path, os.path.join(directory, os.path.basename(path)))
+        self._count("spooled", -1)
+        print(f"Entrada do spool movida para a quarentena: {meta_path}")
+
+    def retry_spool(self):
+        """Reenvia os alertas do spool (mais antigos primeiro).
+
+        Para na primeira falha temporária (o webhook continua fora do ar);
+        entradas recusadas (4xx) ou ilegíveis vão para a quarentena e não
+        bloqueiam as seguintes.
+        """
+        for meta_path in sorted(glob.glob(os.path.join(self.spool_dir, "alert-*.json"))):
+            if self._stop.is_set():
+                return False
+            image_path = None
+            try:
+                with open(meta_path, "r") as f:
+                    meta = json.load(f)
+                image_path = meta["image"]
+                with open(image_path, "rb") as f:
+                    item = {"content": meta["content"], "image": f.read(), "mime": meta["mime"],
+                            "created_at": meta["created_at"]}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Entrada do spool ilegível ({meta_path}): {e}")
+                self._quarantine_entry(meta_path, image_path)
+                continue
+            status = self._post(item)
+            if status == FAILED:
+                return False
+            if status == REJECTED:
+                self._count("rejected")
+                self._quarantine_entry(meta_path, image_path)
+                continue
+            os.remove(meta_path)
+            os.remove(image_path)
+            self._count("spooled", -1)
+            self._count("sent")
+        return True
+
+    def _take_in_flight(self):
+        with self._lock:
+            item, self._in_flight = self._in_flight, None
+        return item
+
+    def _deliver(self, item):
+        try:
+            item = self._encode(item)
+        except Exception as e:
+            print(f"Erro durante a codificação da imagem: {e}")
+            return
+        with self._lock:
+            self._in_flight = item
+        status = self._post(item)
+        if self._take_in_flight() is None and status != SENT:
+            return  # close() já guardou este alerta no spool
+        if status == SENT:
+            self._count("sent")
+            print("Mensagem de alerta e imagem enviadas com sucesso para o Discord!")
+        elif status == REJECTED:
+            self._count("rejected")
+            self._spool(item, quarantine=True)
+        else:
+            self._count("failed")
+            self._spool(item)
+
+    def _spool_overflow(self):
+        """Grava no spool os alertas que não couberam na fila (codificação fora do loop de vídeo)."""
+        while True:
+            try:
+                item = self._overflow.popleft()
+            except IndexError:
+                return
+            try:
+                self._spool(self._encode(item))
+            except Exception as e:
+                print(f"Erro ao guardar alerta no spool: {e}")
+
+    def _worker(self):
+        while not self._stop.is_set():
+            self._spool_overflow()
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if item is not None:
+                try:
+                    self._deliver(item)
+                except Exception as e:
+                    print(f"Erro no envio do alerta: {e}")
+                continue
+            now = time.monotonic()
+            if now - self._last_spool_retry >= self.spool_retry_interval:
+                self._last_spool_retry = now
+                # Uma falha aqui (ex.: disco) não pode matar a thread: os próximos alertas dependem dela
+                try:
+                    if glob.glob(os.path.join(self.spool_dir, "alert-*.json")):
+                        self.retry_spool()
+                except Exception as e:
+                    print(f"Erro ao reenviar alertas do spool: {e}")
+
+    def close(self, timeout=None):
+        """Para o envio; o alerta em andamento e os ainda na fila vão para o spool.
+
+        Espera o envio em andamento por até `timeout` segundos (padrão: o
+        timeout da requisição); as esperas de nova tentativa são interrompidas.
+        """
+        self._stop.set()
+        self._thread.join(timeout=self.timeout + 1 if timeout is None else timeout)
+        pending = []
+        in_flight = self._take_in_flight()
+        if in_flight is not None:
+            pending.append(in_flight)
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._overflow.extendleft(reversed(pending))
+        self._spool_overflow()
+        self.session.close()
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize() + len(self._overflow),
+            "sent": self.sent,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "spooled": self.spooled,
+            "dropped": self.dropped,
+        }
+
+
+def serve_test_webhook(port=0, failures=("429", "500")):
+    """Webhook local que responde com as falhas dadas antes de aceitar cada alerta."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    state = {"pending": list(failures), "received": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if state["pending"]:
+                status = int(state["pending"].pop(0))
+                body = json.dumps({"message": "simulado", "retry_after": 0.5}).encode()
+            else:
+                state["received"] += 1
+                state["pending"] = list(failures)
+                status, body = 204, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            print(f"[webhook local] {fmt % args}")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description="Envio de alertas para o webhook do Discord")
+    parser.add_argument("--test-server", action="store_true",
+                        help="Sobe um webhook local (com falhas simuladas) e envia alertas de teste")
+    parser.add_argument("--webhook", default=os.environ.get("DISCORD_WEBHOOK_URL"))
+    parser.add_argument("--count", type=int, default=3, help="Alertas de teste a enviar")
+    parser.add_argument("--spool-dir", default="data/alerts_spool")
+    args = parser.parse_args()
+
+    server = None
+    webhook_url = args.webhook
+    if args.test_server:
+        server, state = serve_test_webhook()
+        webhook_url = f"http://127.0.0.1:{server.server_address[1]}/webhook"
+    if not webhook_url:
+        exit("Informe --webhook, DISCORD_WEBHOOK_URL ou use --test-server.")
+
+    dispatcher = AlertDispatcher(webhook_url, backoff=0.2, spool_dir=args.spool_dir)
+    frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+    cv2.putText(frame, "teste", (50, 540), cv2.FONT_HERSHEY_SIMPLEX, 4, (0, 0, 255), 8)
+    for index in range(args.count):
+        dispatcher.submit("knife", 0.9, frame.copy(), source=f"teste {index}")
+    while dispatcher.stats()["queued"] or dispatcher.sent + dispatcher.failed + dispatcher.rejected < args.count:
+        time.sleep(0.1)
+    dispatcher.close()
+    print(f"Resultado: {dispatcher.stats()}")
+    if server is not None:
+        print(f"Alertas recebidos pelo webhook local: {state['received']}")
+        server.shutdown()
@@ -0,0 +1,346 @@
+# -----------------------------------------------------------------------------
+# Backends de inferência em CPU: PyTorch, ONNX Runtime e OpenVINO
+# -----------------------------------------------------------------------------
+# Os checkpoints .pt são exportados (uma única vez) para um grafo ONNX ou
+# OpenVINO com entrada estática (1 x 3 x imgsz x imgsz, o tamanho do letterbox)
+# e guardados em models/cache. Com formas fixas o runtime planeja memória e
+# kernels uma única vez; lotes (multi-câmera) rodam imagem a imagem no mesmo
+# grafo e cada imgsz do controle adaptativo tem o seu grafo, exportado e
+# carregado junto com o modelo (nunca na thread de inferência).
+# Na inferência o grafo roda direto no runtime escolhido, com o número de
+# threads definido aqui, sem passar pelo modo eager do PyTorch.
+#
+# Os modelos de runtime devolvem resultados com a mesma interface usada pelo
+# resto do projeto (`result.names` e `result.boxes.data` N x 6 com xyxy, conf,
+# cls), então desenho, alertas e registros funcionam sem mudanças.
+#
+# Dependências opcionais: pip install onnxruntime  |  pip install openvino
+import ast
+import os
+import shutil
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+DEFAULT_CACHE_DIR = os.path.join("models", "cache")
+
+
+def cpu_threads():
+    """Número de threads para a inferência: os núcleos disponíveis menos um.
+
+    Um núcleo fica livre para as threads de captura, renderização e alertas.
+    """
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows/macOS
+        available = os.cpu_count() or 1
+    return max(1, available - 1)
+
+
+def path_size_mb(path):
+    """Tamanho em MB de um arquivo ou pasta (modelos OpenVINO); 0 se não existir."""
+    if os.path.isdir(path):
+        total = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(path)
+            for name in names
+        )
+    elif os.path.exists(path):
+        total = os.path.getsize(path)
+    else:
+        total = 0
+    return total / (1024 * 1024)
+
+
+def model_spec(entry):
+    """Normaliza uma entrada de AVAILABLE_MODELS em {"path", "backend", "imgsz", "int8"}.
+
+    Aceita o formato antigo (string com o caminho do .pt) ou um dicionário.
+    """
+    if isinstance(entry, str):
+        return {"path": entry, "backend": "pytorch", "imgsz": 640, "int8": False}
+    spec = {"backend": "pytorch", "imgsz": 640, "int8": False}
+    spec.update(entry)
+    if spec["backend"] not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {spec['backend']} (use {', '.join(BACKENDS)})")
+    if spec["int8"] and spec["backend"] == "pytorch":
+        raise ValueError("Modelos INT8 precisam do backend onnx ou openvino")
+    return spec
+
+
+def exported_path(pt_path, backend, imgsz, cache_dir=DEFAULT_CACHE_DIR, int8=False):
+    # "b1": grafo estático de lote 1 (exportações antigas, com eixos dinâmicos, não são reaproveitadas)
+    stem = os.path.splitext(os.path.basename(pt_path))[0]
+    suffix = "_int8" if int8 else ""
+    if backend == "onnx":
+        return os.path.join(cache_dir, f"{stem}_{imgsz}_b1{suffix}.onnx")
+    return os.path.join(cache_dir, f"{stem}_{imgsz}_b1{suffix}_openvino_model")
+
+
+def is_fresh(target, pt_path):
+    """O arquivo exportado existe e não é mais velho que o .pt de origem."""
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(pt_path)
+
+
+def export_model(pt_path, backend, imgsz=640, cache_dir=DEFAULT_CACHE_DIR):
+    """Exporta o .pt para ONNX/OpenVINO e guarda no cache; reutiliza se já existir.
+
+    O cache é refeito quando o .pt for mais novo que o arquivo exportado.
+    """
+    target = exported_path(pt_path, backend, imgsz, cache_dir)
+    if is_fresh(target, pt_path):
+        return target
+
+    from ultralytics import YOLO  # só necessário para exportar
+
+    print(f"Exportando {pt_path} para {backend} (imgsz={imgsz})...")
+    os.makedirs(cache_dir, exist_ok=True)
+    exported = YOLO(pt_path).export(
+        format=backend,
+        imgsz=imgsz,
+        dynamic=False,  # forma estática: lote 1 e exatamente imgsz x imgsz
+        batch=1,
+        simplify=backend == "onnx",
+        verbose=False,
+    )
+    if os.path.exists(target):
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        else:
+            os.remove(target)
+    shutil.move(str(exported), target)
+    print(f"Modelo exportado: {target}")
+    return target
+
+
+def letterbox(frame, size):
+    """Redimensiona mantendo a proporção e completa com cinza (igual ao YOLO)."""
+    h, w = frame.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    left = (size - new_w) // 2
+    top = (size - new_h) // 2
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    canvas[top : top + new_h, left : left + new_w] = frame
+    return canvas, ratio, (left, top)
+
+
+class RuntimeBoxes:
+    """Caixas no formato do Ultralytics (data: N x 6 = xyxy, conf, cls) em NumPy."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+
+class RuntimeResult:
+    """Resultado de um frame; `speed` segue o Ultralytics (ms por imagem em cada etapa)."""
+
+    __slots__ = ("boxes", "names", "orig_shape", "speed")
+
+    def __init__(self, data, names, orig_shape):
+        self.boxes = RuntimeBoxes(data)
+        self.names = names
+        self.orig_shape = orig_shape
+        self.speed = {}
+
+
+class RuntimeModel:
+    """Base dos backends exportados: pré-processamento, NMS e interface do YOLO."""
+
+    backend = None
+
+    def __init__(self, path, imgsz=640, threads=None, exporter=None, sizes=()):
+        self.path = path
+        self.imgsz = imgsz
+        self.threads = threads or cpu_threads()
+        self.names = {}
+        self._runners = {imgsz: self._load(path)}
+        # Outros tamanhos (controle adaptativo) são exportados e carregados agora:
+        # exportar na primeira chamada pararia a inferência por vários segundos
+        if exporter is not None:
+            for size in sizes:
+                if size not in self._runners:
+                    self._runners[size] = self._load(exporter(size))
+
+    @property
+    def sizes(self):
+        """Valores de imgsz com grafo carregado (os únicos aceitos por predict)."""
+        return tuple(sorted(self._runners, reverse=True))
+
+    def _load(self, path):
+        """Carrega o grafo de `path`; retorna uma função blob (1, 3, s, s) -> (1, 4 + nc, A)."""
+        raise NotImplementedError
+
+    def _run(self, blob, size):
+        """Executa o grafo (entrada estática de lote 1) sobre o lote NCHW; retorna (N, 4 + nc, A)."""
+        runner = self._runners[size]
+        return np.concatenate([runner(blob[index : index + 1]) for index in range(len(blob))])
+
+    def predict(self, source, conf=0.25, iou=0.7, max_det=300, imgsz=None, verbose=False, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        if not frames:
+            return []
+        # imgsz por chamada (controle adaptativo): um grafo estático por tamanho; tamanhos
+        # não carregados (ex.: INT8 calibrado em um só tamanho) usam o exportado
+        size = imgsz or self.imgsz
+        if size not in self._runners:
+            size = self.imgsz
+        start = time.perf_counter()
+        letterboxed = [letterbox(frame, size) for frame in frames]
+        # BGR -> RGB, HWC -> CHW e 0-255 -> 0-1 em uma única chamada
+        blob = cv2.dnn.blobFromImages(
+            [item[0] for item in letterboxed], scalefactor=1 / 255.0, swapRB=True
+        )
+        preprocessed = time.perf_counter()
+        output = self._run(blob, size)
+        inferred = time.perf_counter()
+        results = [
+            self._postprocess(prediction, ratio, pad, frame.shape[:2], conf, iou, max_det)
+            for prediction, (_, ratio, pad), frame in zip(output, letterboxed, frames)
+        ]
+        finished = time.perf_counter()
+        speed = {
+            "preprocess": (preprocessed - start) * 1000.0 / len(frames),
+            "inference": (inferred - preprocessed) * 1000.0 / len(frames),
+            "postprocess": (finished - inferred) * 1000.0 / len(frames),
+        }
+        for result in results:
+            result.speed = speed
+        return results
+
+    __call__ = predict
+
+    def _postprocess(self, prediction, ratio, pad, shape, conf, iou, max_det):
+        prediction = prediction.T  # (A, 4 + nc)
+        scores = prediction[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > conf
+        if not keep.any():
+            return RuntimeResult(np.zeros((0, 6), dtype=np.float32), self.names, shape)
+
+        xywh = prediction[keep, :4]
+        confidences = confidences[keep]
+        class_ids = class_ids[keep]
+        # NMS por classe (caixas no formato x, y, w, h com canto superior esquerdo)
+        corner = xywh.copy()
+        corner[:, 0] -= xywh[:, 2] / 2
+        corner[:, 1] -= xywh[:, 3] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            corner.tolist(), confidences.tolist(), class_ids.tolist(), conf, iou
+        )
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+        xyxy = np.empty((len(indices), 4), dtype=np.float32)
+        xyxy[:, :2] = corner[indices, :2]
+        xyxy[:, 2:] = corner[indices, :2] + xywh[indices, 2:]
+        # Desfaz o letterbox: volta para as coordenadas do frame original
+        xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+        xyxy /= ratio
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+
+        data = np.concatenate(
+            [xyxy, confidences[indices, None], class_ids[indices, None].astype(np.float32)], axis=1
+        )
+        return RuntimeResult(data.astype(np.float32), self.names, shape)
+
+
+class OnnxRuntimeModel(RuntimeModel):
+    backend = "onnx"
+
+    def _load(self, path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        input_name = session.get_inputs()[0].name
+        metadata = session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = ast.literal_eval(metadata["names"])
+        return lambda blob: session.run(None, {input_name: blob})[0]
+
+
+class OpenVinoModel(RuntimeModel):
+    backend = "openvino"
+
+    def _load(self, path):
+        import openvino as ov
+        import yaml
+
+        core = ov.Core()
+        xml_path = next(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".xml")
+        )
+        compiled = core.compile_model(
+            core.read_model(xml_path),
+            "CPU",
+            {"INFERENCE_NUM_THREADS": self.threads, "PERFORMANCE_HINT": "LATENCY"},
+        )
+        metadata_path = os.path.join(path, "metadata.yaml")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r") as f:
+                self.names = yaml.safe_load(f).get("names", {})
+        output = compiled.output(0)
+        return lambda blob: compiled(blob)[output]
+
+
+def load_backend_model(entry, models_dir="", cache_dir=DEFAULT_CACHE_DIR, threads=None, sizes=()):
+    """Carrega um modelo de AVAILABLE_MODELS no backend configurado.
+
+    pytorch: YOLO do Ultralytics (com threads do PyTorch ajustadas);
+    onnx/openvino: exporta no primeiro uso e roda no runtime correspondente.
+    `sizes` são os outros imgsz que o modelo deve aceitar (controle adaptativo);
+    o modelo de runtime informa os que conseguiu carregar em `model.sizes`.
+    """
+    spec = model_spec(entry)
+    path = os.path.join(models_dir, spec["path"]) if models_dir else spec["path"]
+    threads = threads or cpu_threads()
+
+    if spec["backend"] == "pytorch":
+        import torch
+        from ultralytics import YOLO
+
+        torch.set_num_threads(threads)
+        return YOLO(path)
+
+    exported, exporter = path, None
+    if path.endswith(".pt") and spec["int8"]:
+        # A versão INT8 precisa de calibração com o dataset de validação
+        exported = exported_path(path, spec["backend"], spec["imgsz"], cache_dir, int8=True)
+        if not os.path.exists(exported):
+            raise FileNotFoundError(
+                f"{exported} não encontrado. Gere a versão INT8 com: "
+                f"python -m utils.model_quantizer --model {path} --data <dataset.yaml>"
+            )
+    elif path.endswith(".pt"):
+        exported = export_model(path, spec["backend"], spec["imgsz"], cache_dir)
+        # Outros imgsz (controle adaptativo) ganham o próprio grafo estático
+        exporter = lambda size: export_model(path, spec["backend"], size, cache_dir)  # noqa: E731
+    if spec["backend"] == "onnx":
+        return OnnxRuntimeModel(exported, spec["imgsz"], threads, exporter, sizes)
+    return OpenVinoModel(exported, spec["imgsz"], threads, exporter, sizes)
@@ -0,0 +1,331 @@
+# Requer: pip install ultralytics (e onnxruntime / openvino para esses backends)
+#
+# Benchmark headless (somente CPU) do pipeline de detecção.
+#
+# Uso (a partir da raiz do projeto):
+#   python -m utils.benchmark                               # modelos .pt de AVAILABLE_MODELS
+#   python -m utils.benchmark --models yolo11n.pt yolo11s.pt --backends pytorch onnx \
+#       --batch-sizes 1 4 --imgsz 640 416 --video data/inputs/video2.mp4
+#
+# Cada combinação modelo x backend x lote x imgsz roda em um processo novo
+# (pico de memória medido só daquela configuração) e tem as latências de
+# decodificação, pré-processamento, inferência, pós-processamento e desenho
+# medidas separadamente (p50/p95/p99 em ms por frame), além da vazão e do pico
+# de RSS. O resultado vai para um JSON com commit e hardware, para comparar
+# execuções entre versões do código e máquinas.
+
+import argparse
+import ast
+import json
+import os
+import platform
+import subprocess
+import time
+from multiprocessing import get_context
+
+import cv2
+import numpy as np
+
+from utils.backends import BACKENDS, cpu_threads, load_backend_model, model_spec
+from utils.postprocess import ClassFilter
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# --- CONFIGURAÇÕES PADRÃO ---
+VIDEO_PATH = "data/inputs/video2.mp4"
+MODELS_DIR = "models"
+MAIN_SCRIPT = "main.py"
+RESULTS_DIR = "data/results"
+MAX_FRAMES = 300
+WARMUP_BATCHES = 2
+STAGES = ("decode", "preprocess", "inference", "postprocess", "draw")
+# Mesmos filtros do main.py (desenho e alerta entram no custo do pós-processamento)
+TARGET_CLASSES = ["knife", "scissors"]
+ALERT_CLASSES = ["knife"]
+
+
+def available_models(main_script=MAIN_SCRIPT):
+    """Lê AVAILABLE_MODELS do main.py sem importá-lo (o main abre a GUI e exige o webhook)."""
+    with open(main_script, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "AVAILABLE_MODELS" for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def resolve_models(names, models_dir=MODELS_DIR, main_script=MAIN_SCRIPT):
+    """Converte nomes de AVAILABLE_MODELS ou caminhos em specs (model_spec).
+
+    Sem nomes: todas as entradas .pt simples de AVAILABLE_MODELS que existem em disco.
+    """
+    catalog = available_models(main_script) if os.path.exists(main_script) else {}
+    if not names:
+        names = [
+            name for name, entry in catalog.items()
+            if isinstance(entry, str) and os.path.exists(os.path.join(models_dir, entry))
+        ]
+    specs = []
+    for name in names:
+        entry = catalog.get(name, name)
+        spec = model_spec(entry)
+        spec["name"] = name
+        spec["explicit_backend"] = isinstance(entry, dict) and "backend" in entry
+        specs.append(spec)
+    return specs
+
+
+def build_configs(specs, backends, batch_sizes, imgsz_list):
+    configs = []
+    for spec in specs:
+        for backend in ([spec["backend"]] if spec["explicit_backend"] else backends):
+            for imgsz in imgsz_list:
+                for batch_size in batch_sizes:
+                    configs.append(
+                        {
+                            "model": spec["name"],
+                            "path": spec["path"],
+                            "backend": backend,
+                            "int8": spec["int8"],
+                            "imgsz": imgsz,
+                            "batch_size": batch_size,
+                        }
+                    )
+    return configs
+
+
+def percentiles(values):
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+    }
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo (None se indisponível)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return round(peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024, 1)
+
+
+def decode_frames(video_path, max_frames):
+    """Decodifica os frames do vídeo medindo o tempo de cada leitura."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Não foi possível abrir o vídeo: {video_path}")
+    frames, timings = [], []
+    while len(frames) < max_frames:
+        start = time.perf_counter()
+        ok, frame = cap.read()
+        elapsed = (time.perf_counter() - start) * 1000.0
+        if not ok:
+            break
+        frames.append(frame)
+        timings.append(elapsed)
+    cap.release()
+    if not frames:
+        raise ValueError(f"Nenhum frame lido de {video_path}")
+    return frames, timings
+
+
+def draw_detections(frame, detections):
+    """Mesmo desenho do main.py: caixas e rótulos das classes-alvo."""
+    for index in np.flatnonzero(detections.draw):
+        x1, y1, x2, y2 = detections.xyxy[index].astype(int)
+        confidence = float(detections.conf[index])
+        color = (0, 255, 0) if confidence > 0.5 else (0, 0, 255)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{detections.names[int(detections.cls[index])]} {confidence:.2f}",
+                    (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+
+def run_config(job):
+    """Executado em um processo novo: mede uma configuração do início ao fim."""
+    config, options = job
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""  # somente CPU
+    result = dict(config)
+    try:
+        load_start = time.perf_counter()
+        model = load_backend_model(
+            {"path": config["path"], "backend": config["backend"], "imgsz": config["imgsz"],
+             "int8": config["int8"]},
+            models_dir=options["models_dir"],
+            threads=options["threads"],
+        )
+        result["load_seconds"] = round(time.perf_counter() - load_start, 3)
+        frames, decode_ms = decode_frames(options["video"], options["max_frames"])
+        class_filter = ClassFilter(TARGET_CLASSES, ALERT_CLASSES, options["conf"], 0.7)
+        kwargs = {"conf": options["conf"], "imgsz": config["imgsz"], "verbose": False}
+        if config["backend"] == "pytorch":
+            kwargs["device"] = "cpu"
+
+        batch_size = config["batch_size"]
+        batches = [frames[i : i + batch_size] for i in range(0, len(frames), batch_size)]
+        for batch in batches[:WARMUP_BATCHES]:
+            model(list(batch), **kwargs)
+
+        timings = {stage: [] for stage in STAGES}
+        timings["decode"] = decode_ms
+        detections_total = 0
+        wall_start = time.perf_counter()
+        for batch in batches:
+            results = model(list(batch), **kwargs)
+            for frame, output in zip(batch, results):
+                speed = getattr(output, "speed", None) or {}
+                timings["preprocess"].append(speed.get("preprocess", 0.0))
+                timings["inference"].append(speed.get("inference", 0.0))
+                start = time.perf_counter()
+                detections = class_filter(output)
+                timings["postprocess"].append(
+                    speed.get("postprocess", 0.0) + (time.perf_counter() - start) * 1000.0
+                )
+                canvas = frame.copy()
+                start = time.perf_counter()
+                draw_detections(canvas, detections)
+                timings["draw"].append((time.perf_counter() - start) * 1000.0)
+                detections_total += len(detections)
+        wall = time.perf_counter() - wall_start
+        # Vazão de ponta a ponta inclui a decodificação medida antes
+        total_seconds = wall + sum(decode_ms) / 1000.0
+
+        result.update(
+            {
+                "frames": len(frames),
+                "latency_ms": {stage: percentiles(values) for stage, values in timings.items()},
+                "throughput_fps": round(len(frames) / total_seconds, 2),
+                "inference_fps": round(len(frames) / wall, 2),
+                "detections": detections_total,
+                "peak_rss_mb": peak_rss_mb(),
+                "error": None,
+            }
+        )
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def hardware_info(threads):
+    info = {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "threads": threads,
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+    }
+    for module in ("torch", "ultralytics", "onnxruntime", "openvino"):
+        try:
+            info[module] = __import__(module).__version__
+        except Exception:
+            pass
+    return info
+
+
+def run_benchmark(configs, video=VIDEO_PATH, models_dir=MODELS_DIR, max_frames=MAX_FRAMES,
+                  conf=0.25, threads=None):
+    """Roda cada configuração em um processo próprio (spawn, um por vez)."""
+    options = {
+        "video": video,
+        "models_dir": models_dir,
+        "max_frames": max_frames,
+        "conf": conf,
+        "threads": threads or cpu_threads(),
+    }
+    results = []
+    context = get_context("spawn")
+    for config in configs:
+        label = f"{config['model']} [{config['backend']}] lote {config['batch_size']} imgsz {config['imgsz']}"
+        print(f"▶️ {label}")
+        # maxtasksperchild=1: processo novo por configuração (RSS e caches isolados)
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(run_config, ((config, options),))
+        if result["error"]:
+            print(f"❌ {label}: {result['error']}")
+        else:
+            inference = result["latency_ms"]["inference"]
+            print(f"✅ {label}: {result['throughput_fps']} FPS, inferência p50 {inference['p50']} ms "
+                  f"p95 {inference['p95']} ms, pico {result['peak_rss_mb']} MB")
+        results.append(result)
+    return {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": git_commit(),
+        "hardware": hardware_info(options["threads"]),
+        "video": video,
+        "max_frames": max_frames,
+        "results": results,
+    }
+
+
+def print_summary(report):
+    header = f"{'modelo':34} {'backend':9} {'lote':>4} {'imgsz':>5} {'FPS':>7}"
+    for stage in STAGES:
+        header += f" {stage[:6] + ' p95':>11}"
+    header += f" {'RSS MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for row in report["results"]:
+        if row["error"]:
+            continue
+        line = (f"{row['model'][:34]:34} {row['backend']:9} {row['batch_size']:>4} {row['imgsz']:>5} "
+                f"{row['throughput_fps']:>7}")
+        for stage in STAGES:
+            line += f" {row['latency_ms'][stage]['p95']:>11}"
+        line += f" {row['peak_rss_mb']:>8}"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless (CPU) dos modelos de detecção")
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="Nomes de AVAILABLE_MODELS ou caminhos .pt (padrão: .pt de AVAILABLE_MODELS)")
+    parser.add_argument("--backends", nargs="+", default=["pytorch"], choices=BACKENDS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1])
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[640])
+    parser.add_argument("--video", default=VIDEO_PATH, help="Vídeo reproduzido em cada configuração")
+    parser.add_argument("--max-frames", type=int, default=MAX_FRAMES)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--threads", type=int, default=None, help="Threads de CPU (padrão: automático)")
+    parser.add_argument("--output", default=None,
+                        help="Arquivo JSON (padrão: data/results/benchmark-<data>-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    specs = resolve_models(args.models, args.models_dir)
+    if not specs:
+        raise SystemExit(f"Nenhum modelo encontrado (informe --models ou coloque os .pt em {args.models_dir}).")
+    configs = build_configs(specs, args.backends, args.batch_sizes, args.imgsz)
+    print(f"{len(configs)} configuração(ões), vídeo {args.video}, até {args.max_frames} frames")
+    report = run_benchmark(configs, args.video, args.models_dir, args.max_frames, args.conf, args.threads)
+    print_summary(report)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}-{report['commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Relatório salvo em: {output}")
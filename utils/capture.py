@@ -0,0 +1,292 @@
+# -----------------------------------------------------------------------------
+# Captura de vídeo em thread dedicada
+# -----------------------------------------------------------------------------
+# Cada fonte (webcam, RTSP ou arquivo) ganha uma thread leitora que decodifica
+# continuamente e guarda apenas o frame mais recente. Quem consome (inferência,
+# exibição) sempre pega o último frame disponível, de modo que a latência
+# ponta-a-ponta fica limitada a um tempo de inferência, mesmo com modelo lento.
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+
+class FrameGrabber:
+    """Lê frames de uma fonte em segundo plano mantendo só o mais recente."""
+
+    def __init__(self, source, name=None, realtime_files=True, new_frame_event=None):
+        self.source = source
+        self.name = name if name is not None else str(source)
+        # Arquivos de vídeo são lidos no ritmo do FPS original para simular uma
+        # câmera ao vivo; sem isso a thread decodificaria o arquivo inteiro
+        # descartando quase todos os frames.
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.realtime_files = realtime_files
+        # Evento compartilhado (GrabberGroup) sinalizado a cada frame novo
+        self.new_frame_event = new_frame_event
+
+        self._cap = None
+        self._thread = None
+        self._cond = threading.Condition()
+        self._running = False
+
+        self._frame = None
+        self._frame_id = 0
+        self._frame_time = 0.0
+        self._consumed_id = 0
+
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.finished = False
+        self.width = 0
+        self.height = 0
+        self.fps = 0.0
+
+    def start(self):
+        """Abre a fonte e inicia a thread leitora. Retorna False se falhar."""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return False
+        # Em câmeras/RTSP o buffer interno do OpenCV acumula frames atrasados;
+        # pedimos o menor buffer possível (nem todo backend respeita).
+        if not self.is_file:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self._cap = cap
+        self._running = True
+        self.finished = False
+        self._thread = threading.Thread(
+            target=self._reader, name=f"grabber-{self.name}", daemon=True
+        )
+        self._thread.start()
+        return True
+
+    def _reader(self):
+        frame_interval = 0.0
+        if self.is_file and self.realtime_files and self.fps > 0:
+            frame_interval = 1.0 / self.fps
+        next_deadline = time.perf_counter()
+
+        while self._running:
+            ret, frame = self._cap.read()
+            if not ret:
+                if self.is_file:
+                    break
+                # Falha momentânea de câmera/stream: tenta novamente
+                time.sleep(0.05)
+                continue
+
+            with self._cond:
+                # O frame anterior nunca foi consumido: conta como descartado
+                if self._frame_id != self._consumed_id:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._frame_id += 1
+                self._frame_time = time.time()
+                self.frames_read += 1
+                self._cond.notify_all()
+            if self.new_frame_event is not None:
+                self.new_frame_event.set()
+
+            if frame_interval:
+                next_deadline += frame_interval
+                sleep_time = next_deadline - time.perf_counter()
+                if sleep_time > 0:
+                    time.sleep(sleep_time)
+                else:
+                    next_deadline = time.perf_counter()
+
+        # A própria thread libera a fonte: evita release() concorrente com um
+        # read() ainda bloqueado em stream RTSP lento.
+        self._cap.release()
+        with self._cond:
+            self.finished = True
+            self._cond.notify_all()
+
+    def read(self, last_id=0, timeout=None):
+        """Retorna (frame_id, frame, timestamp) do frame mais novo que last_id.
+
+        Bloqueia até `timeout` segundos esperando um frame novo; se não houver,
+        retorna (last_id, None, 0.0). O frame retornado não deve ser alterado
+        por quem consome (use .copy() antes de desenhar).
+        """
+        with self._cond:
+            if self._frame_id <= last_id and not self.finished:
+                self._cond.wait_for(
+                    lambda: self._frame_id > last_id or self.finished or not self._running,
+                    timeout=timeout,
+                )
+            if self._frame_id <= last_id:
+                return last_id, None, 0.0
+            self._consumed_id = self._frame_id
+            return self._frame_id, self._frame, self._frame_time
+
+    def latest(self, last_id=0):
+        """Versão não bloqueante de read()."""
+        return self.read(last_id, timeout=0)
+
+    def stats(self):
+        return {
+            "source": self.name,
+            "frames_read": self.frames_read,
+            "frames_dropped": self.frames_dropped,
+        }
+
+    def stop(self):
+        """Encerra a thread leitora e libera a fonte."""
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def is_opened(self):
+        return self._running and not self.finished
+
+
+class GrabberGroup:
+    """Várias fontes abertas ao mesmo tempo, lidas em lote.
+
+    Cada fonte continua com seu FrameGrabber; read_batch() junta os frames
+    novos de todas as fontes que estiverem prontos no mesmo instante, para
+    que passem pelo modelo em uma única chamada.
+    """
+
+    def __init__(self, sources, realtime_files=True):
+        # sources: dicionário {nome amigável: valor para o OpenCV}
+        self.sources = dict(sources)
+        self.realtime_files = realtime_files
+        self.grabbers = {}
+        self._last_ids = {}
+        self._new_frame = threading.Event()
+
+    def start(self):
+        """Abre todas as fontes; retorna a lista de nomes abertos com sucesso."""
+        for name, value in self.sources.items():
+            grabber = FrameGrabber(
+                value,
+                name=name,
+                realtime_files=self.realtime_files,
+                new_frame_event=self._new_frame,
+            )
+            if grabber.start():
+                self.grabbers[name] = grabber
+                self._last_ids[name] = 0
+                print(f"Fonte aberta: {name}")
+            else:
+                print(f"Erro ao abrir fonte {name} ({value})")
+        return list(self.grabbers)
+
+    def _collect(self):
+        batch = []
+        for name, grabber in self.grabbers.items():
+            frame_id, frame, timestamp = grabber.latest(self._last_ids[name])
+            if frame is None:
+                continue
+            self._last_ids[name] = frame_id
+            batch.append(
+                {
+                    "source": name,
+                    "frame_id": frame_id,
+                    "timestamp": timestamp,
+                    "frame": frame,
+                }
+            )
+        return batch
+
+    def read_batch(self, timeout=None):
+        """Retorna os frames novos de todas as fontes (lista possivelmente vazia).
+
+        Espera até `timeout` segundos se nenhuma fonte tiver frame novo.
+        """
+        self._new_frame.clear()
+        batch = self._collect()
+        if not batch and self._new_frame.wait(timeout):
+            batch = self._collect()
+        return batch
+
+    def grabber(self, name):
+        return self.grabbers.get(name)
+
+    def finished(self):
+        """True quando todas as fontes terminaram (ex.: fim dos arquivos)."""
+        return all(grabber.finished for grabber in self.grabbers.values())
+
+    def stats(self):
+        return [grabber.stats() for grabber in self.grabbers.values()]
+
+    def stop(self):
+        for grabber in self.grabbers.values():
+            grabber.stop()
+        self.grabbers = {}
+
+
+def merge_batches(older, newer):
+    """Junta dois lotes de read_batch() mantendo o frame mais recente de cada fonte.
+
+    Usado na fila entre captura e inferência: quando a inferência está ocupada,
+    os lotes que chegam (às vezes com uma só câmera) se acumulam em um único lote
+    com todas as fontes, em vez de uma câmera rápida empurrar as outras para fora.
+    """
+    merged = {packet["source"]: packet for packet in older}
+    for packet in newer:
+        merged[packet["source"]] = packet
+    return list(merged.values())
+
+
+def read_frames(source, prefetch=32):
+    """Gera (índice, frame) de todos os frames de um vídeo, sem descartar nenhum.
+
+    A decodificação roda em uma thread de leitura antecipada (até `prefetch`
+    frames), sobrepondo-se ao processamento de quem consome o gerador. Usado
+    no processamento em lote, onde cada frame importa.
+    """
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        cap.release()
+        raise FileNotFoundError(f"Não foi possível abrir o vídeo: {source}")
+
+    frames = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    end = object()
+
+    def reader():
+        index = 0
+        try:
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                while not stop.is_set():
+                    try:
+                        frames.put((index, frame), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                index += 1
+        finally:
+            cap.release()
+            frames.put(end)
+
+    thread = threading.Thread(target=reader, name="read-frames", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is end:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Libera a thread se ela estiver esperando espaço na fila
+        while thread.is_alive():
+            try:
+                frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
@@ -0,0 +1,54 @@
+# -----------------------------------------------------------------------------
+# Arquivo de configuração do main.py (JSON, ou YAML se o PyYAML estiver instalado)
+# -----------------------------------------------------------------------------
+# As chaves são os nomes das constantes do início do main.py em minúsculas:
+#
+#   {
+#     "headless": true,
+#     "available_sources": {"Entrada": "rtsp://...", "Caixa": "rtsp://..."},
+#     "multi_camera_mode": true,
+#     "alert_classes": ["knife"],
+#     "alert_threshold": 0.75
+#   }
+#
+# Só os valores presentes no arquivo são trocados; o resto mantém o padrão do
+# main.py. Uma chave desconhecida é erro (um erro de digitação não deve virar
+# uma configuração ignorada em silêncio).
+import json
+import os
+
+
+def load_config(path):
+    """Lê o arquivo de configuração e devolve um dicionário."""
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8") as f:
+        if extension in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("Arquivos YAML exigem 'pip install pyyaml' (ou use JSON).")
+            config = yaml.safe_load(f) or {}
+        else:
+            config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f"{path}: a configuração deve ser um objeto chave -> valor")
+    return config
+
+
+def apply_config(config, namespace):
+    """Sobrescreve as constantes de `namespace` (ex.: globals()) com as chaves de `config`.
+
+    Listas viram tuplas onde o padrão é uma tupla (ex.: tamanhos). Retorna os
+    nomes alterados.
+    """
+    unknown = [key for key in config if not key.isidentifier() or key.upper() not in namespace]
+    if unknown:
+        raise ValueError(f"Chaves de configuração desconhecidas: {', '.join(sorted(unknown))}")
+    changed = []
+    for key, value in config.items():
+        name = key.upper()
+        if isinstance(namespace[name], tuple) and isinstance(value, list):
+            value = tuple(value)
+        namespace[name] = value
+        changed.append(name)
+    return changed
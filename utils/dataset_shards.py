@@ -0,0 +1,275 @@
+# -----------------------------------------------------------------------------
+# Shards de treino pré-decodificados (memmap) para o model_coach.py
+# -----------------------------------------------------------------------------
+# O treino padrão do Ultralytics decodifica cada JPEG de novo a cada época. Aqui
+# as imagens do conjunto de treino são decodificadas uma única vez, reduzidas
+# para o `imgsz` do treino (lado maior = imgsz, como o Ultralytics faz) e
+# gravadas em sequência, sem compressão, em arquivos shard_NNN.bin. O index.npz
+# guarda, para cada imagem, shard/offset/formato e os rótulos YOLO.
+#
+# Na leitura cada imagem é uma fatia de um np.memmap: sem decodificação e sem
+# carregar o conjunto na RAM (o cache de páginas do sistema faz o resto). A
+# ordem é a dos nomes de arquivo, então o conjunto é determinístico.
+#
+#   python -m utils.dataset_shards <pasta_imagens> <pasta_shards> --imgsz 640
+#
+# No treino: model.train(data=<yaml com train: apontando para a pasta dos
+# shards>, trainer=ShardDetectionTrainer, ...). A validação continua lendo as
+# imagens normalmente.
+import argparse
+import collections
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+try:
+    from ultralytics.data.dataset import YOLODataset
+    from ultralytics.models.yolo.detect import DetectionTrainer
+except ImportError:  # empacotar e ler shards não precisa do ultralytics
+    YOLODataset = DetectionTrainer = None
+
+INDEX_FILE = "index.npz"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def read_yolo_labels(label_path):
+    """Rótulos (n, 5) float32 de um .txt YOLO; vazio se o arquivo não existir ou estiver vazio."""
+    # .txt vazio = negativo (ex.: utils/hard_negatives.py); o np.loadtxt avisaria a cada um
+    if not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros((0, 5), dtype=np.float32)
+    labels = np.loadtxt(label_path, dtype=np.float32, ndmin=2)
+    return labels.reshape(-1, 5)
+
+
+def _decode(image_path, imgsz):
+    image = cv2.imread(image_path)
+    if image is None:
+        return None, None
+    h0, w0 = image.shape[:2]
+    ratio = imgsz / max(h0, w0)
+    if ratio != 1:
+        w, h = min(imgsz, round(w0 * ratio)), min(imgsz, round(h0 * ratio))
+        image = cv2.resize(image, (w, h), interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+    return np.ascontiguousarray(image), (h0, w0)
+
+
+def _decode_in_order(pool, paths, imgsz, window):
+    """Decodifica em paralelo e entrega em ordem, com no máximo `window` imagens em andamento.
+
+    A janela limita a memória quando a decodificação é mais rápida que a gravação.
+    """
+    pending = collections.deque()
+    for path in paths:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(_decode, path, imgsz))
+    while pending:
+        yield pending.popleft().result()
+
+
+def pack_shards(images_dir, output_dir, labels_dir=None, imgsz=640, shard_mb=1024, workers=None):
+    """Decodifica, reduz e grava as imagens de `images_dir` em shards com índice.
+
+    Os rótulos são os .txt YOLO de mesmo nome em `labels_dir` (padrão: a própria
+    pasta das imagens). Imagens sem rótulo entram como fundo (sem caixas).
+    """
+    start_time = time.time()
+    labels_dir = labels_dir or images_dir
+    os.makedirs(output_dir, exist_ok=True)
+    files = sorted(name for name in os.listdir(images_dir) if name.lower().endswith(IMAGE_SUFFIXES))
+    shard_bytes = int(shard_mb * 1024 * 1024)
+
+    entries = {"files": [], "shard": [], "offset": [], "shape": [], "orig_shape": []}
+    labels, label_counts = [], []
+    shard_index, shard_file, shard_size = -1, None, shard_bytes
+    workers = workers or min(8, os.cpu_count() or 1)
+    try:
+        # Decodificação em paralelo (o OpenCV libera o GIL); gravação em ordem
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            paths = [os.path.join(images_dir, name) for name in files]
+            for name, (image, orig_shape) in zip(files, _decode_in_order(pool, paths, imgsz, 2 * workers)):
+                if image is None:
+                    print(f"Aviso: imagem ilegível ignorada: {name}")
+                    continue
+                if shard_size + image.nbytes > shard_bytes and shard_size > 0:
+                    if shard_file is not None:
+                        shard_file.close()
+                    shard_index += 1
+                    shard_file = open(os.path.join(output_dir, f"shard_{shard_index:03d}.bin"), "wb")
+                    shard_size = 0
+                entries["files"].append(name)
+                entries["shard"].append(shard_index)
+                entries["offset"].append(shard_size)
+                entries["shape"].append(image.shape)
+                entries["orig_shape"].append(orig_shape)
+                shard_file.write(image.data)
+                shard_size += image.nbytes
+                image_labels = read_yolo_labels(os.path.join(labels_dir, f"{Path(name).stem}.txt"))
+                labels.append(image_labels)
+                label_counts.append(len(image_labels))
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+
+    # O índice é gravado por último: shards sem índice válido não são usados
+    tmp_path = os.path.join(output_dir, "index.tmp.npz")
+    np.savez(
+        tmp_path,
+        files=np.array(entries["files"], dtype=str),
+        shard=np.array(entries["shard"], dtype=np.int32),
+        offset=np.array(entries["offset"], dtype=np.int64),
+        shape=np.array(entries["shape"], dtype=np.int32).reshape(-1, 3),
+        orig_shape=np.array(entries["orig_shape"], dtype=np.int32).reshape(-1, 2),
+        label_start=np.concatenate([[0], np.cumsum(label_counts, dtype=np.int64)]),
+        labels=np.concatenate(labels) if labels else np.zeros((0, 5), dtype=np.float32),
+        imgsz=np.int32(imgsz),
+    )
+    os.replace(tmp_path, os.path.join(output_dir, INDEX_FILE))
+    # Shards de um empacotamento anterior maior que o atual
+    for name in os.listdir(output_dir):
+        if name.startswith("shard_") and name.endswith(".bin") and int(name[6:9]) > shard_index:
+            os.remove(os.path.join(output_dir, name))
+
+    total_mb = sum(np.prod(shape) for shape in entries["shape"]) / 1024 / 1024
+    print(
+        f"✅ {len(entries['files'])} imagens em {shard_index + 1} shards ({total_mb:.0f} MB) "
+        f"em {output_dir} ({time.time() - start_time:.1f}s)"
+    )
+    return {"images": len(entries["files"]), "shards": shard_index + 1, "megabytes": round(float(total_mb), 1)}
+
+
+def is_shard_dir(path):
+    return os.path.isfile(os.path.join(str(path), INDEX_FILE))
+
+
+class ShardReader:
+    """Acesso às imagens e rótulos de uma pasta de shards (fatias de np.memmap)."""
+
+    def __init__(self, shard_dir):
+        self.shard_dir = str(shard_dir)
+        with np.load(os.path.join(self.shard_dir, INDEX_FILE)) as index:
+            self.files = index["files"].tolist()
+            self.shard = index["shard"]
+            self.offset = index["offset"]
+            self.shape = index["shape"]
+            self.orig_shape = index["orig_shape"]
+            self.label_start = index["label_start"]
+            self.all_labels = index["labels"]
+            self.imgsz = int(index["imgsz"])
+        self._maps = {}
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getstate__(self):
+        # Workers do DataLoader reabrem os memmaps (não copiam os shards no pickle)
+        state = self.__dict__.copy()
+        state["_maps"] = {}
+        return state
+
+    def _map(self, shard):
+        memmap = self._maps.get(shard)
+        if memmap is None:
+            path = os.path.join(self.shard_dir, f"shard_{shard:03d}.bin")
+            memmap = self._maps[shard] = np.memmap(path, dtype=np.uint8, mode="r")
+        return memmap
+
+    def image(self, index):
+        """Imagem BGR (h, w, 3) somente leitura, sem cópia."""
+        h, w, c = self.shape[index]
+        start = self.offset[index]
+        return self._map(int(self.shard[index]))[start : start + h * w * c].reshape(h, w, c)
+
+    def labels(self, index):
+        return self.all_labels[self.label_start[index] : self.label_start[index + 1]]
+
+
+if YOLODataset is not None:
+
+    class ShardYOLODataset(YOLODataset):
+        """YOLODataset que lê imagens e rótulos dos shards em vez dos arquivos soltos."""
+
+        def get_img_files(self, img_path):
+            self.reader = ShardReader(img_path)
+            files = [os.path.join(str(img_path), name) for name in self.reader.files]
+            if self.fraction < 1:
+                files = files[: round(len(files) * self.fraction)]
+            return files
+
+        def get_labels(self):
+            labels = []
+            for index in range(len(self.im_files)):
+                rows = self.reader.labels(index)
+                labels.append(
+                    {
+                        "im_file": self.im_files[index],
+                        "shape": tuple(int(v) for v in self.reader.orig_shape[index]),
+                        "cls": rows[:, 0:1].copy(),
+                        "bboxes": rows[:, 1:5].copy(),
+                        "segments": [],
+                        "keypoints": None,
+                        "normalized": True,
+                        "bbox_format": "xywh",
+                    }
+                )
+            return labels
+
+        def load_image(self, i, rect_mode=True):
+            # Cópia: as transformações do treino podem alterar a imagem in-place
+            image = np.array(self.reader.image(i))
+            h0, w0 = (int(v) for v in self.reader.orig_shape[i])
+            if rect_mode and max(image.shape[:2]) != self.imgsz:
+                # Shards feitos com outro imgsz: ajusta (mais lento, refaça os shards)
+                ratio = self.imgsz / max(image.shape[:2])
+                w, h = min(self.imgsz, round(image.shape[1] * ratio)), min(self.imgsz, round(image.shape[0] * ratio))
+                image = cv2.resize(image, (w, h), interpolation=cv2.INTER_LINEAR)
+            elif not rect_mode and image.shape[:2] != (self.imgsz, self.imgsz):
+                image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+            if self.augment:
+                # O mosaico sorteia imagens do buffer: mantém só os índices (a imagem vem do memmap)
+                self.buffer.append(i)
+                if len(self.buffer) >= self.max_buffer_length:
+                    self.buffer.pop(0)
+            return image, (h0, w0), image.shape[:2]
+
+    class ShardDetectionTrainer(DetectionTrainer):
+        """Trainer de detecção que usa os shards quando o caminho do conjunto é uma pasta de shards."""
+
+        def build_dataset(self, img_path, mode="train", batch=None):
+            if not is_shard_dir(img_path):
+                return super().build_dataset(img_path, mode, batch)
+            model = getattr(self.model, "module", self.model)  # DDP
+            stride = max(int(model.stride.max() if model else 0), 32)
+            return ShardYOLODataset(
+                img_path=img_path,
+                imgsz=self.args.imgsz,
+                batch_size=batch,
+                augment=mode == "train",
+                hyp=self.args,
+                rect=self.args.rect or mode == "val",
+                cache=None,  # os shards já são o cache
+                single_cls=self.args.single_cls or False,
+                stride=stride,
+                pad=0.0 if mode == "train" else 0.5,
+                prefix=f"{mode}: ",
+                task=self.args.task,
+                classes=self.args.classes,
+                data=self.data,
+                fraction=self.args.fraction if mode == "train" else 1.0,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Empacota imagens e rótulos YOLO em shards memmap")
+    parser.add_argument("images_dir", help="Pasta com as imagens (e os .txt, se --labels-dir não for dado)")
+    parser.add_argument("output_dir", help="Pasta de saída dos shards")
+    parser.add_argument("--labels-dir", default=None)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--shard-mb", type=float, default=1024)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    pack_shards(args.images_dir, args.output_dir, args.labels_dir, args.imgsz, args.shard_mb, args.workers)
@@ -0,0 +1,157 @@
+# -----------------------------------------------------------------------------
+# Registro colunar de detecções
+# -----------------------------------------------------------------------------
+# Guarda uma linha por detecção (fonte, índice do frame, timestamp, classe,
+# confiança, x1, y1, x2, y2) em arquivos colunares em blocos, para análises de
+# semanas de detecções sem rodar a inferência de novo.
+#
+# Formato: Parquet quando o pyarrow está instalado (pip install pyarrow); caso
+# contrário, blocos .npz do NumPy. O loop principal só enfileira os arrays do
+# frame; a montagem das colunas e a escrita em disco ficam em uma thread própria.
+import glob
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow é opcional
+    pa = None
+    pq = None
+
+COLUMNS = ("source", "frame", "timestamp", "class", "confidence", "x1", "y1", "x2", "y2")
+
+
+class DetectionLog:
+    """Sink de detecções com escrita em blocos feita em segundo plano."""
+
+    def __init__(self, output_dir, chunk_rows=50000, flush_interval=30.0, fmt=None):
+        self.output_dir = output_dir
+        self.chunk_rows = chunk_rows
+        self.flush_interval = flush_interval
+        self.format = fmt or ("parquet" if pq is not None else "npz")
+        if self.format == "parquet" and pq is None:
+            raise ImportError("Formato parquet requer o pacote pyarrow")
+        os.makedirs(output_dir, exist_ok=True)
+
+        self._queue = queue.SimpleQueue()
+        self._pending = []
+        self._pending_rows = 0
+        self._chunk_index = 0
+        self._last_flush = time.monotonic()
+        self._running = True
+        self.rows_written = 0
+        self.chunks_written = 0
+        self._thread = threading.Thread(target=self._writer, name="detection-log", daemon=True)
+        self._thread.start()
+
+    def append(self, source, frame_index, timestamp, classes, confidences, boxes):
+        """Registra as detecções de um frame (custo mínimo no loop principal).
+
+        classes: sequência de nomes; confidences: (N,); boxes: (N, 4) em xyxy.
+        """
+        if len(classes) == 0:
+            return
+        self._queue.put((str(source), frame_index, timestamp, classes, confidences, boxes))
+
+    def _writer(self):
+        while self._running or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                item = None
+            if isinstance(item, threading.Event):
+                # Pedido de flush síncrono (ver flush())
+                if self._pending_rows:
+                    self._flush()
+                item.set()
+                continue
+            if item is not None:
+                self._pending.append(item)
+                self._pending_rows += len(item[3])
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+            if self._pending_rows >= self.chunk_rows or (due and self._pending_rows):
+                self._flush()
+        if self._pending_rows:
+            self._flush()
+
+    def _columns(self):
+        """Monta as colunas a partir dos frames pendentes."""
+        counts = [len(item[3]) for item in self._pending]
+        boxes = np.concatenate(
+            [np.asarray(item[5], dtype=np.float32).reshape(-1, 4) for item in self._pending]
+        )
+        return {
+            "source": np.repeat([item[0] for item in self._pending], counts),
+            "frame": np.repeat(np.array([item[1] for item in self._pending], dtype=np.int64), counts),
+            "timestamp": np.repeat(np.array([item[2] for item in self._pending], dtype=np.float64), counts),
+            "class": np.concatenate([np.asarray(item[3], dtype=str) for item in self._pending]),
+            "confidence": np.concatenate(
+                [np.asarray(item[4], dtype=np.float32).reshape(-1) for item in self._pending]
+            ),
+            "x1": boxes[:, 0],
+            "y1": boxes[:, 1],
+            "x2": boxes[:, 2],
+            "y2": boxes[:, 3],
+        }
+
+    def _flush(self):
+        try:
+            columns = self._columns()
+            rows = len(columns["frame"])
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            name = f"detections-{stamp}-{os.getpid()}-{self._chunk_index:05d}"
+            path = os.path.join(self.output_dir, f"{name}.{self.format}")
+            tmp_path = path + ".tmp"
+            if self.format == "parquet":
+                table = pa.table({key: columns[key] for key in COLUMNS})
+                pq.write_table(table, tmp_path, compression="zstd")
+            else:
+                with open(tmp_path, "wb") as f:
+                    np.savez_compressed(f, **columns)
+            os.replace(tmp_path, path)
+            self._chunk_index += 1
+            self.chunks_written += 1
+            self.rows_written += rows
+        except Exception as e:
+            print(f"Erro ao gravar bloco do registro de detecções: {e}")
+        self._pending = []
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def flush(self, timeout=30.0):
+        """Força a gravação de tudo que já foi enfileirado e espera terminar."""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        """Grava o que estiver pendente e encerra a thread de escrita."""
+        self._running = False
+        self._thread.join(timeout=30.0)
+
+
+def load_detection_log(output_dir):
+    """Lê todos os blocos de uma pasta e retorna um dicionário coluna -> array."""
+    paths = sorted(glob.glob(os.path.join(output_dir, "detections-*.parquet")))
+    paths += sorted(glob.glob(os.path.join(output_dir, "detections-*.npz")))
+    parts = {key: [] for key in COLUMNS}
+    for path in paths:
+        if path.endswith(".parquet"):
+            if pq is None:
+                raise ImportError("Leitura de parquet requer o pacote pyarrow")
+            table = pq.read_table(path)
+            for key in COLUMNS:
+                parts[key].append(table.column(key).to_numpy(zero_copy_only=False))
+        else:
+            with np.load(path) as data:
+                for key in COLUMNS:
+                    parts[key].append(data[key])
+    return {
+        key: np.concatenate(values) if values else np.array([])
+        for key, values in parts.items()
+    }
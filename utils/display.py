@@ -0,0 +1,104 @@
+# -----------------------------------------------------------------------------
+# Utilitários de exibição
+# -----------------------------------------------------------------------------
+import math
+
+import cv2
+import numpy as np
+
+
+def grid_shape(count):
+    """Número de (linhas, colunas) para exibir `count` feeds em grade."""
+    if count <= 0:
+        return 0, 0
+    cols = math.ceil(math.sqrt(count))
+    rows = math.ceil(count / cols)
+    return rows, cols
+
+
+def tile_frames(frames, tile_size=(640, 360)):
+    """Monta uma grade com os frames (BGR ou RGB), cada um reduzido a `tile_size`.
+
+    Células vazias ficam pretas. Com um único frame ele é devolvido sem cópia.
+    """
+    if len(frames) == 1:
+        return frames[0]
+    rows, cols = grid_shape(len(frames))
+    tile_w, tile_h = tile_size
+    mosaic = np.zeros((rows * tile_h, cols * tile_w, 3), dtype=np.uint8)
+    for index, frame in enumerate(frames):
+        row, col = divmod(index, cols)
+        y, x = row * tile_h, col * tile_w
+        mosaic[y : y + tile_h, x : x + tile_w] = cv2.resize(
+            frame, (tile_w, tile_h), interpolation=cv2.INTER_AREA
+        )
+    return mosaic
+
+
+def fit_size(width, height, max_width, max_height):
+    """Maior (w, h) com a proporção de (width, height) que cabe em (max_width, max_height), sem ampliar."""
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def display_layout(frame_shapes, display_size, tile_size=(640, 360)):
+    """Tamanho da imagem exibida e retângulos (x, y, w, h) de cada feed.
+
+    Um feed ocupa a área de exibição mantendo a proporção; vários feeds formam
+    uma grade de células com a proporção de `tile_size`, reduzida para caber.
+    """
+    max_w, max_h = display_size
+    if len(frame_shapes) == 1:
+        height, width = frame_shapes[0][:2]
+        w, h = fit_size(width, height, max_w, max_h)
+        return (w, h), [(0, 0, w, h)]
+    rows, cols = grid_shape(len(frame_shapes))
+    tile_w, tile_h = fit_size(tile_size[0], tile_size[1], max_w // cols, max_h // rows)
+    rects = []
+    for index in range(len(frame_shapes)):
+        row, col = divmod(index, cols)
+        rects.append((col * tile_w, row * tile_h, tile_w, tile_h))
+    return (cols * tile_w, rows * tile_h), rects
+
+
+class DisplayCanvas:
+    """Buffers reaproveitados para a imagem exibida (RGB, já no tamanho da tela).
+
+    Cada fonte tem uma célula persistente onde o frame é reduzido e desenhado;
+    `compose` copia as células para um anel de `slots` imagens. O anel precisa
+    cobrir os itens na fila do pipeline + o que o Tk está exibindo + o que está
+    sendo escrito, para nunca sobrescrever uma imagem ainda em uso.
+    """
+
+    def __init__(self, slots=4):
+        self.slots = slots
+        self._ring = []
+        self._ring_key = None
+        self._next = 0
+        self._cells = {}  # fonte -> {"buffer", "frame_id"}
+
+    def cell(self, source, size):
+        """Buffer BGR/RGB (h, w, 3) da fonte; realocado só quando o tamanho muda."""
+        w, h = size
+        cell = self._cells.get(source)
+        if cell is None or cell["buffer"].shape[:2] != (h, w):
+            cell = {"buffer": np.empty((h, w, 3), dtype=np.uint8), "frame_id": None}
+            self._cells[source] = cell
+        return cell
+
+    def compose(self, cells, rects, size):
+        """Copia as células para o próximo buffer do anel e o devolve."""
+        key = (size, tuple(rects))
+        if key != self._ring_key:
+            # Layout novo: buffers zerados (células vazias da grade ficam pretas)
+            w, h = size
+            self._ring = [np.zeros((h, w, 3), dtype=np.uint8) for _ in range(self.slots)]
+            self._ring_key = key
+        image = self._ring[self._next]
+        self._next = (self._next + 1) % self.slots
+        for cell, (x, y, w, h) in zip(cells, rects):
+            image[y : y + h, x : x + w] = cell["buffer"]
+        return image
+
+    def reset(self):
+        self._cells.clear()
@@ -0,0 +1,274 @@
+# -----------------------------------------------------------------------------
+# Mineração de exemplos difíceis (falsos positivos da produção) para o treino
+# -----------------------------------------------------------------------------
+# O detector ao vivo oferece ao minerador os frames que disparam alerta e os
+# frames com detecções incertas (confiança entre HARD_NEGATIVE_MIN_CONFIDENCE e
+# o limiar de alerta). O loop de vídeo só enfileira uma cópia do frame; uma
+# thread própria calcula um hash perceptual (dHash de 64 bits), descarta frames
+# quase idênticos aos já guardados (distância de Hamming pequena: a mesma cena
+# parada não vira mil imagens) e grava o frame original (sem anotações) com as
+# detecções do modelo em um índice JSONL.
+#
+#   <pasta>/images/*.jpg     frames guardados
+#   <pasta>/index.jsonl      uma linha por frame: hash, fonte, motivo, detecções
+#
+# Depois, fora da produção:
+#   python -m utils.hard_negatives export data/hard_negatives data/revisar --classes fork knife scissors
+#     copia as imagens com pré-rótulos YOLO (.txt + classes.txt) para revisão no
+#     LabelImg/CVAT/Label Studio: apague as caixas erradas; .txt vazio = negativo
+#   python -m utils.hard_negatives merge data/revisar <dataset>/train/data --classes fork knife scissors
+#     junta as imagens revisadas ao dataset YOLO do model_coach.py (prefixo hn_)
+import argparse
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+import cv2
+import numpy as np
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+MERGE_PREFIX = "hn_"
+
+
+def dhash(frame, hash_size=8):
+    """Hash perceptual (diferença horizontal) de 64 bits como inteiro sem sinal."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming_distances(hashes, value):
+    """Distância de Hamming entre `value` e cada hash do array uint64."""
+    diff = np.bitwise_xor(hashes, np.uint64(value))
+    return np.unpackbits(diff.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class HardNegativeMiner:
+    """Amostra frames alertados e incertos para uma pasta local sem duplicatas."""
+
+    def __init__(self, store_dir, classes, min_confidence=0.25, max_confidence=0.70, interval=10.0,
+                 max_distance=6, jpeg_quality=95, queue_size=16):
+        self.store_dir = store_dir
+        self.images_dir = os.path.join(store_dir, "images")
+        self.index_path = os.path.join(store_dir, "index.jsonl")
+        self.classes = {name.lower() for name in classes}
+        self.min_confidence = min_confidence
+        self.max_confidence = max_confidence
+        self.interval = interval
+        self.max_distance = max_distance
+        self.jpeg_quality = jpeg_quality
+        os.makedirs(self.images_dir, exist_ok=True)
+
+        hashes = []
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                hashes = [int(json.loads(line)["hash"], 16) for line in f if line.strip()]
+        self._hashes = np.array(hashes, dtype=np.uint64)
+        self._last_sample = {}  # fonte -> horário do último frame incerto oferecido
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._running = True
+        self.saved = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._worker, name="hard-negatives", daemon=True)
+        self._thread.start()
+
+    def _uncertain(self, detections):
+        if not len(detections):
+            return False
+        names = detections.class_names()
+        wanted = np.array([name.lower() in self.classes for name in names], dtype=bool)
+        band = (detections.conf >= self.min_confidence) & (detections.conf < self.max_confidence)
+        return bool((wanted & band).any())
+
+    def observe(self, source, frame, detections, timestamp, alerted=False):
+        """Decide se o frame vale ser guardado e enfileira uma cópia (sem bloquear)."""
+        if alerted:
+            reason = "alert"
+        elif self._uncertain(detections):
+            # Frames incertos se repetem por vários segundos: no máximo um por intervalo e fonte
+            if timestamp - self._last_sample.get(source, float("-inf")) < self.interval:
+                return False
+            self._last_sample[source] = timestamp
+            reason = "uncertain"
+        else:
+            return False
+        item = {
+            "source": str(source),
+            "timestamp": timestamp,
+            "reason": reason,
+            "frame": frame.copy(),
+            "detections": detections.to_records(),
+        }
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _save(self, item):
+        frame = item.pop("frame")
+        value = dhash(frame)
+        if len(self._hashes) and hamming_distances(self._hashes, value).min() <= self.max_distance:
+            self.duplicates += 1
+            return
+        safe_source = "".join(c if c.isalnum() else "_" for c in item["source"])
+        name = f"{safe_source}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(item['timestamp']))}_{value:016x}.jpg"
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        with open(os.path.join(self.images_dir, name), "wb") as f:
+            f.write(buffer.tobytes())
+        record = {
+            "file": name,
+            "hash": f"{value:016x}",
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            **item,
+        }
+        # O índice é escrito depois da imagem: uma linha sempre aponta para um arquivo completo
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._hashes = np.append(self._hashes, np.uint64(value))
+        self.saved += 1
+
+    def _worker(self):
+        while self._running or not self._queue.empty():
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._save(item)
+            except Exception as e:
+                print(f"Erro ao guardar frame para mineração: {e}")
+
+    def close(self, timeout=5.0):
+        """Grava os frames ainda na fila e para a thread."""
+        self._running = False
+        self._thread.join(timeout=timeout)
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "saved": self.saved,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "stored": len(self._hashes),
+        }
+
+
+def read_index(store_dir):
+    with open(os.path.join(store_dir, "index.jsonl"), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def export_for_labeling(store_dir, output_dir, class_names, reasons=None):
+    """Copia os frames guardados com pré-rótulos YOLO (detecções do modelo) para revisão.
+
+    Só as detecções de `class_names` viram caixas; frames já exportados não são
+    copiados de novo (a revisão em andamento é preservada).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    class_ids = {name.lower(): index for index, name in enumerate(class_names)}
+    with open(os.path.join(output_dir, "classes.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(class_names) + "\n")
+    exported = skipped = 0
+    for record in read_index(store_dir):
+        if reasons and record["reason"] not in reasons:
+            continue
+        target = os.path.join(output_dir, record["file"])
+        label_path = os.path.splitext(target)[0] + ".txt"
+        if os.path.exists(target) or os.path.exists(label_path):
+            skipped += 1
+            continue
+        width, height = record["width"], record["height"]
+        lines = []
+        for detection in record["detections"]:
+            class_id = class_ids.get(detection["class"].lower())
+            if class_id is None:
+                continue
+            x1, y1, x2, y2 = detection["xyxy"]
+            lines.append(
+                f"{class_id} {(x1 + x2) / 2 / width:.6f} {(y1 + y2) / 2 / height:.6f} "
+                f"{(x2 - x1) / width:.6f} {(y2 - y1) / height:.6f}"
+            )
+        shutil.copyfile(os.path.join(store_dir, "images", record["file"]), target)
+        with open(label_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        exported += 1
+    print(f"✅ {exported} frames exportados para revisão em {output_dir} ({skipped} já estavam lá)")
+    return {"exported": exported, "skipped": skipped}
+
+
+def merge_into_dataset(labeled_dir, dataset_dir, class_names, prefix=MERGE_PREFIX):
+    """Junta as imagens revisadas (imagem + .txt YOLO) à pasta de treino do dataset.
+
+    As classes do .txt são traduzidas pelo nome (classes.txt da revisão ->
+    `class_names` do dataset); caixas de classes fora do dataset são descartadas.
+    Imagens sem .txt são ignoradas. Um .txt vazio entra como negativo difícil.
+    """
+    classes_path = os.path.join(labeled_dir, "classes.txt")
+    if os.path.exists(classes_path):
+        with open(classes_path, "r", encoding="utf-8") as f:
+            labeled_names = [line.strip() for line in f if line.strip()]
+    else:
+        labeled_names = list(class_names)
+    dataset_ids = {name.lower(): index for index, name in enumerate(class_names)}
+    remap = {index: dataset_ids.get(name.lower()) for index, name in enumerate(labeled_names)}
+
+    os.makedirs(dataset_dir, exist_ok=True)
+    negatives = positives = unlabeled = 0
+    for name in sorted(os.listdir(labeled_dir)):
+        stem, suffix = os.path.splitext(name)
+        if suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        label_path = os.path.join(labeled_dir, f"{stem}.txt")
+        if not os.path.exists(label_path):
+            unlabeled += 1
+            continue
+        lines = []
+        with open(label_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) != 5:
+                    continue
+                class_id = remap.get(int(parts[0]))
+                if class_id is not None:
+                    lines.append(" ".join([str(class_id), *parts[1:]]))
+        shutil.copyfile(os.path.join(labeled_dir, name), os.path.join(dataset_dir, f"{prefix}{name}"))
+        with open(os.path.join(dataset_dir, f"{prefix}{stem}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        if lines:
+            positives += 1
+        else:
+            negatives += 1
+    print(
+        f"✅ Dataset {dataset_dir}: {negatives} negativos difíceis e {positives} positivos adicionados "
+        f"({unlabeled} imagens sem .txt ignoradas)"
+    )
+    return {"negatives": negatives, "positives": positives, "unlabeled": unlabeled}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta e junta ao dataset os frames minerados da produção")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Copia os frames guardados com pré-rótulos para revisão")
+    export_parser.add_argument("store_dir")
+    export_parser.add_argument("output_dir")
+    export_parser.add_argument("--classes", nargs="+", required=True, help="Classes do dataset, na ordem dos ids")
+    export_parser.add_argument("--reasons", nargs="+", choices=("alert", "uncertain"), default=None)
+    merge_parser = subparsers.add_parser("merge", help="Junta as imagens revisadas à pasta de treino YOLO")
+    merge_parser.add_argument("labeled_dir")
+    merge_parser.add_argument("dataset_dir", help="Pasta de imagens/rótulos de treino (ex.: <base>/train/data)")
+    merge_parser.add_argument("--classes", nargs="+", required=True, help="Classes do dataset, na ordem dos ids")
+    args = parser.parse_args()
+    if args.command == "export":
+        export_for_labeling(args.store_dir, args.output_dir, args.classes, args.reasons)
+    else:
+        merge_into_dataset(args.labeled_dir, args.dataset_dir, args.classes)
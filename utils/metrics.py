@@ -0,0 +1,193 @@
+# -----------------------------------------------------------------------------
+# Métricas do detector ao vivo (formato Prometheus) e linha de log periódica
+# -----------------------------------------------------------------------------
+# Cada etapa do caminho quente registra sua duração com `metrics.timer(...)`
+# ou `metrics.observe(...)`: só um perf_counter e um append em um buffer
+# circular por amostra. Percentis, contadores e medidores são montados apenas
+# quando alguém lê /metrics (ou quando sai a linha de log), então o custo no
+# loop de vídeo é mínimo.
+#
+#   curl http://127.0.0.1:9100/metrics
+#
+# Com várias instâncias, compare `visionguard_frame_age_ms` (idade do frame ao
+# ser exibido) e `visionguard_source_fps`: a instância que está ficando para
+# trás aparece sem precisar olhar a janela dela.
+import os
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+PREFIX = "visionguard"
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{str(value).replace(chr(34), chr(39))}"' for key, value in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Metrics:
+    """Contadores, medidores e latências por etapa com leitura sob demanda."""
+
+    def __init__(self, instance=None, window=2048):
+        self.instance = instance or f"{socket.gethostname()}-{os.getpid()}"
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = {}  # (etapa, labels) -> deque de ms
+        self._totals = {}  # (etapa, labels) -> [quantidade, soma]
+        self._counters = {}  # (nome, labels) -> valor
+        self._gauges = {}  # (nome, labels) -> valor
+        self._collectors = []
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def observe(self, stage, milliseconds, **labels):
+        key = self._key(stage, labels)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._totals[key] = [0, 0.0]
+            samples.append(milliseconds)
+            totals = self._totals[key]
+            totals[0] += 1
+            totals[1] += milliseconds
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - start) * 1000.0, **labels)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_counter(self, name, value, **labels):
+        """Contador mantido em outro objeto (ex.: frames descartados do grabber): copia o total."""
+        with self._lock:
+            self._counters[self._key(name, labels)] = value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def add_collector(self, collector):
+        """`collector(metrics)` é chamado a cada leitura para atualizar medidores (ex.: filas)."""
+        self._collectors.append(collector)
+
+    def _collect(self):
+        for collector in self._collectors:
+            try:
+                collector(self)
+            except Exception as e:
+                print(f"Aviso: falha ao coletar métricas: {e}")
+
+    def snapshot(self):
+        """Cópia consistente: {"stages", "counters", "gauges"} com percentis calculados."""
+        self._collect()
+        with self._lock:
+            samples = {key: np.fromiter(values, dtype=np.float64) for key, values in self._samples.items()}
+            totals = {key: list(values) for key, values in self._totals.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        stages = {}
+        for key, values in samples.items():
+            if not len(values):
+                continue
+            quantiles = np.quantile(values, QUANTILES)
+            stages[key] = {
+                "quantiles": dict(zip(QUANTILES, quantiles.tolist())),
+                "count": totals[key][0],
+                "sum": totals[key][1],
+            }
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def render_prometheus(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        snapshot = self.snapshot()
+        base = {"instance": self.instance}
+        lines = [
+            f"# TYPE {PREFIX}_stage_latency_ms summary",
+        ]
+        for (stage, labels), data in sorted(snapshot["stages"].items()):
+            stage_labels = {**base, **dict(labels), "stage": stage}
+            for quantile, value in data["quantiles"].items():
+                lines.append(
+                    f"{PREFIX}_stage_latency_ms{_labels({**stage_labels, 'quantile': quantile})} {value:.3f}"
+                )
+            lines.append(f"{PREFIX}_stage_latency_ms_sum{_labels(stage_labels)} {data['sum']:.3f}")
+            lines.append(f"{PREFIX}_stage_latency_ms_count{_labels(stage_labels)} {data['count']}")
+
+        for kind, values, suffix in (("counter", snapshot["counters"], "_total"), ("gauge", snapshot["gauges"], "")):
+            for name in sorted({name for name, _ in values}):
+                lines.append(f"# TYPE {PREFIX}_{name}{suffix} {kind}")
+                for (metric, labels), value in sorted(values.items()):
+                    if metric == name:
+                        lines.append(f"{PREFIX}_{name}{suffix}{_labels({**base, **dict(labels)})} {value}")
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds{_labels(base)} {time.time() - self.started_at:.1f}")
+        return "\n".join(lines) + "\n"
+
+    def log_line(self):
+        """Resumo em uma linha: p95 por etapa e contadores principais."""
+        snapshot = self.snapshot()
+        parts = [f"[{self.instance}]"]
+        by_stage = {}
+        for (stage, labels), data in snapshot["stages"].items():
+            if not labels:
+                by_stage[stage] = data["quantiles"][0.95]
+        parts.extend(f"{stage} p95={value:.1f}ms" for stage, value in sorted(by_stage.items()))
+        counters = {}
+        for (name, _), value in snapshot["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+        parts.extend(f"{name}={value}" for name, value in sorted(counters.items()))
+        return " | ".join(parts)
+
+    def start_log(self, interval):
+        """Imprime `log_line()` a cada `interval` segundos em uma thread daemon."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                print(self.log_line())
+
+        thread = threading.Thread(target=loop, name="metrics-log", daemon=True)
+        thread.start()
+        return thread
+
+
+def serve_metrics(metrics, port=9100, host="127.0.0.1"):
+    """Sobe o endpoint HTTP (/metrics) em uma thread daemon; devolve o servidor."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass  # um scrape a cada poucos segundos não deve poluir o console
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -11,28 +11,36 @@
 # -----------------------------------------------------------------------------
 # Passo 2: Importação bibliotecas
 # -----------------------------------------------------------------------------
+import hashlib
+import json
 import os
-import cv2
 import time
-import shutil
-import ultralytics
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
-from ultralytics import YOLO
+import shutil
 
-# Importar as bibliotecas para formação dataset COCO
-import fiftyone as fo
-import fiftyone.zoo as foz
+import numpy as np
+import yaml
+from tqdm import tqdm
 
-from pathlib import Path
+# ultralytics e fiftyone são importados dentro das funções que os usam: a
+# conversão COCO -> YOLO roda sem eles.
 
 # Diretório base para o dataset
 # Substitua pelo caminho desejado no seu sistema
 base_dir = "\\Dev\\techchallenge\\fase05_gpu\\datasets\\coco_cutlery_gpu"
 
-os.makedirs(base_dir, exist_ok=True)
 classes = ["fork", "knife", "scissors"]
 
-ultralytics.checks()
+# Pasta com uma cópia local do coco-2017 no layout do zoo do FiftyOne (ex.: a
+# ~/fiftyone/coco-2017 de outra máquina). Com ela nada é baixado; None = zoo.
+dataset_cache_dir = None
+
+# Pasta com frames da produção já revisados (python -m utils.hard_negatives
+# export ...): entram no treino como negativos difíceis/positivos. None = não usa.
+hard_negatives_dir = None
 
 # -----------------------------------------------------------------------------
 # Passo 3: Download datasets COCO:
@@ -42,37 +50,133 @@ ultralytics.checks()
 # -----------------------------------------------------------------------------
 # Passo 3.1: Baixar e exportar dataset COCO filtrado
 # -----------------------------------------------------------------------------
-def download_and_export_dataset(split, max_samples, base_dir, classes):
+# Exportar o split inteiro a cada execução copia milhares de imagens de novo
+# por qualquer ajuste em `classes` ou `max_samples`. O manifesto na pasta
+# exportada guarda as imagens já copiadas (nome e tamanho): uma nova execução
+# copia só as que faltam, apaga as que saíram da seleção e, se nada mudou, não
+# toca em nenhum arquivo. Cada imagem é gravada com nome temporário + rename e o
+# manifesto é salvo a cada bloco, então uma exportação interrompida continua de
+# onde parou.
+
+EXPORT_MANIFEST = ".export_manifest.json"  # dentro da pasta exportada (train/ ou val/)
+
+
+def _save_export_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def _export_image(source, target):
+    """Copia uma imagem para a pasta exportada (hard link quando possível)."""
+    tmp_path = target + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def download_and_export_dataset(split, max_samples, base_dir, classes, cache_dir=None, save_every=200):
     """
     Downloads and exports COCO dataset for a specific split
+
+    Só as imagens novas são exportadas (ver EXPORT_MANIFEST). Com `cache_dir`,
+    o dataset é lido dessa pasta (layout do zoo) e nada é baixado.
     """
-    print(f"Baixando conjunto de {split}...")
+    import fiftyone as fo
+    import fiftyone.zoo as foz
+
+    zoo_kwargs = {}
+    if cache_dir:
+        zoo_kwargs = {"dataset_dir": cache_dir, "download_if_necessary": False}
+        print(f"Carregando conjunto de {split} do cache local {cache_dir}...")
+    else:
+        print(f"Baixando conjunto de {split}...")
     dataset = foz.load_zoo_dataset(
         "coco-2017",
         split=split,
         label_types=["detections"],
         classes=classes,
-        max_samples=max_samples
+        max_samples=max_samples,
+        **zoo_kwargs
         #overwrite=True
     )
 
     export_dir = os.path.join(base_dir, "train" if split == "train" else "val")
-    print(f"Exportando {split}...")
+    data_dir = os.path.join(export_dir, "data")
+    labels_path = os.path.join(export_dir, "labels.json")
+    manifest_path = os.path.join(export_dir, EXPORT_MANIFEST)
+    os.makedirs(data_dir, exist_ok=True)
+
+    manifest = {"files": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    exported = manifest.get("files", {})
+
+    sources = {os.path.basename(path): path for path in dataset.values("filepath")}
+    # O labels.json usa file_name relativo a uma única pasta de mídia (rel_dir): com
+    # várias, o FiftyOne gravaria caminhos absolutos e o dataset não poderia ser movido
+    media_dirs = {os.path.dirname(path) for path in sources.values()}
+    if len(media_dirs) > 1:
+        raise ValueError(
+            f"As imagens de {split} vêm de {len(media_dirs)} pastas ({', '.join(sorted(media_dirs)[:3])}...); "
+            "a exportação sem cópia das mídias exige uma única pasta de origem"
+        )
+    missing = [
+        name for name in sorted(sources)
+        if exported.get(name) is None or not os.path.exists(os.path.join(data_dir, name))
+        or os.path.getsize(os.path.join(data_dir, name)) != exported[name]
+    ]
+    stale = sorted(set(exported) - set(sources))
+    selection_changed = manifest.get("classes") != list(classes) or manifest.get("max_samples") != max_samples
+    if not missing and not stale and not selection_changed and os.path.exists(labels_path):
+        print(f"{split}: {len(sources)} imagens já exportadas em {export_dir}, nada a fazer.")
+        return
+
+    print(
+        f"Exportando {split}: {len(missing)} novas, {len(stale)} removidas, "
+        f"{len(sources) - len(missing)} já exportadas..."
+    )
+    for name in stale:
+        image_path = os.path.join(data_dir, name)
+        if os.path.exists(image_path):
+            os.remove(image_path)
+        del exported[name]
+
+    manifest.update({"split": split, "classes": list(classes), "max_samples": max_samples, "files": exported})
+    for count, name in enumerate(tqdm(missing, desc=f"Exportando {split}"), 1):
+        target = os.path.join(data_dir, name)
+        _export_image(sources[name], target)
+        exported[name] = os.path.getsize(target)
+        if count % save_every == 0:
+            _save_export_manifest(manifest_path, manifest)
+    _save_export_manifest(manifest_path, manifest)
+
+    # Só o labels.json é regravado por completo (as imagens já estão na pasta):
+    # file_name = nome da imagem, como na exportação com cópia das mídias
     dataset.export(
-        export_dir=export_dir,
+        labels_path=labels_path,
         dataset_type=fo.types.COCODetectionDataset,
-        label_field="ground_truth"
+        label_field="ground_truth",
+        export_media=False,
+        rel_dir=media_dirs.pop() if media_dirs else None,
     )
 
 # -----------------------------------------------------------------------------
 # Passo 3.2: Criar YAML para treino do YOLO
 # -----------------------------------------------------------------------------
-def create_yaml_config(base_dir, class_names):
+def create_yaml_config(base_dir, class_names, train_dir="train/data"):
     """
     Creates YAML configuration file for YOLO training
     Args:
         base_dir: Base directory path
         class_names: List of class names
+        train_dir: Pasta de treino relativa a base_dir (imagens ou shards de utils/dataset_shards.py)
     """
     yaml_path = os.path.join(base_dir, "coco_cutlery_gpu.yaml")
     
@@ -82,7 +186,7 @@ def create_yaml_config(base_dir, class_names):
     # Format YAML content
     yaml_content = {
         'path': base_dir,
-        'train': 'train/data',
+        'train': train_dir,
         'val': 'val/data',
         'names': names_dict
     }
@@ -96,98 +200,310 @@ def create_yaml_config(base_dir, class_names):
         raise
 
 
-import json
-import os
-from pathlib import Path
-from tqdm import tqdm
-import yaml
-
 # ----------------------------
 # Passo 4: Configurações para converter COCO JSON para YOLO format com filtro de classes
 # ----------------------------
+# O instances_train2017.json tem ~450 MB: em vez de json.load (vários GB de
+# dicionários), o arquivo é lido em blocos e cada item das listas "images",
+# "annotations" e "categories" é decodificado e descartado na hora. Das
+# anotações ficam só image_id, category_id e bbox em arrays NumPy compactos; a
+# normalização das caixas é vetorizada e os .txt são escritos por um pool de
+# threads. Um manifesto com o hash de cada rótulo evita reescrever arquivos
+# que não mudaram (e remove os que deixaram de existir, ex.: classe retirada).
+
+LABELS_MANIFEST = ".yolo_labels.json"  # manifesto de hashes, dentro da pasta de rótulos
+LINE_FORMAT = "%d %.6f %.6f %.6f %.6f"
+
+
+class _JsonStream:
+    """Leitor incremental de JSON: decodifica um valor por vez a partir de blocos do arquivo."""
+
+    NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+    def __init__(self, f, chunk_size=1 << 20):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Próximo caractere não-branco, sem consumi-lo ("" no fim do arquivo)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def take(self, expected):
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"JSON inválido: esperado um de {expected!r}, encontrado {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        number = self.peek() in self.NUMBER_CHARS
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Valor cortado no fim do bloco: lê mais e tenta de novo
+                if self._fill():
+                    continue
+                raise
+            # Um número no fim do bloco pode estar incompleto ("12" de "1234", "12" de "12.5"):
+            # se só há caracteres de número até o fim do bloco, lê mais antes de aceitar
+            rest = self.buf[end:]
+            if number and not self.eof and all(char in self.NUMBER_CHARS for char in rest) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_arrays(json_path, keys):
+    """Gera (chave, item) para cada elemento das listas de primeiro nível em `keys`.
+
+    Os demais valores do objeto são decodificados e descartados (devem ser
+    pequenos, como "info" e "licenses" no COCO).
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f)
+        stream.take("{")
+        if stream.peek() == "}":
+            return
+        while True:
+            key = stream.value()
+            stream.take(":")
+            if key in keys and stream.peek() == "[":
+                stream.take("[")
+                if stream.peek() == "]":
+                    stream.take("]")
+                else:
+                    while True:
+                        yield key, stream.value()
+                        if stream.take(",]") == "]":
+                            break
+            else:
+                stream.value()
+            if stream.take(",}") == "}":
+                break
+
+
+def read_coco_annotations(json_path):
+    """Lê imagens, caixas e categorias de um JSON COCO em uma única passada, em streaming.
+
+    Retorna arrays NumPy (ids/tamanhos das imagens, image_id/category_id/bbox
+    das anotações), a lista de nomes de arquivo e {id da categoria: nome}.
+    """
+    image_ids, widths, heights, file_names = array("q"), array("d"), array("d"), []
+    ann_image_ids, ann_category_ids, ann_boxes = array("q"), array("q"), array("d")
+    categories = {}
+    for key, item in iter_json_arrays(json_path, ("images", "annotations", "categories")):
+        if key == "annotations":
+            ann_image_ids.append(item["image_id"])
+            ann_category_ids.append(item["category_id"])
+            ann_boxes.extend(item["bbox"])
+        elif key == "images":
+            image_ids.append(item["id"])
+            widths.append(item["width"])
+            heights.append(item["height"])
+            file_names.append(item["file_name"])
+        else:
+            categories[item["id"]] = item["name"]
+    return {
+        "image_ids": np.frombuffer(image_ids, dtype=np.int64),
+        "widths": np.frombuffer(widths, dtype=np.float64),
+        "heights": np.frombuffer(heights, dtype=np.float64),
+        "file_names": file_names,
+        "ann_image_ids": np.frombuffer(ann_image_ids, dtype=np.int64),
+        "ann_category_ids": np.frombuffer(ann_category_ids, dtype=np.int64),
+        "ann_boxes": np.frombuffer(ann_boxes, dtype=np.float64).reshape(-1, 4),
+        "categories": categories,
+    }
 
-# ----------------------------
-# Carregar JSON do COCO
-# ----------------------------
-def load_coco_json(json_path):
-    """Load and parse COCO JSON file"""
-    with open(json_path, 'r') as f:
-        return json.load(f)
-
-def create_category_mappings(coco_data, wanted_classes):
-    """Create category ID to name mappings"""
-    category_id_to_name = {cat['id']: cat['name'] for cat in coco_data['categories']}
-    name_to_new_id = {name: idx for idx, name in enumerate(wanted_classes)}
-    return category_id_to_name, name_to_new_id
-
-def group_annotations_by_image(coco_data, category_id_to_name, wanted_classes):
-    """Group annotations by image ID, filtering for wanted classes"""
-    annotations_by_image = {}
-    for ann in coco_data['annotations']:
-        category_name = category_id_to_name[ann['category_id']]
-        if category_name in wanted_classes:
-            image_id = ann['image_id']
-            if image_id not in annotations_by_image:
-                annotations_by_image[image_id] = []
-            annotations_by_image[image_id].append(ann)
-    return annotations_by_image
 
 def convert_bbox_to_yolo(bbox, img_w, img_h):
-    """Convert COCO bbox to YOLO format"""
-    x, y, w, h = bbox
-    x_center = (x + w / 2) / img_w
-    y_center = (y + h / 2) / img_h
-    w_norm = w / img_w
-    h_norm = h / img_h
-    return x_center, y_center, w_norm, h_norm
-
-def convert_coco_to_yolo(json_path, images_dir, labels_dir, wanted_classes):
-    
-    """Convert a COCO-format JSON file to YOLO-format .txt files"""
-    os.makedirs(labels_dir, exist_ok=True)
-    with open(json_path, 'r') as f:
-        coco_data = json.load(f)
-
-    category_id_to_name = {cat['id']: cat['name'] for cat in coco_data['categories']}
+    """Convert COCO bbox (x, y, w, h) to YOLO format; aceita arrays (N, 4) com img_w/img_h (N,)"""
+    bbox = np.asarray(bbox, dtype=np.float64)
+    img_w = np.asarray(img_w, dtype=np.float64)[..., None]
+    img_h = np.asarray(img_h, dtype=np.float64)[..., None]
+    yolo = np.empty_like(bbox)
+    yolo[..., 0:1] = (bbox[..., 0:1] + bbox[..., 2:3] / 2) / img_w
+    yolo[..., 1:2] = (bbox[..., 1:2] + bbox[..., 3:4] / 2) / img_h
+    yolo[..., 2:3] = bbox[..., 2:3] / img_w
+    yolo[..., 3:4] = bbox[..., 3:4] / img_h
+    return yolo
+
+
+def build_yolo_labels(coco, wanted_classes, images_dir=None):
+    """Agrupa as caixas das classes desejadas por imagem: lista de (stem, class_ids, caixas YOLO).
+
+    Com `images_dir`, só entram imagens que existem na pasta (as exportadas).
+    """
     name_to_new_id = {name: idx for idx, name in enumerate(wanted_classes)}
+    # Tabela category_id -> nova classe (-1 = descartar)
+    lut = np.full(max(coco["categories"], default=0) + 1, -1, dtype=np.int64)
+    for category_id, name in coco["categories"].items():
+        if name in name_to_new_id:
+            lut[category_id] = name_to_new_id[name]
+    category_ids = coco["ann_category_ids"]
+    valid = (category_ids >= 0) & (category_ids < len(lut))
+    new_ids = np.full(len(category_ids), -1, dtype=np.int64)
+    new_ids[valid] = lut[category_ids[valid]]
+    keep = np.flatnonzero(new_ids >= 0)
+
+    # Índice da imagem de cada anotação (ids ordenados + searchsorted)
+    order = np.argsort(coco["image_ids"], kind="stable")
+    sorted_ids = coco["image_ids"][order]
+    positions = np.searchsorted(sorted_ids, coco["ann_image_ids"][keep])
+    found = positions < len(sorted_ids)
+    found[found] = sorted_ids[positions[found]] == coco["ann_image_ids"][keep][found]
+    keep, image_index = keep[found], order[positions[found]]
+
+    if images_dir is not None and os.path.isdir(images_dir):
+        present = set(os.listdir(images_dir))
+        exported = np.array([name in present for name in coco["file_names"]], dtype=bool)
+        mask = exported[image_index]
+        keep, image_index = keep[mask], image_index[mask]
+
+    boxes = convert_bbox_to_yolo(
+        coco["ann_boxes"][keep], coco["widths"][image_index], coco["heights"][image_index]
+    )
+    class_ids = new_ids[keep]
+
+    # Mantém a ordem original das anotações dentro de cada imagem
+    grouping = np.argsort(image_index, kind="stable")
+    image_index, boxes, class_ids = image_index[grouping], boxes[grouping], class_ids[grouping]
+    starts = np.flatnonzero(np.r_[True, image_index[1:] != image_index[:-1]]) if len(image_index) else []
+    ends = list(starts[1:]) + [len(image_index)]
+    return [
+        (Path(coco["file_names"][image_index[start]]).stem, class_ids[start:end], boxes[start:end])
+        for start, end in zip(starts, ends)
+    ]
+
+
+def label_text(class_ids, boxes):
+    return "\n".join(
+        LINE_FORMAT % (class_id, *box) for class_id, box in zip(class_ids.tolist(), boxes.tolist())
+    )
 
-    annotations_by_image = {}
-    for ann in coco_data['annotations']:
-        cat_name = category_id_to_name[ann['category_id']]
-        if cat_name not in wanted_classes:
+
+def _write_labels(items, labels_dir, previous):
+    """Escreve um bloco de rótulos; devolve [(stem, hash, escrito?)]."""
+    results = []
+    for stem, class_ids, boxes in items:
+        content = label_text(class_ids, boxes).encode("utf-8")
+        digest = hashlib.blake2b(content, digest_size=8).hexdigest()
+        label_path = os.path.join(labels_dir, f"{stem}.txt")
+        if previous.get(stem) == digest and os.path.exists(label_path):
+            results.append((stem, digest, False))
             continue
-        image_id = ann['image_id']
-        annotations_by_image.setdefault(image_id, []).append(ann)
+        with open(label_path, "wb") as f:
+            f.write(content)
+        results.append((stem, digest, True))
+    return results
+
 
-    images_by_id = {img['id']: img for img in coco_data['images']}
+def convert_coco_to_yolo(json_path, images_dir, labels_dir, wanted_classes, workers=None, chunk_size=256):
+    """Convert a COCO-format JSON file to YOLO-format .txt files"""
+    start_time = time.time()
+    os.makedirs(labels_dir, exist_ok=True)
+    coco = read_coco_annotations(json_path)
+    labels = build_yolo_labels(coco, wanted_classes, images_dir)
+    print(
+        f"{os.path.basename(json_path)}: {len(coco['image_ids'])} imagens, "
+        f"{len(coco['ann_image_ids'])} anotações lidas em {time.time() - start_time:.1f}s"
+    )
+    del coco
+
+    manifest_path = os.path.join(labels_dir, LABELS_MANIFEST)
+    previous = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("files", {})
+
+    # Escrita de milhares de arquivos pequenos: threads (o GIL é liberado no I/O)
+    workers = workers or min(8, os.cpu_count() or 1)
+    chunks = [labels[i : i + chunk_size] for i in range(0, len(labels), chunk_size)]
+    hashes, written = {}, 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_write_labels, chunk, labels_dir, previous) for chunk in chunks]
+        with tqdm(total=len(labels), desc=f"Convertendo {os.path.basename(labels_dir)}") as progress:
+            for future in futures:
+                for stem, digest, was_written in future.result():
+                    hashes[stem] = digest
+                    written += was_written
+                    progress.update(1)
+
+    # Rótulos de uma conversão anterior que não existem mais (ex.: classe removida)
+    removed = 0
+    for stem in set(previous) - set(hashes):
+        label_path = os.path.join(labels_dir, f"{stem}.txt")
+        if os.path.exists(label_path):
+            os.remove(label_path)
+            removed += 1
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"classes": list(wanted_classes), "files": hashes}, f)
+    print(
+        f"✅ Labels YOLO salvos em: {labels_dir} ({written} escritos, {len(hashes) - written} inalterados, "
+        f"{removed} removidos, {time.time() - start_time:.1f}s)"
+    )
 
-    for image_id, anns in tqdm(annotations_by_image.items(), desc=f"Convertendo {os.path.basename(labels_dir)}"):
-        img = images_by_id[image_id]
-        file_stem = Path(img['file_name']).stem
-        label_path = os.path.join(labels_dir, f"{file_stem}.txt")
-        w, h = img['width'], img['height']
 
-        lines = []
-        for ann in anns:
-            cat_name = category_id_to_name[ann['category_id']]
-            class_id = name_to_new_id[cat_name]
-            x, y, bw, bh = ann['bbox']
-            x_center = (x + bw / 2) / w
-            y_center = (y + bh / 2) / h
-            lines.append(f"{class_id} {x_center:.6f} {y_center:.6f} {bw/w:.6f} {bh/h:.6f}")
+# -----------------------------------------------------------------------------
+# Passo 5: Parâmetros de treino (também a base das execuções do utils/sweep.py)
+# -----------------------------------------------------------------------------
+base_model = "yolo11s.pt"
+
+train_args = dict(
+    epochs=40,                     # mais épocas para maior convergência
+    imgsz=640,                     # bom equilíbrio entre qualidade e tempo
+    batch=8,                       # ideal para GPU de 4GB (evita OOM)
+    device="cuda",                 # garante uso da GPU
+    workers=2,                     # menor número para estabilidade em máquinas com limitação de RAM
+    optimizer="AdamW",             # otimizador rápido e estável
+    amp=True,                      # mixed precision: acelera e economiza memória
+    augment=True,                  # aumenta variedade de dados no treinamento
+    lr0=0.002,                     # taxa de aprendizado inicial ligeiramente menor para mais estabilidade
+    weight_decay=0.0005,           # regularização leve (evita overfitting)
+    patience=15,                   # early stopping com mais tolerância
+    warmup_epochs=3,               # ajuda a estabilizar o início do treino
+    name="yolo11_cutlery_gpu",     # nome para a execução
+    project="coco_cutlery_gpu",    # pasta onde salvar os resultados
+    exist_ok=True                  # permite sobrescrever diretórios existentes
+)
 
-        with open(label_path, 'w') as f:
-            f.write("\n".join(lines))
 
-    print(f"✅ Labels YOLO salvos em: {labels_dir}")
+if __name__ == "__main__":
+    import ultralytics
+    from ultralytics import YOLO
 
+    from utils.dataset_shards import ShardDetectionTrainer, pack_shards
+    from utils.hard_negatives import merge_into_dataset
 
+    os.makedirs(base_dir, exist_ok=True)
+    ultralytics.checks()
 
-if __name__ == "__main__":
     # Download and export training data
-    download_and_export_dataset("train", max_samples=5000, base_dir=base_dir, classes=classes)
+    download_and_export_dataset("train", max_samples=5000, base_dir=base_dir, classes=classes,
+                                cache_dir=dataset_cache_dir)
     # Download and export validation data  
-    download_and_export_dataset("validation", max_samples=2000, base_dir=base_dir, classes=classes)
+    download_and_export_dataset("validation", max_samples=2000, base_dir=base_dir, classes=classes,
+                                cache_dir=dataset_cache_dir)
     
     # Convert annotations for train
     train_json = os.path.join(base_dir, "annotations", "instances_train2017.json")
@@ -201,30 +517,26 @@ if __name__ == "__main__":
     val_labels = os.path.join(base_dir, "val", "data")
     convert_coco_to_yolo(val_json, val_images, val_labels, classes)
 
-    create_yaml_config(base_dir, classes)
+    # Falsos positivos da produção revisados (antes dos shards, para entrarem no treino)
+    if hard_negatives_dir:
+        merge_into_dataset(hard_negatives_dir, train_images, classes)
+
+    # Imagens de treino decodificadas e reduzidas uma única vez (shards memmap):
+    # as épocas leem fatias de memória em vez de decodificar JPEGs de novo
+    train_shards = os.path.join(base_dir, "train", "shards")
+    pack_shards(train_images, train_shards, labels_dir=train_labels, imgsz=640)
+
+    create_yaml_config(base_dir, classes, train_dir="train/shards")
 
     yaml_path = os.path.join(base_dir, "coco_cutlery_gpu.yaml")
 
     # Treinamento
-    model = YOLO("yolo11s.pt")
+    model = YOLO(base_model)
 
     model.train(
         data=yaml_path,                # arquivo YAML com paths e classes
-        epochs=40,                     # mais épocas para maior convergência
-        imgsz=640,                     # bom equilíbrio entre qualidade e tempo
-        batch=8,                       # ideal para GPU de 4GB (evita OOM)
-        device="cuda",                 # garante uso da GPU
-        workers=2,                     # menor número para estabilidade em máquinas com limitação de RAM
-        optimizer="AdamW",             # otimizador rápido e estável
-        amp=True,                      # mixed precision: acelera e economiza memória
-        augment=True,                  # aumenta variedade de dados no treinamento
-        lr0=0.002,                     # taxa de aprendizado inicial ligeiramente menor para mais estabilidade
-        weight_decay=0.0005,           # regularização leve (evita overfitting)
-        patience=15,                   # early stopping com mais tolerância
-        warmup_epochs=3,               # ajuda a estabilizar o início do treino
-        name="yolo11_cutlery_gpu",     # nome para a execução
-        project="coco_cutlery_gpu",    # pasta onde salvar os resultados
-        exist_ok=True                  # permite sobrescrever diretórios existentes
+        trainer=ShardDetectionTrainer, # lê o conjunto de treino dos shards
+        **train_args
     )
 
     print("Treinamento finalizado!")
\ No newline at end of file
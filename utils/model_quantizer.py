@@ -0,0 +1,322 @@
+# Requer: pip install ultralytics onnxruntime (e/ou openvino nncf)
+#
+# Quantização INT8 dos modelos ajustados (knife/scissors) e relatório
+# precisão x velocidade em CPU.
+#
+# Uso (a partir da raiz do projeto):
+#   python -m utils.model_quantizer --model models/yolo11n_dataset_knife_scissors.pt \
+#       --data <base_dir>/coco_cutlery_gpu.yaml --backends onnx openvino
+#
+# A calibração usa uma amostra do conjunto de validação gerado pelo
+# utils/model_coach.py (o mesmo YAML usado no treino). Os modelos INT8 são
+# gravados em models/cache ao lado das versões FP32 exportadas, e podem ser
+# selecionados em AVAILABLE_MODELS com {"backend": "onnx", "int8": True}.
+# Como no export_model, um INT8 do cache só é refeito se o .pt for mais novo
+# (ou com --force, ex.: depois de mudar a amostra de calibração).
+#
+# O relatório compara, para cada variante (PyTorch FP32, ONNX FP32/INT8,
+# OpenVINO FP32/INT8): mAP50 e mAP50-95 de knife/scissors, latência em CPU
+# (p50/p95) e tamanho do modelo.
+
+import argparse
+import glob
+import json
+import os
+import random
+import shutil
+import time
+
+import numpy as np
+import yaml
+
+from utils.backends import (
+    DEFAULT_CACHE_DIR,
+    OnnxRuntimeModel,
+    OpenVinoModel,
+    cpu_threads,
+    export_model,
+    exported_path,
+    is_fresh,
+    letterbox,
+    path_size_mb,
+)
+
+# --- CONFIGURAÇÕES PADRÃO ---
+CALIBRATION_SAMPLES = 300
+LATENCY_IMAGES = 50
+REPORT_CLASSES = ["knife", "scissors"]
+REPORT_PATH = "data/results/quantization_report.json"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def validation_images(data_yaml):
+    """Lista as imagens de validação a partir do YAML do dataset (path + val)."""
+    with open(data_yaml, "r") as f:
+        config = yaml.safe_load(f)
+    val_dir = config["val"]
+    if not os.path.isabs(val_dir):
+        val_dir = os.path.join(config.get("path", os.path.dirname(data_yaml)), val_dir)
+    images = [
+        path
+        for path in sorted(glob.glob(os.path.join(val_dir, "**", "*"), recursive=True))
+        if path.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    if not images:
+        raise FileNotFoundError(f"Nenhuma imagem de validação em {val_dir}")
+    return images
+
+
+def sample_images(images, count, seed=0):
+    """Amostra determinística (mesma semente = mesma calibração)."""
+    if len(images) <= count:
+        return list(images)
+    return sorted(random.Random(seed).sample(images, count))
+
+
+def calibration_blobs(images, imgsz):
+    """Gera blobs NCHW (1 imagem por vez) com o mesmo pré-processamento da inferência."""
+    import cv2
+
+    for path in images:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        canvas, _, _ = letterbox(frame, imgsz)
+        yield cv2.dnn.blobFromImage(canvas, scalefactor=1 / 255.0, swapRB=True)
+
+
+def quantize_onnx(pt_path, images, imgsz, cache_dir=DEFAULT_CACHE_DIR):
+    """Quantização estática INT8 (QDQ, pesos por canal) com ONNX Runtime."""
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    fp32_path = export_model(pt_path, "onnx", imgsz, cache_dir)
+    int8_path = exported_path(pt_path, "onnx", imgsz, cache_dir, int8=True)
+    part_path = int8_path.replace(".onnx", ".part.onnx")  # interrompido = não aparece como pronto
+    prepared_path = fp32_path.replace(".onnx", "_prep.onnx")
+
+    class Reader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.input_name = input_name
+            self.blobs = calibration_blobs(images, imgsz)
+
+        def get_next(self):
+            blob = next(self.blobs, None)
+            return None if blob is None else {self.input_name: blob}
+
+    import onnx
+
+    input_name = onnx.load(fp32_path, load_external_data=False).graph.input[0].name
+    print(f"Calibrando ONNX INT8 com {len(images)} imagens...")
+    quant_pre_process(fp32_path, prepared_path)
+    quantize_static(
+        prepared_path,
+        part_path,
+        Reader(input_name),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    os.remove(prepared_path)
+    # Mantém os metadados (nomes das classes) do modelo FP32
+    fp32_model = onnx.load(fp32_path)
+    int8_model = onnx.load(part_path)
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, part_path)
+    os.replace(part_path, int8_path)
+    return int8_path
+
+
+def quantize_openvino(pt_path, data_yaml, images_available, samples, imgsz, cache_dir=DEFAULT_CACHE_DIR):
+    """Quantização INT8 pós-treino com NNCF (export do Ultralytics com int8=True)."""
+    from ultralytics import YOLO
+
+    int8_path = exported_path(pt_path, "openvino", imgsz, cache_dir, int8=True)
+    print(f"Calibrando OpenVINO INT8 com ~{samples} imagens...")
+    exported = YOLO(pt_path).export(
+        format="openvino",
+        imgsz=imgsz,
+        int8=True,
+        data=data_yaml,
+        fraction=min(1.0, samples / max(1, images_available)),
+        dynamic=False,  # mesma forma estática (lote 1, imgsz) do export_model
+        batch=1,
+        verbose=False,
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.exists(int8_path):
+        shutil.rmtree(int8_path)
+    shutil.move(str(exported), int8_path)
+    return int8_path
+
+
+def class_metrics(metrics, classes):
+    """mAP50 / mAP50-95 por classe de interesse a partir do resultado do val()."""
+    per_class = {}
+    for index, class_id in enumerate(metrics.box.ap_class_index):
+        name = metrics.names[int(class_id)]
+        if name in classes:
+            _, _, ap50, ap = metrics.box.class_result(index)
+            per_class[name] = {"mAP50": round(float(ap50), 4), "mAP50-95": round(float(ap), 4)}
+    return per_class
+
+
+def evaluate_accuracy(model_path, data_yaml, imgsz):
+    from ultralytics import YOLO
+
+    metrics = YOLO(model_path, task="detect").val(
+        data=data_yaml, imgsz=imgsz, batch=1, device="cpu", plots=False, verbose=False
+    )
+    return metrics
+
+
+def measure_latency(model, images, warmup=3):
+    """Latência por imagem (ms) em CPU: p50 e p95 sobre as imagens de teste."""
+    import cv2
+
+    frames = [frame for frame in (cv2.imread(path) for path in images) if frame is not None]
+    for frame in frames[:warmup]:
+        model(frame, verbose=False)
+    timings = []
+    for frame in frames:
+        start = time.perf_counter()
+        model(frame, verbose=False)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "p50_ms": round(float(np.percentile(timings, 50)), 2),
+        "p95_ms": round(float(np.percentile(timings, 95)), 2),
+    }
+
+
+def load_variant(path, backend, imgsz, threads):
+    if backend == "onnx":
+        return OnnxRuntimeModel(path, imgsz, threads)
+    if backend == "openvino":
+        return OpenVinoModel(path, imgsz, threads)
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(threads)
+    return YOLO(path)
+
+
+def build_variants(pt_path, backends, data_yaml, images, calib_images, imgsz, force=False):
+    """Gera (ou reaproveita do cache) as variantes FP32/INT8 de um modelo.
+
+    O INT8 do cache é reaproveitado se não for mais velho que o .pt; `force`
+    recalibra mesmo assim.
+    """
+    variants = [{"name": "pytorch-fp32", "backend": "pytorch", "path": pt_path}]
+    for backend in backends:
+        variants.append(
+            {"name": f"{backend}-fp32", "backend": backend, "path": export_model(pt_path, backend, imgsz)}
+        )
+        int8_path = exported_path(pt_path, backend, imgsz, int8=True)
+        if not force and is_fresh(int8_path, pt_path):
+            print(f"Reaproveitando {backend} INT8 do cache: {int8_path}")
+        elif backend == "onnx":
+            int8_path = quantize_onnx(pt_path, calib_images, imgsz)
+        else:
+            int8_path = quantize_openvino(pt_path, data_yaml, len(images), len(calib_images), imgsz)
+        variants.append({"name": f"{backend}-int8", "backend": backend, "path": int8_path})
+    return variants
+
+
+def report_model(pt_path, backends, data_yaml, imgsz=640, calibration_samples=CALIBRATION_SAMPLES,
+                 latency_images=LATENCY_IMAGES, classes=REPORT_CLASSES, threads=None, force=False):
+    """Quantiza um modelo e mede precisão, latência e tamanho de cada variante."""
+    threads = threads or cpu_threads()
+    images = validation_images(data_yaml)
+    calib_images = sample_images(images, calibration_samples, seed=0)
+    timing_images = sample_images(images, latency_images, seed=1)
+
+    rows = []
+    for variant in build_variants(pt_path, backends, data_yaml, images, calib_images, imgsz, force):
+        print(f"Avaliando {os.path.basename(pt_path)} [{variant['name']}]...")
+        metrics = evaluate_accuracy(variant["path"], data_yaml, imgsz)
+        model = load_variant(variant["path"], variant["backend"], imgsz, threads)
+        rows.append(
+            {
+                "model": os.path.basename(pt_path),
+                "variant": variant["name"],
+                "path": variant["path"],
+                "size_mb": round(path_size_mb(variant["path"]), 2),
+                "mAP50": round(float(metrics.box.map50), 4),
+                "mAP50-95": round(float(metrics.box.map), 4),
+                "classes": class_metrics(metrics, classes),
+                **measure_latency(model, timing_images),
+            }
+        )
+    baseline = rows[0]["p50_ms"]
+    for row in rows:
+        row["speedup"] = round(baseline / row["p50_ms"], 2) if row["p50_ms"] else 0.0
+    return rows
+
+
+def print_report(rows, classes=REPORT_CLASSES):
+    header = f"{'modelo':36} {'variante':14} {'MB':>7} {'p50 ms':>8} {'p95 ms':>8} {'ganho':>6} {'mAP50':>6}"
+    for name in classes:
+        header += f" {name + ' mAP50':>15}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        line = (
+            f"{row['model']:36} {row['variant']:14} {row['size_mb']:>7} {row['p50_ms']:>8} "
+            f"{row['p95_ms']:>8} {row['speedup']:>5}x {row['mAP50']:>6}"
+        )
+        for name in classes:
+            value = row["classes"].get(name, {}).get("mAP50", "-")
+            line += f" {value:>15}"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Quantização INT8 e relatório precisão x velocidade")
+    parser.add_argument("--model", nargs="+", required=True, help="Checkpoints .pt a quantizar")
+    parser.add_argument("--data", required=True,
+                        help="YAML do dataset gerado pelo model_coach.py (ex.: coco_cutlery_gpu.yaml)")
+    parser.add_argument("--backends", nargs="+", default=["onnx"], choices=["onnx", "openvino"])
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--calibration-samples", type=int, default=CALIBRATION_SAMPLES)
+    parser.add_argument("--latency-images", type=int, default=LATENCY_IMAGES)
+    parser.add_argument("--classes", nargs="+", default=REPORT_CLASSES)
+    parser.add_argument("--threads", type=int, default=None, help="Threads de CPU (padrão: automático)")
+    parser.add_argument("--report", default=REPORT_PATH, help="Arquivo JSON do relatório")
+    parser.add_argument("--force", action="store_true",
+                        help="Recalibra os modelos INT8 mesmo se o cache estiver atualizado")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    all_rows = []
+    for pt_path in args.model:
+        all_rows.extend(
+            report_model(
+                pt_path,
+                args.backends,
+                args.data,
+                imgsz=args.imgsz,
+                calibration_samples=args.calibration_samples,
+                latency_images=args.latency_images,
+                classes=args.classes,
+                threads=args.threads,
+                force=args.force,
+            )
+        )
+    print_report(all_rows, args.classes)
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w") as f:
+        json.dump(
+            {"created_at": time.strftime("%Y-%m-%d %H:%M:%S"), "imgsz": args.imgsz, "rows": all_rows},
+            f,
+            indent=2,
+        )
+    print(f"✅ Relatório salvo em: {args.report}")
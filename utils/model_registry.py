@@ -0,0 +1,135 @@
+# -----------------------------------------------------------------------------
+# Registro de modelos com cache LRU de modelos já carregados e aquecidos
+# -----------------------------------------------------------------------------
+# Carregar um YOLO do disco e fazer a primeira inferência (montagem do grafo,
+# inicializações preguiçosas) custa caro. O registro mantém os modelos usados
+# recentemente em memória, já aquecidos com um frame na resolução real da
+# fonte, e descarta os menos usados quando o orçamento de memória estoura.
+#
+# O aquecimento acontece só logo depois de carregar, antes de o modelo entrar
+# no cache: um modelo já entregue pode estar rodando na thread de inferência, e
+# sessões do ONNX Runtime/OpenVINO e preditores do Ultralytics não garantem
+# chamadas concorrentes seguras.
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.backends import exported_path, model_spec, path_size_mb
+
+# Fator aproximado entre o tamanho dos pesos em disco e a memória ocupada
+# depois de carregado e aquecido (pesos + buffers + ativações do runtime).
+MEMORY_FACTOR = {"pytorch": 4.0, "onnx": 3.0, "openvino": 3.0}
+
+
+class ModelRegistry:
+    """Cache LRU de modelos carregados e aquecidos, com orçamento de memória.
+
+    `loader(entry)` recebe uma entrada de AVAILABLE_MODELS e devolve o modelo
+    (ex.: utils.backends.load_backend_model).
+    """
+
+    def __init__(self, loader, models_dir="", memory_budget_mb=2048, max_models=4):
+        self.loader = loader
+        self.models_dir = models_dir
+        self.memory_budget_mb = memory_budget_mb
+        self.max_models = max_models
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # chave -> {"model", "memory_mb"}
+        self._loading = {}  # chave -> threading.Event (evita carregar o mesmo modelo duas vezes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(entry):
+        return json.dumps(model_spec(entry), sort_keys=True)
+
+    def _estimate_memory_mb(self, spec):
+        path = os.path.join(self.models_dir, spec["path"]) if self.models_dir else spec["path"]
+        if spec["backend"] != "pytorch" and path.endswith(".pt"):
+            cached = exported_path(path, spec["backend"], spec["imgsz"], int8=spec["int8"])
+            if os.path.exists(cached):
+                path = cached
+        return path_size_mb(path) * MEMORY_FACTOR.get(spec["backend"], 3.0)
+
+    def get(self, entry, warmup_shape=None, warmup_batch=1):
+        """Devolve o modelo pronto para uso, carregando e aquecendo se necessário.
+
+        `warmup_shape` só é usado quando o modelo é carregado agora; modelos que
+        já estavam no cache foram aquecidos no próprio carregamento.
+        """
+        key = self.key(entry)
+        while True:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    break
+                event = self._loading.get(key)
+                if event is None:
+                    self._loading[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Outro thread já está carregando este modelo: espera e tenta de novo
+            event.wait()
+
+        if cached is None:
+            try:
+                spec = model_spec(entry)
+                start = time.perf_counter()
+                model = self.loader(spec)
+                cached = {"model": model, "memory_mb": self._estimate_memory_mb(spec)}
+                print(f"Modelo {spec['path']} carregado em {time.perf_counter() - start:.2f}s.")
+                if warmup_shape is not None:
+                    # Ninguém mais tem este modelo ainda (os outros get() esperam o evento)
+                    self._warm(model, warmup_shape, warmup_batch)
+                with self._lock:
+                    self._cache[key] = cached
+                    self._evict(keep=key)
+            finally:
+                with self._lock:
+                    self._loading.pop(key).set()
+
+        return cached["model"]
+
+    @staticmethod
+    def _warm(model, shape, batch=1):
+        """Roda um frame preto na resolução da fonte (modelo recém-carregado, ainda não compartilhado)."""
+        dummy = np.zeros(shape, dtype=np.uint8)
+        start = time.perf_counter()
+        try:
+            for _ in range(2):
+                model([dummy] * batch, verbose=False)
+        except Exception as e:
+            print(f"Aviso: falha no aquecimento do modelo: {e}")
+            return
+        print(f"Modelo aquecido em {shape[1]}x{shape[0]} (lote {batch}) em {time.perf_counter() - start:.2f}s.")
+
+    def _evict(self, keep):
+        """Remove os modelos menos usados até caber no orçamento (nunca `keep`)."""
+        def over_budget():
+            used = sum(item["memory_mb"] for item in self._cache.values())
+            return len(self._cache) > self.max_models or used > self.memory_budget_mb
+
+        while len(self._cache) > 1 and over_budget():
+            oldest = next(iter(self._cache))
+            if oldest == keep:
+                break
+            self._cache.pop(oldest)
+            self.evictions += 1
+            print(f"Modelo removido do cache: {json.loads(oldest)['path']}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": len(self._cache),
+                "memory_mb": round(sum(item["memory_mb"] for item in self._cache.values()), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
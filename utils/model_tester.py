@@ -1,102 +1,420 @@
 # Requer: pip install ultralytics opencv-python tqdm
+#
+# Processamento em lote (headless) de vídeos gravados.
+#
+# Uso (a partir da raiz do projeto):
+#   python -m utils.model_tester data/inputs/video2.mp4
+#   python -m utils.model_tester "arquivo/2024-*/*.mp4" --workers 4 --batch-size 8
+#
+# Cada vídeo gera, na pasta de saída:
+#   <nome>_detected.mp4        - vídeo anotado
+#   <nome>_detections.jsonl    - uma linha por frame com as detecções
+# e o arquivo manifest.json registra os vídeos concluídos. Se o processamento for
+# interrompido, basta rodar o mesmo comando de novo: vídeos já concluídos (e não
+# alterados desde então) são pulados e os incompletos são refeitos.
 
-import cv2
-from ultralytics import YOLO
+import argparse
+import glob
+import json
 import os
+import time
+from multiprocessing import get_context
+
+import cv2
 from tqdm import tqdm
-from collections import deque
 
-# --- CONFIGURAÇÕES ---
+from utils.alert_rules import AlertRules
+from utils.backends import BACKENDS, export_model, load_backend_model
+from utils.capture import read_frames
+from utils.detection_log import DetectionLog
+from utils.postprocess import ClassFilter, Detections
+from utils.tracking import IouTracker
+
+# --- CONFIGURAÇÕES PADRÃO ---
 input_video_path = './data/inputs/video2.mp4'  # Caminho do vídeo de entrada
-output_video_path = './data/output/output_detected2.mp4'  # Caminho do vídeo de saída
+output_dir = './data/output'  # Pasta dos vídeos anotados e registros de detecção
 model_path = './models/yolo11s_dataset_coco.pt'  # Caminho para o modelo YOLO treinado
+CONFIDENCE = 0.25
+BATCH_SIZE = 8
+CONFIRMATION_FRAMES = 3
+HISTORY_CLASSES = ["fork", "knife", "scissors"]
+MANIFEST_NAME = "manifest.json"
 
-try:
-    # --- CARREGAR MODELO ---
-    print("🔄 Carregando modelo YOLO...")
-    model = YOLO(model_path)
+# Modelo carregado uma única vez por processo worker
+_worker_model = None
+_worker_options = None
 
-    # --- ABRIR VÍDEO DE ENTRADA ---
-    cap = cv2.VideoCapture(input_video_path)
-    if not cap.isOpened():
-        raise FileNotFoundError(f"Não foi possível abrir o vídeo: {input_video_path}")
 
+def expand_inputs(patterns):
+    """Expande caminhos/globs/pastas em uma lista ordenada de vídeos sem repetição."""
+    videos = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.mp4")
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.isfile(pattern) else [])
+        if not matches:
+            print(f"⚠️ Nenhum vídeo encontrado para: {pattern}")
+        videos.extend(matches)
+    seen = set()
+    unique = []
+    for video in videos:
+        key = os.path.abspath(video)
+        if key not in seen:
+            seen.add(key)
+            unique.append(video)
+    return unique
+
+
+def output_stems(videos):
+    """Nome base de saída de cada vídeo; nomes repetidos ganham o nome da pasta."""
+    stems = {video: os.path.splitext(os.path.basename(video))[0] for video in videos}
+    counts = {}
+    for stem in stems.values():
+        counts[stem] = counts.get(stem, 0) + 1
+    for video, stem in stems.items():
+        if counts[stem] > 1:
+            parent = os.path.basename(os.path.dirname(os.path.abspath(video)))
+            stems[video] = f"{parent}_{stem}"
+    return stems
+
+
+def output_paths(video_path, out_dir, stem=None):
+    if stem is None:
+        stem = os.path.splitext(os.path.basename(video_path))[0]
+    return (
+        os.path.join(out_dir, f"{stem}_detected.mp4"),
+        os.path.join(out_dir, f"{stem}_detections.jsonl"),
+    )
+
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifesto ilegível ({e}); reprocessando tudo.")
+        return {}
+
+
+def save_manifest(out_dir, manifest):
+    """Grava o manifesto de forma atômica (tmp + rename)."""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def input_signature(video_path):
+    stat = os.stat(video_path)
+    return {"size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+
+def is_done(manifest, video_path, out_dir, stem=None):
+    """True se o vídeo já foi processado e não mudou desde então."""
+    entry = manifest.get(os.path.abspath(video_path))
+    if entry is None:
+        return False
+    video_out, records_out = output_paths(video_path, out_dir, stem)
+    return (
+        entry.get("input") == input_signature(video_path)
+        and os.path.exists(video_out)
+        and os.path.exists(records_out)
+    )
+
+
+def init_worker(options):
+    """Inicializa o processo worker: divide as threads de CPU e carrega o modelo."""
+    global _worker_model, _worker_options
+    cv2.setNumThreads(1)
+    _worker_model = load_backend_model(
+        {"path": options["model"], "backend": options["backend"], "imgsz": options["imgsz"]},
+        threads=options["threads"],
+    )
+    _worker_options = options
+    if options.get("detection_log"):
+        # Um sink por processo; os blocos levam o PID no nome e não colidem
+        options["sink"] = DetectionLog(options["detection_log"])
+
+
+def confirm_detections(detections, alert_rules, source, timestamp):
+    """Atualiza as regras de confirmação e retorna as chaves (classe, id) confirmadas.
+
+    Uma classe é confirmada quando aparece em CONFIRMATION_FRAMES frames
+    consecutivos. Só frames com inferência devem passar por aqui.
+    """
+    rules = alert_rules.update(source, detections, timestamp, track_ids=detections.track_id)
+    return {(rule["class"], rule["track_id"]) for rule in rules}
+
+
+def draw_confirmed(frame, detections, confirmed):
+    """Desenha as detecções no frame; as de chaves confirmadas ficam em vermelho.
+
+    Só as detecções marcadas em `detections.draw` são desenhadas. Retorna se
+    alguma detecção confirmada foi desenhada.
+    """
+    # Só as classes do histórico (máscara `draw` do ClassFilter) aparecem no vídeo
+    detections = detections.select(detections.draw)
+    track_ids = detections.track_id if detections.track_id is not None else [None] * len(detections)
+
+    alert_triggered = False
+    for label, box, conf, track_id in zip(
+        detections.class_names(), detections.xyxy.astype(int), detections.conf, track_ids
+    ):
+        x1, y1, x2, y2 = box
+        track_id = None if track_id is None else int(track_id)
+        if (label, track_id) in confirmed:
+            alert_triggered = True
+            color = (0, 0, 255)  # vermelho para alerta
+        else:
+            color = (0, 255, 0)  # verde padrão
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        if track_id is not None:
+            label = f"{label} #{track_id}"
+        cv2.putText(frame, f"{label} {conf*100:.1f}%", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+    return alert_triggered
+
+
+def process_video(video_path, out_dir, model, batch_size=BATCH_SIZE, conf=CONFIDENCE,
+                  imgsz=640, device="cpu", fourcc="mp4v", history_classes=HISTORY_CLASSES,
+                  output_stem=None, detection_log=None, track_every=None):
+    """Processa um vídeo inteiro em lotes e grava vídeo anotado + registros por frame.
+
+    Os arquivos são escritos com sufixo .part e renomeados só no final, então
+    um vídeo interrompido nunca aparece como concluído. Se `detection_log`
+    (DetectionLog) for passado, as detecções também vão para o registro colunar.
+    Com `track_every=K` os objetos são rastreados (ids estáveis) e o modelo só
+    roda a cada K frames; o rastreador prevê as caixas dos frames intermediários.
+    """
+    video_out, records_out = output_paths(video_path, out_dir, output_stem)
+    video_part = os.path.splitext(video_out)[0] + ".part.mp4"
+    records_part = records_out + ".part"
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Não foi possível abrir o vídeo: {video_path}")
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    # --- CONFIGURAR VÍDEO DE SAÍDA ---
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
-
-    # --- CONFIGURAR HISTÓRICO DE DETECÇÕES ---
-    detection_history = {"fork": deque(maxlen=3), "knife": deque(maxlen=3), "scissors": deque(maxlen=3)}
-
-    print("▶️ Iniciando processamento de vídeo...")
-    with tqdm(total=frame_count, desc="Processando frames") as pbar:
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            alert_triggered = False
-            alert_frame = None
-
-            # Realiza a predição com confiança mínima de 0.25
-            results = model.predict(frame, conf=0.25, verbose=False)
-
-            # Coletar classes detectadas neste frame
-            current_detections = []
-
-            for r in results:
-                boxes = r.boxes.xyxy.cpu().numpy() if r.boxes else []
-                classes = r.boxes.cls.cpu().numpy() if r.boxes else []
-                confs = r.boxes.conf.cpu().numpy() if r.boxes else []
-                names = r.names
-
-                for box, cls, conf in zip(boxes, classes, confs):
-                    label = names[int(cls)]
-                    if label in detection_history:
-                        current_detections.append((label, box, conf))
-
-            # Atualizar histórico de detecção por classe
-            for class_name in detection_history:
-                detection_history[class_name].append(0)  # começa com 0
-
-            for label, box, conf in current_detections:
-                detection_history[label][-1] = 1  # marca presença no histórico
-
-            # Verificar se alguma classe foi detectada em 3 frames consecutivos
-            confirmed_class = None
-            for class_name, history in detection_history.items():
-                if sum(history) == 3:
-                    confirmed_class = class_name
-                    break
-
-            # Desenhar os resultados e decidir se alerta será gerado
-            for label, box, conf in current_detections:
-                x1, y1, x2, y2 = map(int, box)
-                if label == confirmed_class and conf >= 0.25:
-                    alert_triggered = True
-                    alert_frame = frame.copy()
-                    color = (0, 0, 255)  # vermelho para alerta
-                else:
-                    color = (0, 255, 0)  # verde padrão
-
-                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                cv2.putText(frame, f"{label} {conf*100:.1f}%", (x1, y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
-
-            # Escreve o frame normal
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    out = cv2.VideoWriter(video_part, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    # N de N frames consecutivos, sem cooldown: mesmo critério do histórico anterior
+    alert_rules = AlertRules(
+        history_classes,
+        threshold=conf,
+        confirm_frames=CONFIRMATION_FRAMES,
+        window_frames=CONFIRMATION_FRAMES,
+        release_hits=CONFIRMATION_FRAMES,
+        cooldown_seconds=0,
+    )
+    # Tabelas por id de classe montadas uma vez por modelo (reaproveitadas em todos os frames)
+    class_filter = ClassFilter(history_classes, history_classes, conf, conf)
+    tracker = IouTracker() if track_every else None
+    frames_done = 0
+    alerts = 0
+    confirmed = set()  # chaves confirmadas na última inferência (reaproveitadas nos frames previstos)
+    start = time.perf_counter()
+
+    def flush(batch):
+        nonlocal frames_done, alerts, confirmed
+        inferred = [(index, frame) for index, frame in batch if not track_every or index % track_every == 0]
+        results = model.predict([frame for _, frame in inferred], conf=conf, imgsz=imgsz,
+                                device=device, verbose=False) if inferred else []
+        results = {index: result for (index, _), result in zip(inferred, results)}
+        for index, frame in batch:
+            if index not in results:
+                # Frame pulado: caixas previstas pelo rastreador
+                detections = class_filter.apply(tracker.predict())
+            else:
+                detections = Detections.from_result(results[index])
+                if tracker is not None:
+                    detections = tracker.update(detections)
+                detections = class_filter.apply(detections)
+            if detection_log is not None and index in results and len(detections):
+                detection_log.append(
+                    os.path.basename(video_path),
+                    index,
+                    index / fps,
+                    detections.class_names(),
+                    detections.conf,
+                    detections.xyxy,
+                )
+            if index in results:
+                confirmed = confirm_detections(detections, alert_rules, video_path, index / fps)
+            # Frames previstos pelo rastreador são desenhados, mas não contam para a confirmação
+            # (como no main.py): senão uma inferência e duas previsões bastariam para um alerta
+            if draw_confirmed(frame, detections, confirmed) and index in results:
+                alerts += 1
             out.write(frame)
-            pbar.update(1)
+            records.write(json.dumps({
+                "video": os.path.basename(video_path),
+                "frame": index,
+                "timestamp_ms": round(index * 1000.0 / fps, 1),
+                "inferred": index in results,
+                "detections": detections.to_records(),
+            }) + "\n")
+            frames_done += 1
 
+    try:
+        with open(records_part, "w") as records:
+            batch = []
+            for index, frame in read_frames(video_path, prefetch=batch_size * 2):
+                batch.append((index, frame))
+                if len(batch) >= batch_size * (track_every or 1):  # batch_size frames com inferência
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+    finally:
+        out.release()
+
+    os.replace(video_part, video_out)
+    os.replace(records_part, records_out)
+    elapsed = time.perf_counter() - start
+    return {
+        "video": video_out,
+        "records": records_out,
+        "frames": frames_done,
+        "alert_frames": alerts,
+        "seconds": round(elapsed, 2),
+        "fps": round(frames_done / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+def _worker_process(job):
+    """Executado no processo worker: processa um vídeo com o modelo do processo."""
+    video_path, stem = job
+    options = _worker_options
+    try:
+        summary = process_video(
+            video_path,
+            options["output_dir"],
+            _worker_model,
+            batch_size=options["batch_size"],
+            conf=options["conf"],
+            imgsz=options["imgsz"],
+            device=options["device"],
+            fourcc=options["fourcc"],
+            output_stem=stem,
+            detection_log=options.get("sink"),
+            track_every=options.get("track_every"),
+        )
+        if options.get("sink") is not None:
+            # O pool encerra os workers com terminate(): grava o bloco a cada vídeo
+            options["sink"].flush()
+        return video_path, summary, None
+    except Exception as e:
+        return video_path, None, str(e)
+
+
+def process_videos(videos, out_dir=output_dir, model=model_path, workers=1, batch_size=BATCH_SIZE,
+                   conf=CONFIDENCE, imgsz=640, device="cpu", fourcc="mp4v", resume=True,
+                   detection_log_dir=None, backend="pytorch", track_every=None):
+    """Processa vários vídeos em processos worker, pulando os já concluídos.
+
+    Cada worker carrega o modelo uma vez, decodifica seus vídeos e roda a
+    inferência em lotes de `batch_size`. As threads de CPU são divididas entre
+    os workers para não disputarem os mesmos núcleos.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir) if resume else {}
+    stems = output_stems(videos)
+    pending = [v for v in videos if not (resume and is_done(manifest, v, out_dir, stems[v]))]
+    skipped = len(videos) - len(pending)
+    if skipped:
+        print(f"⏭️ {skipped} vídeo(s) já processado(s), pulando.")
+    if not pending:
+        return manifest
+
+    workers = max(1, min(workers, len(pending)))
+    if backend != "pytorch" and model.endswith(".pt"):
+        # Exporta uma vez aqui para os workers não exportarem ao mesmo tempo
+        model = export_model(model, backend, imgsz)
+    options = {
+        "model": model,
+        "output_dir": out_dir,
+        "batch_size": batch_size,
+        "conf": conf,
+        "imgsz": imgsz,
+        "device": device,
+        "fourcc": fourcc,
+        "backend": backend,
+        "threads": max(1, (os.cpu_count() or 1) // workers),
+        "detection_log": detection_log_dir,
+        "track_every": track_every,
+    }
+
+    failures = 0
+    # spawn: evita herdar estado do PyTorch/OpenCV do processo pai via fork
+    with get_context("spawn").Pool(workers, initializer=init_worker, initargs=(options,)) as pool:
+        for video_path, summary, error in tqdm(
+            pool.imap_unordered(_worker_process, [(v, stems[v]) for v in pending]), total=len(pending), desc="Processando vídeos"
+        ):
+            if error is not None:
+                failures += 1
+                print(f"❌ {video_path}: {error}")
+                continue
+            manifest[os.path.abspath(video_path)] = {
+                "input": input_signature(video_path),
+                "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                **summary,
+            }
+            save_manifest(out_dir, manifest)
+            print(f"✅ {video_path}: {summary['frames']} frames em {summary['seconds']}s ({summary['fps']} FPS)")
+
+    if failures:
+        print(f"⚠️ {failures} vídeo(s) com erro; rode novamente para tentar de novo.")
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Processamento em lote de vídeos com YOLO (headless)")
+    parser.add_argument("inputs", nargs="*", default=[input_video_path],
+                        help="Vídeos, pastas ou globs (ex.: 'gravacoes/**/*.mp4')")
+    parser.add_argument("--model", default=model_path, help="Caminho do modelo YOLO")
+    parser.add_argument("--output-dir", default=output_dir, help="Pasta de saída")
+    parser.add_argument("--workers", type=int, default=1, help="Processos worker (um modelo por processo)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Frames por lote de inferência")
+    parser.add_argument("--conf", type=float, default=CONFIDENCE, help="Confiança mínima")
+    parser.add_argument("--imgsz", type=int, default=640, help="Tamanho de entrada do modelo")
+    parser.add_argument("--backend", default="pytorch", choices=BACKENDS,
+                        help="Backend de inferência (onnx/openvino exportam o .pt no primeiro uso)")
+    parser.add_argument("--device", default="cpu", help="Dispositivo (cpu, cuda, 0...)")
+    parser.add_argument("--fourcc", default="mp4v", help="Codec do vídeo anotado")
+    parser.add_argument("--detection-log", default=None,
+                        help="Pasta para o registro colunar de detecções (Parquet/.npz)")
+    parser.add_argument("--track", type=int, nargs="?", const=3, default=None, metavar="K",
+                        help="Rastreia objetos (ids estáveis) e roda o modelo só a cada K frames")
+    parser.add_argument("--no-resume", action="store_true", help="Reprocessa tudo ignorando o manifesto")
+    return parser.parse_args(argv)
 
-    # --- FINALIZAR ---
-    cap.release()
-    out.release()
-    print(f"✅ Vídeo salvo em: {os.path.abspath(output_video_path)}")
 
-except Exception as e:
-    print(f"❌ Ocorreu um erro: {str(e)}")
+if __name__ == "__main__":
+    args = parse_args()
+    videos = expand_inputs(args.inputs)
+    if not videos:
+        raise SystemExit("Nenhum vídeo para processar.")
+    print(f"▶️ {len(videos)} vídeo(s) com {args.workers} worker(s), lote de {args.batch_size} frames")
+    try:
+        process_videos(
+            videos,
+            out_dir=args.output_dir,
+            model=args.model,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            conf=args.conf,
+            imgsz=args.imgsz,
+            device=args.device,
+            fourcc=args.fourcc,
+            resume=not args.no_resume,
+            detection_log_dir=args.detection_log,
+            backend=args.backend,
+            track_every=args.track,
+        )
+    except KeyboardInterrupt:
+        print("\n⏹️ Interrompido. Rode o mesmo comando para continuar de onde parou.")
@@ -0,0 +1,161 @@
+# -----------------------------------------------------------------------------
+# Filtro de movimento antes da inferência
+# -----------------------------------------------------------------------------
+# Em câmeras fixas a cena fica parada por minutos. Um teste barato em uma versão
+# reduzida do frame (diferença contra um fundo médio, ou subtração de fundo
+# MOG2) decide se vale rodar o YOLO; sem movimento as últimas detecções são
+# reaproveitadas. A cada `refresh_interval` segundos a inferência roda de
+# qualquer forma, por segurança.
+#
+# Com `return_regions=True` o filtro também devolve as caixas com movimento: o
+# modelo pode rodar só no recorte que as contém (region_crop) e as detecções
+# paradas fora dele continuam as da última inferência (merge_region_detections).
+import time
+
+import cv2
+import numpy as np
+
+from utils.postprocess import Detections
+
+MOTION_METHODS = ("diff", "mog2")
+
+
+class MotionGate:
+    """Decide, por fonte, se o frame precisa passar pelo modelo."""
+
+    def __init__(self, method="diff", width=160, pixel_threshold=25, min_area_ratio=0.002,
+                 refresh_interval=2.0, background_alpha=0.05, return_regions=False):
+        if method not in MOTION_METHODS:
+            raise ValueError(f"Método de movimento inválido: {method}")
+        self.method = method
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_area_ratio = min_area_ratio
+        self.refresh_interval = refresh_interval
+        self.background_alpha = background_alpha
+        self.return_regions = return_regions
+        self._states = {}
+
+    def _state(self, source):
+        state = self._states.get(source)
+        if state is None:
+            state = {
+                "background": None,
+                "subtractor": None,
+                "last_inference": 0.0,
+                "checked": 0,
+                "skipped": 0,
+            }
+            if self.method == "mog2":
+                state["subtractor"] = cv2.createBackgroundSubtractorMOG2(
+                    history=500, varThreshold=16, detectShadows=False
+                )
+            self._states[source] = state
+        return state
+
+    def _motion_mask(self, state, small):
+        if self.method == "mog2":
+            return state["subtractor"].apply(small) > 0
+
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if state["background"] is None:
+            state["background"] = gray.astype(np.float32)
+            return np.ones(gray.shape, dtype=bool)
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(state["background"]))
+        # Fundo médio: absorve mudanças lentas de iluminação
+        cv2.accumulateWeighted(gray, state["background"], self.background_alpha)
+        return diff > self.pixel_threshold
+
+    def _regions(self, mask, scale):
+        """Caixas (x1, y1, x2, y2) das regiões com movimento, na escala do frame original."""
+        mask = cv2.dilate(mask.astype(np.uint8) * 255, None, iterations=2)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        regions = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            regions.append((int(x / scale), int(y / scale), int((x + w) / scale), int((y + h) / scale)))
+        return regions
+
+    def check(self, source, frame, now=None):
+        """Retorna (rodar_inferencia, regioes_com_movimento).
+
+        As regiões só são calculadas com return_regions=True (senão lista vazia).
+        """
+        now = time.monotonic() if now is None else now
+        state = self._state(source)
+        state["checked"] += 1
+
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.width / w)
+        small = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+        mask = self._motion_mask(state, small)
+        moving = mask.mean() >= self.min_area_ratio
+        refresh_due = now - state["last_inference"] >= self.refresh_interval
+
+        regions = self._regions(mask, scale) if (self.return_regions and moving) else []
+        if moving or refresh_due:
+            state["last_inference"] = now
+            return True, regions
+        state["skipped"] += 1
+        return False, regions
+
+    def reset(self, source=None):
+        """Esquece o fundo de uma fonte (ou de todas), ex.: ao trocar de câmera."""
+        if source is None:
+            self._states.clear()
+        else:
+            self._states.pop(source, None)
+
+    def stats(self, source=None):
+        states = [self._states[source]] if source in self._states else (
+            [] if source is not None else list(self._states.values())
+        )
+        checked = sum(state["checked"] for state in states)
+        skipped = sum(state["skipped"] for state in states)
+        return {
+            "checked": checked,
+            "skipped": skipped,
+            "skip_ratio": skipped / checked if checked else 0.0,
+        }
+
+
+def region_crop(regions, width, height, padding=0.15, min_size=160, max_area_ratio=0.5):
+    """Recorte (x1, y1, x2, y2) que contém todas as regiões com movimento, com margem.
+
+    Retorna None quando não vale recortar (sem regiões, ou o recorte cobriria
+    mais que `max_area_ratio` do frame): nesse caso a inferência usa o frame inteiro.
+    """
+    if not regions:
+        return None
+    boxes = np.asarray(regions, dtype=np.float32)
+    x1, y1 = boxes[:, 0].min(), boxes[:, 1].min()
+    x2, y2 = boxes[:, 2].max(), boxes[:, 3].max()
+    # Margem proporcional e tamanho mínimo: o objeto raramente cabe só na área que mudou
+    pad_x = max((x2 - x1) * padding, (min_size - (x2 - x1)) / 2, 0)
+    pad_y = max((y2 - y1) * padding, (min_size - (y2 - y1)) / 2, 0)
+    x1, y1 = int(max(0, x1 - pad_x)), int(max(0, y1 - pad_y))
+    x2, y2 = int(min(width, x2 + pad_x)), int(min(height, y2 + pad_y))
+    if x2 <= x1 or y2 <= y1 or (x2 - x1) * (y2 - y1) > max_area_ratio * width * height:
+        return None
+    return x1, y1, x2, y2
+
+
+def merge_region_detections(detections, crop, previous=None):
+    """Leva as detecções do recorte para o frame e mantém as anteriores fora dele.
+
+    `previous` são as detecções da última inferência da fonte; só as que não
+    tocam o recorte são mantidas (o que está dentro foi detectado de novo).
+    """
+    x1, y1, x2, y2 = crop
+    xyxy = detections.xyxy + np.array([x1, y1, x1, y1], dtype=np.float32)
+    conf, cls, names = detections.conf, detections.cls, detections.names
+    if previous is not None and len(previous):
+        boxes = previous.xyxy
+        outside = (boxes[:, 2] <= x1) | (boxes[:, 0] >= x2) | (boxes[:, 3] <= y1) | (boxes[:, 1] >= y2)
+        xyxy = np.concatenate([xyxy, boxes[outside]])
+        conf = np.concatenate([conf, previous.conf[outside]])
+        cls = np.concatenate([cls, previous.cls[outside]])
+        names = names or previous.names
+    # Sem ids: o rastreador (se ativo) reassocia as caixas
+    return Detections(np.ascontiguousarray(xyxy, dtype=np.float32), conf, cls, names)
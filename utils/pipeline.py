@@ -0,0 +1,236 @@
+# -----------------------------------------------------------------------------
+# Pipeline em estágios: captura -> inferência -> renderização
+# -----------------------------------------------------------------------------
+# Cada estágio roda em sua própria thread e passa os itens adiante por filas
+# limitadas. Assim a decodificação do frame N+1 acontece enquanto o frame N
+# está na inferência e o frame N-1 está sendo desenhado, e o throughput passa
+# a ser o do estágio mais lento (e não a soma de todos).
+import queue
+import threading
+import time
+
+# Políticas para quando a fila de saída está cheia
+DROP_OLDEST = "drop_oldest"  # descarta o item mais antigo da fila (ao vivo)
+DROP_NEWEST = "drop_newest"  # descarta o item que está chegando
+BLOCK = "block"  # espera espaço na fila (processamento sem perdas)
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class StageQueue:
+    """Fila limitada com política de descarte configurável.
+
+    Com `merge(antigo, novo)` os itens são listas e nada é descartado inteiro:
+    um item novo é combinado com o que ainda está na fila (ex.: o frame mais
+    recente de cada câmera), e `dropped` conta os elementos substituídos.
+    """
+
+    def __init__(self, maxsize=2, drop_policy=DROP_OLDEST, merge=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Política de descarte inválida: {drop_policy}")
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+        self.drop_policy = drop_policy
+        self.merge = merge
+        self._merge_lock = threading.Lock()
+        self.dropped = 0
+
+    def _put_merged(self, item):
+        with self._merge_lock:
+            pending = self.get(timeout=0)
+            while pending is not None:
+                merged = self.merge(pending, item)
+                self.dropped += len(pending) + len(item) - len(merged)
+                item = merged
+                pending = self.get(timeout=0)
+            self._queue.put_nowait(item)
+        return True
+
+    def put(self, item, timeout=None):
+        """Insere o item. Retorna False se ele foi descartado ou o tempo esgotou."""
+        if self.merge is not None:
+            return self._put_merged(item)
+
+        if self.drop_policy == BLOCK:
+            try:
+                self._queue.put(item, timeout=timeout)
+                return True
+            except queue.Full:
+                return False
+
+        if self.drop_policy == DROP_NEWEST:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                self.dropped += 1
+                return False
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return True
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Retira um item; retorna None se nada chegar dentro de `timeout`."""
+        try:
+            if timeout == 0:
+                return self._queue.get_nowait()
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def clear(self):
+        while self.get(timeout=0) is not None:
+            pass
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class Stage:
+    """Worker que aplica `func` a cada item da fila de entrada.
+
+    Sem fila de entrada o estágio é uma fonte: `func()` é chamada em loop e deve
+    retornar o próximo item (ou None se não houver nada no momento). Se `func`
+    retornar None o item é descartado e não segue adiante.
+    """
+
+    def __init__(self, name, func, input_queue=None, output_queue=None):
+        self.name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self._thread = None
+        self._running = False
+
+        self.processed = 0
+        self.errors = 0
+        self.fps = 0.0
+        self.avg_ms = 0.0
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name=f"stage-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            if self.input_queue is not None:
+                item = self.input_queue.get(timeout=0.1)
+                if item is None:
+                    continue
+            else:
+                item = None
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item) if self.input_queue is not None else self.func()
+            except Exception as e:
+                self.errors += 1
+                print(f"Erro no estágio '{self.name}': {e}")
+                continue
+            if result is None:
+                continue
+            self._account(time.perf_counter() - start)
+
+            if self.output_queue is not None:
+                while self._running and not self.output_queue.put(result, timeout=0.1):
+                    if self.output_queue.drop_policy != BLOCK:
+                        break
+
+    def _account(self, elapsed):
+        self.processed += 1
+        elapsed_ms = elapsed * 1000.0
+        # Média móvel exponencial: barata e suficiente para achar o gargalo
+        self.avg_ms = elapsed_ms if self.processed == 1 else 0.9 * self.avg_ms + 0.1 * elapsed_ms
+        self._window_count += 1
+        now = time.perf_counter()
+        window = now - self._window_start
+        if window >= 1.0:
+            self.fps = self._window_count / window
+            self._window_start = now
+            self._window_count = 0
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "processed": self.processed,
+            "errors": self.errors,
+            "fps": self.fps,
+            "avg_ms": self.avg_ms,
+            "queue_depth": self.input_queue.qsize() if self.input_queue is not None else 0,
+            "dropped": self.output_queue.dropped if self.output_queue is not None else 0,
+        }
+
+
+class Pipeline:
+    """Encadeia estágios ligados por filas limitadas."""
+
+    def __init__(self, queue_size=2, drop_policy=DROP_OLDEST):
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.stages = []
+        self.output_queue = None
+
+    def add_stage(self, name, func, queue_size=None, drop_policy=None, sink=False, merge=None):
+        """Adiciona um estágio ao final; o primeiro estágio é a fonte.
+
+        Com `sink=True` o estágio não tem fila de saída (ninguém consome o
+        resultado, ex.: modo sem interface). `merge` é repassado à StageQueue.
+        """
+        output_queue = None if sink else StageQueue(
+            self.queue_size if queue_size is None else queue_size,
+            self.drop_policy if drop_policy is None else drop_policy,
+            merge=merge,
+        )
+        stage = Stage(name, func, input_queue=self.output_queue, output_queue=output_queue)
+        self.stages.append(stage)
+        self.output_queue = output_queue
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        for stage in self.stages:
+            stage.stop()
+
+    def flush(self):
+        """Esvazia todas as filas (ex.: ao trocar de fonte)."""
+        for stage in self.stages:
+            if stage.output_queue is not None:
+                stage.output_queue.clear()
+
+    def stats(self):
+        return [stage.stats() for stage in self.stages]
+
+    def bottleneck(self):
+        """Nome do estágio com maior tempo médio por item."""
+        if not self.stages:
+            return None
+        return max(self.stages, key=lambda stage: stage.avg_ms).name
+
+    def format_stats(self):
+        parts = []
+        for s in self.stats():
+            parts.append(
+                f"{s['name']}: {s['fps']:.1f} fps {s['avg_ms']:.1f} ms "
+                f"fila={s['queue_depth']} desc={s['dropped']}"
+            )
+        return " | ".join(parts)
@@ -0,0 +1,133 @@
+# -----------------------------------------------------------------------------
+# Pós-processamento vetorizado dos resultados do YOLO
+# -----------------------------------------------------------------------------
+# Em vez de percorrer `for box in boxes` chamando box.xyxy[0], box.conf[0] e
+# box.cls[0] (uma indexação de tensor e uma sincronização por caixa), os dados
+# do frame são copiados para o NumPy de uma só vez (boxes.data -> N x 6) e os
+# filtros de classe/confiança viram máscaras booleanas sobre arrays.
+import numpy as np
+
+
+class Detections:
+    """Detecções de um frame em arrays NumPy.
+
+    xyxy: (N, 4) float32 | conf: (N,) float32 | cls: (N,) int64
+    draw / alert: máscaras (N,) com o que deve ser desenhado / alertado.
+    track_id: (N,) int64 com os ids do rastreador, ou None sem rastreamento.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls", "names", "draw", "alert", "track_id")
+
+    def __init__(self, xyxy, conf, cls, names, draw=None, alert=None, track_id=None):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.names = names
+        count = len(conf)
+        self.draw = draw if draw is not None else np.ones(count, dtype=bool)
+        self.alert = alert if alert is not None else np.zeros(count, dtype=bool)
+        self.track_id = track_id
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(
+            np.zeros((0, 4), dtype=np.float32),
+            np.zeros(0, dtype=np.float32),
+            np.zeros(0, dtype=np.int64),
+            names or {},
+        )
+
+    @classmethod
+    def from_result(cls, result):
+        """Copia boxes.data (xyxy, conf, cls) do Result para o NumPy em uma única transferência."""
+        names = getattr(result, "names", None) or {}
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty(names)
+        data = boxes.data
+        # Tensores do PyTorch vão para o NumPy; backends de runtime já entregam arrays
+        data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+        # Com tracking do Ultralytics há uma coluna extra (id) antes de conf/cls
+        return cls(
+            np.ascontiguousarray(data[:, :4], dtype=np.float32),
+            data[:, -2].astype(np.float32),
+            data[:, -1].astype(np.int64),
+            names,
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    def select(self, mask):
+        """Subconjunto das detecções (máscara booleana ou índices)."""
+        return Detections(
+            self.xyxy[mask], self.conf[mask], self.cls[mask], self.names,
+            self.draw[mask], self.alert[mask],
+            None if self.track_id is None else self.track_id[mask],
+        )
+
+    def class_names(self, indices=None):
+        cls_ids = self.cls if indices is None else self.cls[indices]
+        return [self.names.get(int(c), str(int(c))) for c in cls_ids]
+
+    def to_records(self):
+        """Lista de dicionários serializáveis (para JSON)."""
+        records = [
+            {
+                "class": name,
+                "confidence": round(float(conf), 4),
+                "xyxy": [round(float(v), 1) for v in box],
+            }
+            for name, conf, box in zip(self.class_names(), self.conf, self.xyxy)
+        ]
+        if self.track_id is not None:
+            for record, track_id in zip(records, self.track_id):
+                record["track_id"] = int(track_id)
+        return records
+
+
+class ClassFilter:
+    """Filtro de classes/limiares com máscaras por id de classe pré-calculadas.
+
+    As listas de nomes (TARGET_CLASSES, ALERT_CLASSES) são convertidas uma vez
+    por modelo em tabelas booleanas indexadas pelo id da classe; por frame só
+    sobra uma indexação e duas comparações vetorizadas.
+    """
+
+    def __init__(self, target_classes, alert_classes, confidence_threshold, alert_threshold):
+        self.target_classes = {name.lower() for name in target_classes}
+        self.alert_classes = {name.lower() for name in alert_classes}
+        self.confidence_threshold = confidence_threshold
+        self.alert_threshold = alert_threshold
+        self._names = None
+        self._target_lut = None
+        self._alert_lut = None
+
+    def _luts(self, names):
+        # O Ultralytics devolve sempre o mesmo dicionário `names` do modelo:
+        # recalcula as tabelas só quando o modelo muda.
+        if names is not self._names:
+            size = (max(names) + 1) if names else 0
+            target = np.zeros(size, dtype=bool)
+            alert = np.zeros(size, dtype=bool)
+            for class_id, name in names.items():
+                target[class_id] = name.lower() in self.target_classes
+                alert[class_id] = name.lower() in self.alert_classes
+            self._names = names
+            self._target_lut = target
+            self._alert_lut = alert
+        return self._target_lut, self._alert_lut
+
+    def apply(self, detections):
+        """Preenche as máscaras draw/alert e descarta ids de classe inválidos."""
+        target_lut, alert_lut = self._luts(detections.names)
+        valid = detections.cls < len(target_lut)
+        if not valid.all():
+            print(f"Aviso: ID de classe inválido: {detections.cls[~valid].tolist()}")
+            detections = detections.select(valid)
+        detections.draw = target_lut[detections.cls] & (detections.conf > self.confidence_threshold)
+        detections.alert = alert_lut[detections.cls] & (detections.conf > self.alert_threshold)
+        return detections
+
+    def __call__(self, result):
+        return self.apply(Detections.from_result(result))
@@ -0,0 +1,198 @@
+# -----------------------------------------------------------------------------
+# Stream MJPEG dos frames anotados para visualização remota (navegador)
+# -----------------------------------------------------------------------------
+# O loop de detecção só entrega o frame (`publish`); uma thread codifica o JPEG
+# uma única vez e todos os clientes conectados recebem os mesmos bytes. Cada
+# cliente é atendido pela sua própria thread e sempre pega o frame mais recente:
+# um cliente lento simplesmente pula frames e nunca segura a detecção nem os
+# outros clientes. Sem clientes conectados nada é composto nem codificado; um
+# pedido de snapshot conta como cliente até receber um frame novo.
+#
+#   http://<host>:8080/             página com o vídeo
+#   http://<host>:8080/stream.mjpg  stream multipart (VLC, <img>, ffplay)
+#   http://<host>:8080/snapshot.jpg próximo frame (espera até `snapshot_timeout`)
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+BOUNDARY = "frame"
+
+INDEX_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>body{{margin:0;background:#111;color:#ddd;font-family:sans-serif}}
+img{{display:block;max-width:100vw;max-height:95vh;margin:auto}}</style></head>
+<body><div style="padding:4px 8px">{title}</div><img src="/stream.mjpg{query}"></body></html>
+"""
+
+
+class StreamServer:
+    """Servidor HTTP de MJPEG: um JPEG por frame publicado, enviado a todos os clientes."""
+
+    def __init__(self, port=8080, host="127.0.0.1", max_fps=15.0, jpeg_quality=70, token=None,
+                 title="VisionGuard", snapshot_timeout=2.0):
+        self.max_fps = max_fps
+        self.jpeg_quality = jpeg_quality
+        self.snapshot_timeout = snapshot_timeout
+        self.token = token
+        self.title = title
+        self._cond = threading.Condition()
+        self._pending = None  # frame aguardando codificação (só o mais recente)
+        self._jpeg = None
+        self._seq = 0
+        self._last_publish = 0.0
+        self._running = True
+        self.clients = 0
+        self.snapshot_waiters = 0  # pedidos de /snapshot.jpg esperando um frame novo
+        self.encoded = 0
+        self.skipped = 0  # frames que clientes lentos não chegaram a receber
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="stream-http", daemon=True).start()
+        self._encoder = threading.Thread(target=self._encode_loop, name="stream-encoder", daemon=True)
+        self._encoder.start()
+
+    def wants_frame(self, now=None):
+        """True se vale compor um frame agora (há clientes ou snapshots pendentes e o intervalo do FPS passou)."""
+        now = time.monotonic() if now is None else now
+        wanted = self.clients > 0 or self.snapshot_waiters > 0
+        return wanted and now - self._last_publish >= 1.0 / self.max_fps
+
+    def publish(self, frame, rgb=False):
+        """Entrega um frame (BGR, ou RGB com `rgb=True`); retorna sem esperar a codificação."""
+        self._last_publish = time.monotonic()
+        with self._cond:
+            # Copia: o chamador reaproveita o buffer; um frame ainda não codificado é substituído
+            self._pending = (frame.copy(), rgb)
+            self._cond.notify_all()
+
+    def _encode_loop(self):
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), int(self.jpeg_quality)]
+        while self._running:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait(0.5)
+                if not self._running:
+                    return
+                frame, rgb = self._pending
+                self._pending = None
+            if rgb:
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            ok, buffer = cv2.imencode(".jpg", frame, params)
+            if not ok:
+                continue
+            with self._cond:
+                self._jpeg = buffer.tobytes()
+                self._seq += 1
+                self.encoded += 1
+                self._cond.notify_all()
+
+    def wait_frame(self, last_seq, timeout=1.0):
+        """Próximo JPEG depois de `last_seq`: (seq, bytes), ou (last_seq, None) no timeout."""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: (self._jpeg is not None and self._seq != last_seq) or not self._running, timeout
+            )
+            if not ready or self._jpeg is None or self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._jpeg
+
+    def snapshot(self, timeout=None):
+        """Codifica e retorna o próximo frame publicado (None se nenhum chegar a tempo).
+
+        Enquanto espera, o pedido conta como cliente: wants_frame() pede um frame
+        mesmo sem nenhum stream aberto.
+        """
+        with self._cond:
+            seq = self._seq
+            self.snapshot_waiters += 1
+        try:
+            _, jpeg = self.wait_frame(seq, self.snapshot_timeout if timeout is None else timeout)
+        finally:
+            with self._cond:
+                self.snapshot_waiters -= 1
+        return jpeg
+
+    def _authorized(self, path):
+        if not self.token:
+            return True
+        return parse_qs(urlparse(path).query).get("token", [None])[0] == self.token
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if not server._authorized(self.path):
+                    self.send_error(403)
+                    return
+                route = urlparse(self.path).path
+                if route == "/":
+                    query = f"?token={server.token}" if server.token else ""
+                    self._send(200, "text/html; charset=utf-8",
+                               INDEX_HTML.format(title=server.title, query=query).encode("utf-8"))
+                elif route == "/snapshot.jpg":
+                    jpeg = server.snapshot()
+                    if jpeg is None:
+                        self.send_error(503, "Nenhum frame novo")
+                    else:
+                        self._send(200, "image/jpeg", jpeg)
+                elif route == "/stream.mjpg":
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache, private")
+                self.send_header("Pragma", "no-cache")
+                self.end_headers()
+                with server._cond:
+                    server.clients += 1
+                seq = None
+                try:
+                    while server._running:
+                        new_seq, jpeg = server.wait_frame(seq)
+                        if jpeg is None:
+                            continue
+                        if seq is not None and new_seq - seq > 1:
+                            server.skipped += new_seq - seq - 1
+                        seq = new_seq
+                        self.wfile.write(
+                            f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii")
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                    pass  # cliente fechou a página
+                finally:
+                    with server._cond:
+                        server.clients -= 1
+
+            def log_message(self, fmt, *args):
+                pass
+
+        return Handler
+
+    def stats(self):
+        return {"clients": self.clients, "encoded": self.encoded, "skipped": self.skipped}
+
+    def close(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
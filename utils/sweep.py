@@ -0,0 +1,289 @@
+# Requer: pip install ultralytics
+#
+# Varredura de hiperparâmetros / tamanhos de modelo para o model_coach.py.
+#
+# Uso (a partir da raiz do projeto):
+#   python -m utils.sweep --models yolo11n.pt yolo11s.pt yolo11m.pt --imgsz 640 512 \
+#       --lr0 0.002 0.001 --epochs 30 --workers 3 --tiers 20 50 100
+#
+# Cada combinação modelo x imgsz x lr0 x lote treina em um processo próprio
+# (até --workers ao mesmo tempo, threads de CPU divididas entre eles), a partir
+# dos parâmetros de `train_args` do model_coach.py. Ao fim de cada época o mAP
+# da execução é comparado com o das outras na mesma época (poda pela mediana):
+# execuções claramente piores param cedo e liberam o processo para a próxima.
+#
+# Depois do treino, o best.pt de cada execução passa pelo utils/benchmark.py
+# (um processo por vez, sem disputar CPU com o treino) e o resultado é uma
+# tabela mAP x latência de inferência, com a fronteira de Pareto marcada e, com
+# --tiers, a melhor configuração dentro de cada orçamento de latência (p95 ms).
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from utils.backends import cpu_threads
+from utils.benchmark import RESULTS_DIR, VIDEO_PATH, git_commit, hardware_info, run_benchmark
+from utils.model_coach import base_dir, base_model, train_args
+
+SWEEP_PROJECT = "sweeps"  # pasta das execuções do Ultralytics (uma subpasta por varredura)
+MAP_KEY = "metrics/mAP50-95(B)"
+MAP50_KEY = "metrics/mAP50(B)"
+TABLE_COLUMNS = (
+    "name", "model", "imgsz", "lr0", "batch", "epochs_run", "pruned", "map50", "map50_95",
+    "latency_p50_ms", "latency_p95_ms", "throughput_fps", "pareto",
+)
+
+
+def build_grid(models, imgsz_list, lr0_list, batch_sizes, epochs):
+    configs = []
+    for model, imgsz, lr0, batch in itertools.product(models, imgsz_list, lr0_list, batch_sizes):
+        configs.append(
+            {
+                "name": f"{Path(model).stem}-{imgsz}-lr{lr0:g}-b{batch}",
+                "model": model,
+                "imgsz": imgsz,
+                "lr0": lr0,
+                "batch": batch,
+                "epochs": epochs,
+            }
+        )
+    return configs
+
+
+class MedianPruner:
+    """Poda pela mediana compartilhada entre os processos de treino.
+
+    Cada execução informa o mAP ao fim de cada época; a partir de
+    `after_epochs`, com pelo menos `min_runs` valores naquela época, uma
+    execução abaixo do quantil `quantile` dos valores é interrompida.
+    """
+
+    def __init__(self, history, lock, after_epochs=5, quantile=0.5, min_runs=3):
+        self.history = history  # dict do Manager: época -> [mAP de cada execução]
+        self.lock = lock
+        self.after_epochs = after_epochs
+        self.quantile = quantile
+        self.min_runs = min_runs
+
+    def report(self, epoch, value):
+        with self.lock:
+            values = list(self.history.get(epoch, []))
+            values.append(value)
+            self.history[epoch] = values
+        if self.quantile <= 0 or epoch + 1 < self.after_epochs or len(values) < self.min_runs:
+            return False
+        return value < float(np.quantile(values, self.quantile))
+
+
+def train_config(job):
+    """Executado em um processo novo: treina uma configuração (com poda) e devolve as métricas."""
+    config, options, pruner = job
+    threads = options["threads"]
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    if options["device"] == "cpu":
+        os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    result = dict(config, epochs_run=0, pruned=False, map50=None, map50_95=None, weights=None, error=None)
+    try:
+        import torch
+        from ultralytics import YOLO
+
+        from utils.dataset_shards import ShardDetectionTrainer
+
+        torch.set_num_threads(threads)
+        model = YOLO(config["model"])
+        best = {"fitness": float("-inf")}
+
+        def on_fit_epoch_end(trainer):
+            metrics = trainer.metrics or {}
+            value = float(metrics.get(MAP_KEY, 0.0))
+            fitness = float(trainer.fitness) if trainer.fitness is not None else value
+            result["epochs_run"] = trainer.epoch + 1
+            # best.pt é o checkpoint de maior fitness: guarda as métricas daquela época
+            if fitness > best["fitness"]:
+                best["fitness"] = fitness
+                result["map50"] = round(float(metrics.get(MAP50_KEY, 0.0)), 4)
+                result["map50_95"] = round(value, 4)
+            if pruner.report(trainer.epoch, value):
+                print(f"✂️ {config['name']}: podada na época {trainer.epoch + 1} (mAP50-95 {value:.3f})")
+                result["pruned"] = True
+                trainer.stop = True
+
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+        args = dict(train_args)
+        args.update(
+            epochs=config["epochs"],
+            imgsz=config["imgsz"],
+            batch=config["batch"],
+            lr0=config["lr0"],
+            device=options["device"],
+            workers=0,  # o paralelismo é entre execuções (processos do pool não podem criar filhos)
+            amp=options["device"] != "cpu",
+            name=config["name"],
+            project=options["project"],
+            exist_ok=True,
+            plots=False,
+        )
+        model.train(data=options["data"], trainer=ShardDetectionTrainer, **args)
+        weights = getattr(model.trainer, "best", None)
+        result["weights"] = os.path.abspath(weights) if weights and os.path.exists(weights) else None
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_sweep(configs, data, workers=2, device="cpu", project=None, prune_after=5, prune_quantile=0.5,
+              min_runs=3):
+    """Treina as configurações em paralelo (spawn, até `workers` processos) com poda pela mediana."""
+    project = os.path.abspath(project or os.path.join(SWEEP_PROJECT, time.strftime("%Y%m%d-%H%M%S")))
+    options = {
+        "data": data,
+        "device": device,
+        "project": project,
+        "threads": max(1, cpu_threads() // workers),
+    }
+    context = get_context("spawn")
+    results = []
+    with context.Manager() as manager:
+        pruner = MedianPruner(manager.dict(), manager.Lock(), prune_after, prune_quantile, min_runs)
+        jobs = [(config, options, pruner) for config in configs]
+        # maxtasksperchild=1: processo novo por execução (memória do treino anterior liberada)
+        with context.Pool(workers, maxtasksperchild=1) as pool:
+            for result in pool.imap_unordered(train_config, jobs):
+                if result["error"]:
+                    print(f"❌ {result['name']}: {result['error']}")
+                else:
+                    status = "podada" if result["pruned"] else "concluída"
+                    print(f"✅ {result['name']}: {status} após {result['epochs_run']} épocas, "
+                          f"mAP50-95 {result['map50_95']}")
+                results.append(result)
+    order = {config["name"]: index for index, config in enumerate(configs)}
+    results.sort(key=lambda row: order[row["name"]])
+    return {"project": project, "threads_per_run": options["threads"], "results": results}
+
+
+def measure_latency(results, video=VIDEO_PATH, max_frames=200, threads=None):
+    """Latência de inferência (CPU, PyTorch, lote 1) do best.pt de cada execução via utils.benchmark."""
+    trained = [row for row in results if row["weights"]]
+    configs = [
+        {"model": row["name"], "path": row["weights"], "backend": "pytorch", "int8": False,
+         "imgsz": row["imgsz"], "batch_size": 1}
+        for row in trained
+    ]
+    report = run_benchmark(configs, video, models_dir="", max_frames=max_frames, threads=threads)
+    for row, bench in zip(trained, report["results"]):
+        if bench["error"]:
+            continue
+        inference = bench["latency_ms"]["inference"]
+        row["latency_p50_ms"] = inference["p50"]
+        row["latency_p95_ms"] = inference["p95"]
+        row["throughput_fps"] = bench["throughput_fps"]
+    return report
+
+
+def mark_pareto(rows):
+    """Marca as execuções sem outra de mAP maior ou igual e latência menor ou igual (uma estritamente)."""
+    measured = [row for row in rows if row.get("map50_95") is not None and row.get("latency_p50_ms") is not None]
+    for row in rows:
+        row["pareto"] = row in measured and not any(
+            other["map50_95"] >= row["map50_95"]
+            and other["latency_p50_ms"] <= row["latency_p50_ms"]
+            and (other["map50_95"] > row["map50_95"] or other["latency_p50_ms"] < row["latency_p50_ms"])
+            for other in measured
+        )
+
+
+def pick_tiers(rows, budgets_ms):
+    """Para cada orçamento de latência (p95 ms), a execução de maior mAP50-95 que cabe nele."""
+    tiers = {}
+    for budget in budgets_ms:
+        fits = [row for row in rows if row.get("pareto") and row["latency_p95_ms"] <= budget]
+        best = max(fits, key=lambda row: row["map50_95"], default=None)
+        tiers[str(budget)] = best["name"] if best else None
+    return tiers
+
+
+def print_table(rows, tiers=None):
+    header = (f"{'execução':30} {'épocas':>6} {'mAP50':>6} {'mAP50-95':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'FPS':>7}  pareto")
+    print(header)
+    print("-" * len(header))
+    # Da mais rápida para a mais lenta: a fronteira de Pareto aparece como uma escada de mAP
+    for row in sorted(rows, key=lambda row: (row.get("latency_p50_ms") is None, row.get("latency_p50_ms") or 0)):
+        if row["error"]:
+            print(f"{row['name'][:30]:30} erro: {row['error']}")
+            continue
+        epochs = f"{row['epochs_run']}{'✂' if row['pruned'] else ''}"
+        print(f"{row['name'][:30]:30} {epochs:>6} {str(row['map50']):>6} {str(row['map50_95']):>8} "
+              f"{str(row.get('latency_p50_ms')):>8} {str(row.get('latency_p95_ms')):>8} "
+              f"{str(row.get('throughput_fps')):>7}  {'*' if row.get('pareto') else ''}")
+    for budget, name in (tiers or {}).items():
+        print(f"Orçamento p95 ≤ {budget} ms: {name or 'nenhuma execução cabe'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de modelos/hiperparâmetros com tabela mAP x latência")
+    parser.add_argument("--models", nargs="+", default=[base_model], help="Pesos iniciais (ex.: yolo11n.pt yolo11s.pt)")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=[train_args["imgsz"]])
+    parser.add_argument("--lr0", type=float, nargs="+", default=[train_args["lr0"]])
+    parser.add_argument("--batch", type=int, nargs="+", default=[train_args["batch"]])
+    parser.add_argument("--epochs", type=int, default=train_args["epochs"])
+    parser.add_argument("--data", default=os.path.join(base_dir, "coco_cutlery_gpu.yaml"),
+                        help="YAML do dataset (padrão: o gerado pelo model_coach.py)")
+    parser.add_argument("--workers", type=int, default=2, help="Execuções treinando ao mesmo tempo")
+    parser.add_argument("--device", default="cpu", help="cpu (padrão) ou o dispositivo do Ultralytics")
+    parser.add_argument("--project", default=None, help="Pasta das execuções (padrão: sweeps/<data>)")
+    parser.add_argument("--prune-after", type=int, default=5, help="Época a partir da qual a poda vale")
+    parser.add_argument("--prune-quantile", type=float, default=0.5,
+                        help="Poda execuções abaixo deste quantil do mAP na mesma época (0 = sem poda)")
+    parser.add_argument("--min-runs", type=int, default=3, help="Execuções mínimas na época para podar")
+    parser.add_argument("--video", default=VIDEO_PATH, help="Vídeo da medição de latência")
+    parser.add_argument("--max-frames", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=None, help="Threads de CPU na medição de latência")
+    parser.add_argument("--tiers", type=float, nargs="+", default=[],
+                        help="Orçamentos de latência (p95 ms) para escolher o melhor modelo de cada um")
+    parser.add_argument("--output", default=None,
+                        help="Arquivo JSON (padrão: data/results/sweep-<data>-<commit>.json; CSV ao lado)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configs = build_grid(args.models, args.imgsz, args.lr0, args.batch, args.epochs)
+    print(f"{len(configs)} configuração(ões), {args.workers} em paralelo, dataset {args.data}")
+    sweep = run_sweep(configs, args.data, args.workers, args.device, args.project, args.prune_after,
+                      args.prune_quantile, args.min_runs)
+    rows = sweep["results"]
+    bench = measure_latency(rows, args.video, args.max_frames, args.threads)
+    mark_pareto(rows)
+    tiers = pick_tiers(rows, args.tiers)
+    print_table(rows, tiers)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"sweep-{time.strftime('%Y%m%d-%H%M%S')}-{git_commit() or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    report = {
+        "created_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": git_commit(),
+        "hardware": bench["hardware"] if bench["results"] else hardware_info(args.threads or cpu_threads()),
+        "data": args.data,
+        "project": sweep["project"],
+        "threads_per_run": sweep["threads_per_run"],
+        "video": args.video,
+        "tiers": tiers,
+        "results": rows,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.splitext(output)[0] + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=TABLE_COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ Relatório salvo em: {output}")
@@ -0,0 +1,216 @@
+# -----------------------------------------------------------------------------
+# Inferência em blocos (tiles) / regiões de interesse
+# -----------------------------------------------------------------------------
+# Em streams 1080p/4K o YOLO reduz o frame inteiro para 640 px e uma faca na mão
+# de alguém vira poucos pixels. Aqui o frame é recortado em blocos sobrepostos
+# (ou em regiões de interesse configuradas), todos os recortes vão para o
+# modelo em um único lote e as caixas são juntadas de volta nas coordenadas do
+# frame, com supressão entre blocos para eliminar duplicatas nas emendas.
+#
+# Relatório de custo (a partir da raiz do projeto):
+#   python -m utils.tiling --source data/inputs/video2.mp4 --model models/yolo11s_dataset_knife.pt \
+#       --tile-sizes 0 640 960 --overlaps 0.1 0.2
+import argparse
+import time
+
+import numpy as np
+
+from utils.postprocess import Detections
+
+
+def tile_windows(width, height, tile_size, overlap=0.2, region=None):
+    """Janelas (x1, y1, x2, y2) de `tile_size` px cobrindo a região, com sobreposição."""
+    x0, y0, x1, y1 = region if region is not None else (0, 0, width, height)
+    region_w, region_h = x1 - x0, y1 - y0
+    step = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)  # último bloco encostado na borda
+        return positions
+
+    return [
+        (x0 + x, y0 + y, x0 + min(x + tile_size, region_w), y0 + min(y + tile_size, region_h))
+        for y in starts(region_h)
+        for x in starts(region_w)
+    ]
+
+
+def roi_to_pixels(roi, width, height):
+    """Aceita ROI em pixels ou em frações (0-1) do frame."""
+    x1, y1, x2, y2 = roi
+    if max(roi) <= 1.0:
+        x1, x2 = x1 * width, x2 * width
+        y1, y2 = y1 * height, y2 * height
+    return (
+        int(max(0, x1)), int(max(0, y1)), int(min(width, x2)), int(min(height, y2))
+    )
+
+
+def merge_detections(xyxy, conf, cls, threshold=0.5):
+    """Supressão gulosa por classe usando interseção sobre a menor caixa (IoS).
+
+    Uma faca cortada na emenda de dois blocos gera uma caixa parcial contida na
+    caixa completa do bloco vizinho; o IoU entre elas é baixo, mas o IoS é alto.
+    Retorna os índices mantidos, em ordem de confiança.
+    """
+    order = np.argsort(-conf)
+    areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+    suppressed = np.zeros(len(conf), dtype=bool)
+    keep = []
+    for position, index in enumerate(order):
+        if suppressed[index]:
+            continue
+        keep.append(index)
+        rest = order[position + 1 :]
+        rest = rest[~suppressed[rest] & (cls[rest] == cls[index])]
+        if not len(rest):
+            continue
+        ix1 = np.maximum(xyxy[index, 0], xyxy[rest, 0])
+        iy1 = np.maximum(xyxy[index, 1], xyxy[rest, 1])
+        ix2 = np.minimum(xyxy[index, 2], xyxy[rest, 2])
+        iy2 = np.minimum(xyxy[index, 3], xyxy[rest, 3])
+        intersection = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        smaller = np.minimum(areas[index], areas[rest])
+        ios = intersection / np.maximum(smaller, 1e-6)
+        suppressed[rest[ios > threshold]] = True
+    return np.asarray(keep, dtype=np.int64)
+
+
+class TiledInference:
+    """Roda o modelo em blocos/ROIs de vários frames em um único lote."""
+
+    def __init__(self, tile_size=640, overlap=0.2, rois=None, include_full_frame=True,
+                 merge_threshold=0.5):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.rois = rois
+        self.include_full_frame = include_full_frame
+        self.merge_threshold = merge_threshold
+        self.last_tile_count = 0
+
+    def windows(self, width, height):
+        regions = (
+            [roi_to_pixels(roi, width, height) for roi in self.rois] if self.rois else [None]
+        )
+        windows = []
+        for region in regions:
+            windows.extend(tile_windows(width, height, self.tile_size, self.overlap, region))
+        if self.include_full_frame and (len(windows) > 1 or self.rois):
+            # Frame inteiro reduzido: pega objetos grandes que não cabem em um bloco
+            windows.append((0, 0, width, height))
+        return windows
+
+    def split(self, frames):
+        """Recortes de todos os frames e, para cada recorte, (índice do frame, x1, y1).
+
+        Os recortes podem ir para o modelo junto com outros (ex.: blocos de outras
+        fontes); os resultados correspondentes voltam por merge().
+        """
+        crops = []
+        owners = []
+        for frame_index, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            for window in self.windows(width, height):
+                x1, y1, x2, y2 = window
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append((frame_index, x1, y1))
+        self.last_tile_count = len(crops)
+        return crops, owners
+
+    def merge(self, results, owners, frame_count):
+        """Junta os resultados dos recortes de split() em uma Detections por frame."""
+        per_frame = [[] for _ in range(frame_count)]
+        names = {}
+        for (frame_index, offset_x, offset_y), result in zip(owners, results):
+            detections = Detections.from_result(result)
+            names = detections.names or names
+            if len(detections):
+                detections.xyxy += np.array([offset_x, offset_y, offset_x, offset_y], dtype=np.float32)
+                per_frame[frame_index].append(detections)
+
+        merged = []
+        for parts in per_frame:
+            if not parts:
+                merged.append(Detections.empty(names))
+                continue
+            xyxy = np.concatenate([part.xyxy for part in parts])
+            conf = np.concatenate([part.conf for part in parts])
+            cls = np.concatenate([part.cls for part in parts])
+            keep = merge_detections(xyxy, conf, cls, self.merge_threshold)
+            merged.append(Detections(xyxy[keep], conf[keep], cls[keep], names))
+        return merged
+
+    def __call__(self, model, frames, **kwargs):
+        """Retorna uma lista de Detections (uma por frame) nas coordenadas originais."""
+        crops, owners = self.split(frames)
+        results = model(crops, verbose=False, **kwargs) if crops else []
+        return self.merge(results, owners, len(frames))
+
+
+def cost_report(model, frames, tile_sizes, overlaps, target_classes=("knife", "scissors"), conf=0.25):
+    """Mede custo (ms/frame, blocos) e detecções-alvo de cada configuração.
+
+    tile_size 0 = frame inteiro (sem blocos). A coluna "alvos/ms" ajuda a escolher
+    a configuração com melhor cobertura por milissegundo em cada câmera.
+    """
+    target_classes = {name.lower() for name in target_classes}
+    configs = [(0, 0.0)] if 0 in tile_sizes else []
+    configs += [(size, overlap) for size in tile_sizes if size for overlap in overlaps]
+
+    rows = []
+    for tile_size, overlap in configs:
+        tiler = TiledInference(tile_size, overlap) if tile_size else None
+        model(frames[:1], verbose=False)  # aquecimento
+        targets = 0
+        tiles = 0
+        start = time.perf_counter()
+        for frame in frames:
+            if tiler is None:
+                detections = Detections.from_result(model([frame], verbose=False, conf=conf)[0])
+                tiles += 1
+            else:
+                detections = tiler(model, [frame], conf=conf)[0]
+                tiles += tiler.last_tile_count
+            targets += sum(name.lower() in target_classes for name in detections.class_names())
+        elapsed_ms = (time.perf_counter() - start) * 1000.0 / max(1, len(frames))
+        rows.append(
+            {
+                "tile_size": tile_size or "inteiro",
+                "overlap": overlap,
+                "tiles_per_frame": round(tiles / max(1, len(frames)), 1),
+                "ms_per_frame": round(elapsed_ms, 1),
+                "targets_per_frame": round(targets / max(1, len(frames)), 2),
+                "targets_per_ms": round(targets / max(1, len(frames)) / max(elapsed_ms, 1e-6), 4),
+            }
+        )
+    return rows
+
+
+if __name__ == "__main__":
+    from utils.backends import load_backend_model
+    from utils.capture import read_frames
+
+    parser = argparse.ArgumentParser(description="Relatório de custo da inferência em blocos")
+    parser.add_argument("--source", required=True, help="Vídeo (ou imagem) de uma câmera")
+    parser.add_argument("--model", required=True, help="Modelo (.pt, ou .onnx com --backend onnx)")
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--frames", type=int, default=30, help="Frames amostrados do vídeo")
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[0, 640, 960])
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[0.1, 0.2])
+    args = parser.parse_args()
+
+    frames = []
+    for _, frame in read_frames(args.source):
+        frames.append(frame)
+        if len(frames) >= args.frames:
+            break
+    model = load_backend_model({"path": args.model, "backend": args.backend})
+    print(f"{'bloco':>8} {'sobrep.':>8} {'blocos':>7} {'ms/frame':>9} {'alvos/frame':>12} {'alvos/ms':>9}")
+    for row in cost_report(model, frames, args.tile_sizes, args.overlaps):
+        print(
+            f"{row['tile_size']:>8} {row['overlap']:>8} {row['tiles_per_frame']:>7} "
+            f"{row['ms_per_frame']:>9} {row['targets_per_frame']:>12} {row['targets_per_ms']:>9}"
+        )
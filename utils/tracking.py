@@ -0,0 +1,181 @@
+# -----------------------------------------------------------------------------
+# Rastreamento leve (IoU, estilo ByteTrack) sobre as detecções do YOLO
+# -----------------------------------------------------------------------------
+# Dá a cada objeto um id estável entre frames e suaviza as caixas. A
+# associação é feita em duas etapas, como no ByteTrack: primeiro as detecções
+# de alta confiança, depois as de baixa confiança contra os rastros que
+# sobraram (uma faca parcialmente coberta continua no mesmo rastro).
+#
+# Cada rastro guarda centro, tamanho e velocidade (em pixels por frame), então
+# o detector pode rodar só a cada K frames: nos frames intermediários
+# `predict()` avança as caixas pela velocidade estimada.
+import numpy as np
+
+from utils.postprocess import Detections
+
+
+def box_iou(a, b):
+    """Matriz IoU (len(a), len(b)) entre caixas xyxy."""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-6)
+
+
+def greedy_match(iou, threshold):
+    """Pares (linha, coluna) em ordem decrescente de IoU, cada um usado uma vez."""
+    pairs = []
+    if not iou.size:
+        return pairs
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols])
+    used_rows, used_cols = set(), set()
+    for row, col in zip(rows[order], cols[order]):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        pairs.append((int(row), int(col)))
+    return pairs
+
+
+def xyxy_to_cxcywh(boxes):
+    out = np.empty_like(boxes)
+    out[:, :2] = (boxes[:, :2] + boxes[:, 2:]) / 2
+    out[:, 2:] = boxes[:, 2:] - boxes[:, :2]
+    return out
+
+
+def cxcywh_to_xyxy(boxes):
+    out = np.empty_like(boxes)
+    out[:, :2] = boxes[:, :2] - boxes[:, 2:] / 2
+    out[:, 2:] = boxes[:, :2] + boxes[:, 2:] / 2
+    return out
+
+
+class IouTracker:
+    """Rastreador por IoU para uma fonte de vídeo.
+
+    Chame `update(detections)` nos frames com inferência e `predict()` nos
+    frames pulados; ambos devolvem Detections com `track_id` preenchido.
+    """
+
+    def __init__(self, iou_threshold=0.3, high_threshold=0.5, low_threshold=0.1, min_hits=2,
+                 max_misses=10, coast_misses=1, smoothing=0.6, velocity_smoothing=0.5):
+        self.iou_threshold = iou_threshold
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.min_hits = min_hits
+        self.max_misses = max_misses  # rodadas de detecção sem par antes de remover o rastro
+        self.coast_misses = coast_misses  # rodadas sem par em que o rastro ainda é exibido
+        self.smoothing = smoothing  # peso da detecção nova na caixa suavizada
+        self.velocity_smoothing = velocity_smoothing
+        self.names = {}
+        self._next_id = 1
+        self._reset_arrays()
+
+    def _reset_arrays(self):
+        self._state = np.zeros((0, 4), dtype=np.float32)  # cx, cy, w, h
+        self._velocity = np.zeros((0, 2), dtype=np.float32)  # vx, vy por frame
+        self._cls = np.zeros(0, dtype=np.int64)
+        self._conf = np.zeros(0, dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._misses = np.zeros(0, dtype=np.int64)
+        self._frames_since_update = np.zeros(0, dtype=np.int64)
+
+    def reset(self):
+        self._reset_arrays()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _advance(self):
+        self._state[:, :2] += self._velocity
+        self._frames_since_update += 1
+
+    def predict(self):
+        """Frame sem inferência: avança os rastros pela velocidade e devolve as caixas previstas."""
+        self._advance()
+        return self._output()
+
+    def _match(self, track_indices, boxes, cls, detection_indices):
+        if not len(track_indices) or not len(detection_indices):
+            return []
+        iou = box_iou(cxcywh_to_xyxy(self._state[track_indices]), boxes[detection_indices])
+        # Só associa caixas da mesma classe
+        iou[self._cls[track_indices][:, None] != cls[detection_indices][None, :]] = 0.0
+        return [
+            (track_indices[row], detection_indices[col])
+            for row, col in greedy_match(iou, self.iou_threshold)
+        ]
+
+    def update(self, detections):
+        """Frame com inferência: associa as detecções aos rastros e devolve os rastros visíveis."""
+        self.names = detections.names or self.names
+        self._advance()
+        keep = detections.conf >= self.low_threshold
+        boxes = detections.xyxy[keep]
+        conf = detections.conf[keep]
+        cls = detections.cls[keep]
+
+        all_tracks = np.arange(len(self._ids))
+        high = np.flatnonzero(conf >= self.high_threshold)
+        low = np.flatnonzero(conf < self.high_threshold)
+        matches = self._match(all_tracks, boxes, cls, high)
+        matched_tracks = {track for track, _ in matches}
+        remaining = np.array([t for t in all_tracks if t not in matched_tracks], dtype=np.int64)
+        # Segunda etapa (ByteTrack): baixa confiança só mantém rastros existentes
+        matches += self._match(remaining, boxes, cls, low)
+
+        measured = xyxy_to_cxcywh(boxes)
+        for track, detection in matches:
+            elapsed = max(1, int(self._frames_since_update[track]))
+            predicted = self._state[track]
+            previous_center = predicted[:2] - self._velocity[track] * elapsed
+            velocity = (measured[detection, :2] - previous_center) / elapsed
+            self._velocity[track] = (
+                self.velocity_smoothing * velocity + (1 - self.velocity_smoothing) * self._velocity[track]
+            )
+            self._state[track] = self.smoothing * measured[detection] + (1 - self.smoothing) * predicted
+            self._conf[track] = conf[detection]
+            self._hits[track] += 1
+            self._misses[track] = 0
+            self._frames_since_update[track] = 0
+
+        matched_tracks = np.array([track for track, _ in matches], dtype=np.int64)
+        missed = np.ones(len(self._ids), dtype=bool)
+        missed[matched_tracks] = False
+        self._misses[missed] += 1
+
+        matched_detections = {detection for _, detection in matches}
+        new = np.array([d for d in high if d not in matched_detections], dtype=np.int64)
+        alive = self._misses <= self.max_misses
+        self._state = np.concatenate([self._state[alive], measured[new]])
+        self._velocity = np.concatenate([self._velocity[alive], np.zeros((len(new), 2), dtype=np.float32)])
+        self._cls = np.concatenate([self._cls[alive], cls[new]])
+        self._conf = np.concatenate([self._conf[alive], conf[new]])
+        self._ids = np.concatenate([self._ids[alive], np.arange(self._next_id, self._next_id + len(new))])
+        self._hits = np.concatenate([self._hits[alive], np.ones(len(new), dtype=np.int64)])
+        self._misses = np.concatenate([self._misses[alive], np.zeros(len(new), dtype=np.int64)])
+        self._frames_since_update = np.concatenate(
+            [self._frames_since_update[alive], np.zeros(len(new), dtype=np.int64)]
+        )
+        self._next_id += len(new)
+        return self._output()
+
+    def _output(self):
+        visible = (self._hits >= self.min_hits) & (self._misses <= self.coast_misses)
+        return Detections(
+            cxcywh_to_xyxy(self._state[visible]).astype(np.float32),
+            self._conf[visible].copy(),
+            self._cls[visible].copy(),
+            self.names,
+            track_id=self._ids[visible].copy(),
+        )